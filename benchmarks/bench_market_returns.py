@@ -0,0 +1,172 @@
+"""
+ActiveETFMonitor 시장 수익률 계산 벤치마크 (오프라인)
+
+합성 포트폴리오(100 ~ 2,000 종목)에 대해 get_market_returns(yfinance 종가 + PDF Fallback)와
+날짜 정보가 없을 때의 PDF 수익률 계산 시간을 측정하고, 기존 행 단위 루프 구현과 결과가 같은지 검증합니다.
+yf.download 는 합성 종가를 돌려주는 함수로 대체되어 네트워크를 사용하지 않습니다.
+get_market_returns는 세션 종가 캐시(price_store)가 빈 상태(cold)와 채워진 상태(market ms) 를 따로 측정합니다.
+
+사용법:
+    python benchmarks/bench_market_returns.py
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# 합성 종목코드가 실제 security master / review 큐에 쌓이지 않도록 임시 DB 사용
+os.environ.setdefault("SECURITY_MASTER_PATH", os.path.join(tempfile.mkdtemp(), "security_master.sqlite"))
+os.environ.setdefault("PRICE_STORE_PATH", os.path.join(tempfile.mkdtemp(), "price_store.sqlite"))
+
+import etf  # noqa: E402
+import price_store  # noqa: E402
+
+SIZES = [100, 500, 1000, 2000]
+REPEAT = 3
+
+
+def make_portfolios(n_rows: int, seed: int = 0):
+    """전일/금일 PDF: 미국주식(일부 종가 누락), 국내 코드, 선물, 현금, 편입/편출 종목 포함"""
+    rnd = random.Random(seed)
+    prev = []
+    for i in range(n_rows):
+        kind = i % 10
+        if kind == 0:
+            code = f"{rnd.randint(0, 999999):06d}"
+        elif kind == 1:
+            code = f"ES{'HMUZ'[i % 4]}{i % 10} Index"
+        else:
+            code = f"T{i:04d} US EQUITY"
+        qty = rnd.choice([0, rnd.randint(1, 5_000_000)]) if kind == 9 else rnd.randint(1, 5_000_000)
+        prev.append([code, f"종목 {i}", qty, qty * rnd.randint(1_000, 900_000), rnd.uniform(0, 2)])
+    prev.append(['', '현금', 0, 1_000_000_000, 1.0])
+    df_prev = pd.DataFrame(prev, columns=etf.PORTFOLIO_COLUMNS)
+
+    today = df_prev.sample(frac=0.97, random_state=seed).copy()  # 3% 편출
+    today['평가금액'] = (today['평가금액'] * np.exp(np.random.default_rng(seed).normal(0, 0.02, len(today)))).round()
+    new = pd.DataFrame([[f"N{i:04d} US EQUITY", f"신규 {i}", 100, 1_000_000, 0.1] for i in range(n_rows // 50)],
+                       columns=etf.PORTFOLIO_COLUMNS)
+    return df_prev, pd.concat([today, new], ignore_index=True)
+
+
+def fake_download(tickers, **kwargs):
+    """yf.download 대체: 티커별 고정 5일 종가 (약 20% 티커는 종가 없음, 약 10%는 첫 날 누락), start/end 지원"""
+    tickers = list(dict.fromkeys(tickers))  # yfinance와 같이 중복 티커는 한 컬럼
+    dates = pd.bdate_range(end="2025-06-30", periods=5)
+    cols = {}
+    for t in tickers:
+        rng = np.random.default_rng(zlib.crc32(t.encode()))
+        px = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, len(dates))))
+        u = rng.random()
+        if u < 0.2:
+            px[:] = np.nan
+        elif u < 0.3:
+            px[0] = np.nan
+        cols[t] = px
+    closes = pd.DataFrame(cols, index=dates)
+    if 'start' in kwargs:
+        closes = closes[(closes.index >= kwargs['start']) & (closes.index < kwargs['end'])]
+    return pd.concat({'Close': closes}, axis=1)
+
+
+def legacy_market_returns(mon, df_prev, df_today):
+    """기존 구현 (행 단위 iterrows + 종목별 df_today 필터)"""
+    market_returns, code_map, valid_tickers = {}, {}, []
+    for _, row in df_prev.iterrows():
+        code = row['종목코드']
+        if row['종목명'] == '현금' or code == '':
+            market_returns[code] = 0.0
+            continue
+        ticker = mon._ticker_from_code(code)
+        if ticker:
+            code_map[code] = ticker
+            valid_tickers.append(ticker)
+    bulk_data = etf.yf.download(valid_tickers, period="5d", threads=True, progress=False)['Close']
+
+    for _, row in df_prev.iterrows():
+        code = row['종목코드']
+        if code in market_returns:
+            continue
+        ticker = code_map.get(code)
+        yf_success = False
+        if ticker and ticker in bulk_data.columns:
+            hist = bulk_data[ticker].dropna()
+            if len(hist) >= 2:
+                prev_close, today_close = hist.iloc[-2], hist.iloc[-1]
+                market_returns[code] = (today_close / prev_close - 1) if prev_close > 0 else 0.0
+                yf_success = True
+        if not yf_success:
+            today_row = df_today[df_today['종목코드'] == code]
+            if len(today_row) > 0 and row['수량'] > 0 and today_row.iloc[0]['수량'] > 0:
+                prev_price = row['평가금액'] / row['수량']
+                today_price = today_row.iloc[0]['평가금액'] / today_row.iloc[0]['수량']
+                market_returns[code] = (today_price / prev_price - 1) if prev_price > 0 else 0
+            else:
+                market_returns[code] = 0.0
+    return market_returns
+
+
+def legacy_pdf_returns(df_prev, df_today):
+    """기존 구현 (analyze_rebalancing 날짜 정보 없음 분기)"""
+    market_returns = {}
+    for _, row in df_prev.iterrows():
+        code = row['종목코드']
+        prev_price = row['평가금액'] / row['수량'] if row['수량'] > 0 else 0
+        today_row = df_today[df_today['종목코드'] == code]
+        if len(today_row) > 0:
+            today_price = today_row.iloc[0]['평가금액'] / today_row.iloc[0]['수량'] if today_row.iloc[0]['수량'] > 0 else 0
+            market_returns[code] = (today_price / prev_price - 1) if prev_price > 0 else 0
+        else:
+            market_returns[code] = 0
+    return market_returns
+
+
+def same(a: dict, b: dict) -> bool:
+    return a.keys() == b.keys() and all(np.isclose(a[k], b[k], rtol=1e-12, atol=1e-15) for k in a)
+
+
+def bench(func):
+    best, out = float("inf"), None
+    for _ in range(REPEAT):
+        t0 = time.perf_counter()
+        out = func()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def main():
+    etf.yf.download = fake_download
+    mon = etf.ActiveETFMonitor.__new__(etf.ActiveETFMonitor)  # 저장소 가져오기 없이 메서드만 사용
+    mon.idx = "bench"
+    quiet = open(os.devnull, "w")
+
+    print(f"{'holdings':>9}{'cold ms':>9}{'market ms':>11}{'legacy ms':>11}{'speedup':>9}{'pdf ms':>9}{'legacy ms':>11}{'speedup':>9}  same")
+    for n in SIZES:
+        df_prev, df_today = make_portfolios(n, seed=n)
+        # PDF 기준일 2025-06-30/07-01 → 가격 세션 06-27/06-30 = 합성 종가의 마지막 두 날
+        dates = ("2025-06-30", "2025-07-01")
+        price_store.DB_PATH = os.path.join(tempfile.mkdtemp(), "price_store.sqlite")  # 크기별 빈 캐시
+        stdout, sys.stdout = sys.stdout, quiet
+        try:
+            t0 = time.perf_counter()
+            mon.get_market_returns(df_prev, df_today, *dates)
+            t_cold = time.perf_counter() - t0
+            t_new, r_new = bench(lambda: mon.get_market_returns(df_prev, df_today, *dates))
+            t_old, r_old = bench(lambda: legacy_market_returns(mon, df_prev, df_today))
+            t_pdf, p_new = bench(lambda: mon._pdf_returns(df_prev, df_today, require_today_qty=False).to_dict())
+            t_pdf_old, p_old = bench(lambda: legacy_pdf_returns(df_prev, df_today))
+        finally:
+            sys.stdout = stdout
+        print(f"{len(df_prev):>9}{t_cold * 1e3:>9.2f}{t_new * 1e3:>11.2f}{t_old * 1e3:>11.2f}{t_old / t_new:>8.1f}x"
+              f"{t_pdf * 1e3:>9.2f}{t_pdf_old * 1e3:>11.2f}{t_pdf_old / t_pdf:>8.1f}x  {same(r_new, r_old) and same(p_new, p_old)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+리밸런싱 타임라인 벤치마크 (오프라인)
+
+합성 1년치(약 250 스냅샷) 한 상품의 PDF 이력에 대해 etf_timeline.rebalancing_timeline(행렬 연산 1회)과
+연속 스냅샷 쌍마다 analyze_rebalancing을 호출하는 기존 방식의 시간을 측정하고, 순수 비중변화/이벤트가 같은지 검증합니다.
+yf.download 는 합성 종가를 돌려주는 함수로 대체되어 네트워크를 사용하지 않으며,
+세션 종가 캐시(price_store)가 빈 상태(cold)와 채워진 상태(timeline ms)를 따로 측정합니다.
+
+사용법:
+    python benchmarks/bench_rebalancing_timeline.py
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# 합성 종목코드/종가가 실제 저장소에 쌓이지 않도록 임시 DB 사용
+os.environ.setdefault("SECURITY_MASTER_PATH", os.path.join(tempfile.mkdtemp(), "security_master.sqlite"))
+os.environ.setdefault("PRICE_STORE_PATH", os.path.join(tempfile.mkdtemp(), "price_store.sqlite"))
+
+import etf  # noqa: E402
+import etf_timeline  # noqa: E402
+import trading_calendar  # noqa: E402
+
+SIZES = [(60, 30), (60, 250), (150, 250)]  # (보유 종목 수, 스냅샷 수)
+REPEAT = 3
+EVENT_KEYS = {'new_stocks': '신규 편입', 'removed_stocks': '완전 편출',
+              'increased_stocks': '비중 확대', 'decreased_stocks': '비중 축소'}
+
+
+def fake_download(tickers, **kwargs):
+    """yf.download 대체: 티커별 고정 일별 종가 (약 10% 티커는 종가 없음), start/end 지원"""
+    tickers = list(dict.fromkeys(tickers))
+    dates = pd.bdate_range(kwargs['start'], pd.Timestamp(kwargs['end']) - pd.Timedelta(days=1))
+    base = pd.bdate_range("2023-01-02", "2026-12-31")
+    cols = {}
+    for t in tickers:
+        rng = np.random.default_rng(zlib.crc32(t.encode()))
+        px = pd.Series(100 * np.exp(np.cumsum(rng.normal(0, 0.02, len(base)))), index=base)
+        cols[t] = px.reindex(dates) if rng.random() >= 0.1 else pd.Series(np.nan, index=dates)
+    return pd.concat({'Close': pd.DataFrame(cols, index=dates)}, axis=1)
+
+
+def make_history(n_holdings: int, n_days: int, seed: int = 0) -> pd.DataFrame:
+    """KRX 거래일마다 한 장의 PDF: 미국주식, 현금, 매일 소폭 수량 조정 + 가끔 편입/편출"""
+    rnd = random.Random(seed)
+    rng = np.random.default_rng(seed)
+    cal = trading_calendar.get_calendar('KRX')
+    dates = [d.strftime("%Y-%m-%d") for d in cal.sessions_in_range("2024-06-03", "2026-06-30")[:n_days]]
+
+    universe = [f"T{i:04d} US EQUITY" for i in range(n_holdings * 2)]
+    held = {c: rnd.randint(1_000, 100_000) for c in universe[:n_holdings]}
+    price = {c: rnd.uniform(20, 500) for c in universe}
+    rows = []
+    for d in dates:
+        for c in list(held):
+            price[c] *= float(np.exp(rng.normal(0, 0.02)))
+            if rnd.random() < 0.05:
+                held[c] = max(0, int(held[c] * rnd.uniform(0.5, 1.5)))
+        if rnd.random() < 0.2:
+            held.pop(rnd.choice(list(held)))
+            held[rnd.choice([c for c in universe if c not in held])] = rnd.randint(1_000, 100_000)
+        value = {c: q * price[c] * 1400 for c, q in held.items()}
+        cash = sum(value.values()) * 0.02
+        total = sum(value.values()) + cash
+        rows += [[c, f"종목 {c[:5]}", q, round(value[c]), value[c] / total * 100, d] for c, q in held.items()]
+        rows.append(['', '현금', 0, round(cash), cash / total * 100, d])
+    return pd.DataFrame(rows, columns=etf.PORTFOLIO_COLUMNS + ['날짜'])
+
+
+def legacy_timeline(mon, history: pd.DataFrame) -> pd.DataFrame:
+    """기존 방식: 연속 스냅샷 쌍마다 analyze_rebalancing"""
+    frames = {d: g.drop(columns='날짜').reset_index(drop=True) for d, g in history.groupby('날짜')}
+    dates = sorted(frames)
+    out = []
+    for prev, today in zip(dates[:-1], dates[1:]):
+        analysis = mon.analyze_rebalancing(frames[today], frames[prev], prev, today)
+        for key, label in EVENT_KEYS.items():
+            out += [(today, r['종목코드'], label, r['순수_비중변화']) for r in analysis[key]]
+    return pd.DataFrame(out, columns=['날짜', '종목코드', '구분', '순수_비중변화'])
+
+
+def same(new: pd.DataFrame, old: pd.DataFrame) -> bool:
+    keys = ['날짜', '종목코드', '구분']
+    a = new[keys + ['순수_비중변화']].sort_values(keys, ignore_index=True)
+    b = old.sort_values(keys, ignore_index=True)
+    return a[keys].equals(b[keys]) and np.allclose(a['순수_비중변화'], b['순수_비중변화'], rtol=1e-9, atol=1e-12)
+
+
+def bench(func):
+    best, out = float("inf"), None
+    for _ in range(REPEAT):
+        t0 = time.perf_counter()
+        out = func()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def main():
+    etf.yf.download = fake_download
+    mon = etf.ActiveETFMonitor.__new__(etf.ActiveETFMonitor)  # 저장소 가져오기 없이 메서드만 사용
+    mon.idx = "bench"
+    quiet = open(os.devnull, "w")
+
+    print(f"{'holdings':>9}{'days':>6}{'events':>8}{'cold ms':>10}{'timeline ms':>13}{'pairwise ms':>13}{'speedup':>9}  same")
+    for n, days in SIZES:
+        history = make_history(n, days, seed=n + days)
+        stdout, sys.stdout = sys.stdout, quiet
+        try:
+            t0 = time.perf_counter()
+            etf_timeline.rebalancing_timeline(history, provider="timefolio:bench")
+            t_cold = time.perf_counter() - t0
+            t_new, r_new = bench(lambda: etf_timeline.rebalancing_timeline(history, provider="timefolio:bench"))
+            t_old, r_old = bench(lambda: legacy_timeline(mon, history))
+        finally:
+            sys.stdout = stdout
+        print(f"{n:>9}{days:>6}{len(r_new['이벤트']):>8}{t_cold * 1e3:>10.1f}{t_new * 1e3:>13.1f}"
+              f"{t_old * 1e3:>13.1f}{t_old / t_new:>8.1f}x  {same(r_new['이벤트'], r_old)}")
+
+
+if __name__ == "__main__":
+    main()
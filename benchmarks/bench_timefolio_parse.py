@@ -0,0 +1,92 @@
+"""
+Timefolio PDF 파서 벤치마크 (오프라인)
+
+저장된 HTML fixture(m11_view.php 페이지)에 대해 파싱 속도(rows/s)를 측정하고
+lxml 파서와 기존 BeautifulSoup 파서의 결과가 동일한지 검증합니다.
+
+사용법:
+    python benchmarks/bench_timefolio_parse.py                  # 합성 fixture (100 ~ 5,000 종목)
+    python benchmarks/bench_timefolio_parse.py page1.html ...   # 실제 저장 페이지
+
+합성 fixture는 benchmarks/fixtures/ 에 한 번 생성된 뒤 재사용됩니다.
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from etf import parse_portfolio_html, parse_portfolio_html_bs4  # noqa: E402
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+SIZES = [100, 500, 2000, 5000]
+REPEAT = 5
+
+
+def make_fixture(n_rows: int, seed: int = 0) -> str:
+    """m11_view.php 구조를 흉내낸 HTML (헤더/메뉴 + table3 + display:none 행 포함)"""
+    rnd = random.Random(seed)
+    rows = []
+    for i in range(n_rows):
+        hidden = ' style="display:none"' if i >= 10 else ''
+        code = f"T{i:04d} US EQUITY" if i % 3 else f"{rnd.randint(0, 999999):06d}"
+        qty = rnd.randint(1, 5_000_000)
+        value = qty * rnd.randint(1_000, 900_000)
+        weight = rnd.uniform(0, 10)
+        rows.append(
+            f'<tr{hidden}><td class="tl">{code}</td><td class="tl"> 종목 {i} <span>Inc</span></td>'
+            f'<td>{qty:,}</td><td>{value:,}</td><td>{weight:.2f}</td></tr>'
+        )
+    menu = "".join(f'<li><a href="/m{j}.php">메뉴 {j}</a></li>' for j in range(300))
+    return (
+        '<!DOCTYPE html><html><head><meta charset="utf-8"><title>TIMEFOLIO</title></head><body>'
+        f'<div id="gnb"><ul>{menu}</ul></div>'
+        '<table class="table1"><tbody><tr><td>기준가</td><td>10,000</td></tr></tbody></table>'
+        '<table class="table3 pdf_table"><thead><tr><th>종목코드</th><th>종목명</th><th>수량</th>'
+        '<th>평가금액(원)</th><th>비중(%)</th></tr></thead><tbody>'
+        + "".join(rows) +
+        '</tbody></table><div id="footer">' + "<p>footer</p>" * 200 + '</div></body></html>'
+    )
+
+
+def ensure_fixtures() -> list:
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    paths = []
+    for n in SIZES:
+        path = os.path.join(FIXTURE_DIR, f"timefolio_{n}.html")
+        if not os.path.exists(path):
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(make_fixture(n, seed=n))
+        paths.append(path)
+    return paths
+
+
+def bench(func, page: bytes):
+    best = float("inf")
+    df = None
+    for _ in range(REPEAT):
+        t0 = time.perf_counter()
+        df = func(page)
+        best = min(best, time.perf_counter() - t0)
+    return best, df
+
+
+def main(paths: list):
+    print(f"{'fixture':<28}{'rows':>7}{'lxml ms':>10}{'bs4 ms':>10}{'lxml rows/s':>14}{'speedup':>9}  same")
+    for path in paths:
+        with open(path, "rb") as f:
+            page = f.read()
+
+        t_lxml, df_lxml = bench(parse_portfolio_html, page)
+        t_bs4, df_bs4 = bench(parse_portfolio_html_bs4, page)
+        same = df_lxml.reset_index(drop=True).equals(df_bs4.reset_index(drop=True).astype(df_lxml.dtypes.to_dict()))
+
+        rows = len(df_lxml)
+        print(f"{os.path.basename(path):<28}{rows:>7}{t_lxml * 1e3:>10.2f}{t_bs4 * 1e3:>10.2f}"
+              f"{rows / t_lxml:>14,.0f}{t_bs4 / t_lxml:>8.1f}x  {same}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or ensure_fixtures())
@@ -0,0 +1,235 @@
+"""
+Earnings Event Store
+종목별 실적 발표 이벤트를 로컬 SQLite에 누적 저장하는 모듈
+
+- (ticker, date) 키 + 출처(source), 발표 시점(timing: BMO/AMC), 분기, EPS(실제/예상/서프라이즈)
+- 최초 연결 시 시드 CSV(earnings_events_seed.csv)를 한 번 가져옴 (수동 보강 일정)
+- Nasdaq 캘린더 행은 오늘까지의 날짜만 저장 (미래 예정일은 추정치라 실제 발표일과 다를 수 있음)
+- refresh(): 이력을 한 번 받은 종목은 마지막으로 알려진 발표일 이후만 원격 출처에 요청, 종목당 REFRESH_TTL 내 재요청 없음
+  (캘린더로 먼저 들어온 종목은 이력 전체를 한 번 받음)
+- 스코어링은 event_dates()로 로컬에서 바로 조회 (종목당 HTTP 호출 없음)
+"""
+
+import os
+import time
+
+import pandas as pd
+
+import sqlite_store
+
+DB_PATH = os.environ.get("EARNINGS_STORE_PATH", os.path.join("data", "earnings_store.sqlite"))
+SEED_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "earnings_events_seed.csv")
+
+# 같은 종목을 이 시간(초) 안에 다시 원격 조회하지 않음
+REFRESH_TTL = 86400
+
+FIELDS = ['ticker', 'date', 'source', 'timing', 'fiscal_quarter', 'eps_actual', 'eps_estimate', 'surprise_pct']
+TIMINGS = ('BMO', 'AMC')
+
+
+def _init_schema(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS events (
+            ticker         TEXT NOT NULL,
+            date           TEXT NOT NULL,
+            source         TEXT,
+            timing         TEXT,
+            fiscal_quarter TEXT,
+            eps_actual     REAL,
+            eps_estimate   REAL,
+            surprise_pct   REAL,
+            PRIMARY KEY (ticker, date)
+        ) WITHOUT ROWID
+    """)
+    # 기간 조회(유니버스 전체 이벤트 스터디)용
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_events_date ON events (date, ticker)")
+    # 예정일(추정치) 캘린더 행은 저장하지 않음: 이전 버전이 남긴 미래 날짜 캘린더 행 정리
+    conn.execute("DELETE FROM events WHERE source = 'nasdaq_calendar' AND date > ?",
+                 (_to_date_str(pd.Timestamp.now()),))
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS refresh (
+            ticker     TEXT PRIMARY KEY,
+            checked_at REAL NOT NULL
+        ) WITHOUT ROWID
+    """)
+    # 원격 출처에서 발표 이력 전체를 받은 종목 (캘린더 행만 있는 종목은 여기 없음)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS history (
+            ticker     TEXT PRIMARY KEY,
+            fetched_at REAL NOT NULL
+        ) WITHOUT ROWID
+    """)
+
+    seeded = conn.execute("SELECT 1 FROM events LIMIT 1").fetchone()
+    if seeded is None and os.path.exists(SEED_CSV):
+        import_csv(SEED_CSV, source='manual')
+
+
+def _connect():
+    """Per-thread SQLite connection (batch workers refresh concurrently)."""
+    return sqlite_store.connect(DB_PATH, _init_schema)
+
+
+def _to_date_str(d):
+    return pd.Timestamp(d).strftime("%Y-%m-%d")
+
+
+def _clean(v):
+    return None if v is None or (isinstance(v, float) and v != v) or v == '' else v
+
+
+def _as_float(v):
+    v = _clean(v)
+    if v is None:
+        return None
+    try:
+        return float(str(v).replace('$', '').replace(',', '').replace('%', ''))
+    except ValueError:
+        return None
+
+
+def upsert(events: pd.DataFrame) -> int:
+    """
+    Write event rows (FIELDS columns; only 'ticker' and 'date' are required).
+    An existing (ticker, date) keeps its first source; empty fields are filled from the new row.
+    Returns the number of rows written.
+    """
+    if events is None or events.empty:
+        return 0
+    df = events.reindex(columns=FIELDS)
+    df = df[df['ticker'].notna() & df['date'].notna()]
+
+    records = []
+    for ticker, d, source, timing, quarter, eps_act, eps_est, surprise in df.itertuples(index=False, name=None):
+        timing = _clean(timing)
+        records.append((
+            str(ticker).strip().upper(), _to_date_str(d), _clean(source),
+            timing if timing in TIMINGS else None, _clean(quarter),
+            _as_float(eps_act), _as_float(eps_est), _as_float(surprise),
+        ))
+
+    conn = _connect()
+    with conn:
+        conn.executemany("""
+            INSERT INTO events (ticker, date, source, timing, fiscal_quarter, eps_actual, eps_estimate, surprise_pct)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (ticker, date) DO UPDATE SET
+                source         = COALESCE(events.source, excluded.source),
+                timing         = COALESCE(excluded.timing, events.timing),
+                fiscal_quarter = COALESCE(excluded.fiscal_quarter, events.fiscal_quarter),
+                eps_actual     = COALESCE(excluded.eps_actual, events.eps_actual),
+                eps_estimate   = COALESCE(excluded.eps_estimate, events.eps_estimate),
+                surprise_pct   = COALESCE(excluded.surprise_pct, events.surprise_pct)
+        """, records)
+    return len(records)
+
+
+def import_csv(path: str, source: str = None) -> int:
+    """
+    Bulk import a CSV with at least 'ticker' and 'date' columns (other FIELDS optional).
+    source fills rows without a 'source' value.
+    """
+    df = pd.read_csv(path, dtype={'ticker': str, 'fiscal_quarter': str}, encoding='utf-8-sig')
+    df.columns = [c.strip().lower() for c in df.columns]
+    if not {'ticker', 'date'}.issubset(df.columns):
+        raise ValueError(f"{path}: 'ticker', 'date' 컬럼이 필요합니다")
+    if source is not None:
+        df['source'] = df['source'].fillna(source) if 'source' in df.columns else source
+    n = upsert(df)
+    print(f"[EarningsStore] {os.path.basename(path)}: 이벤트 {n}건 가져옴")
+    return n
+
+
+def load(tickers=None, start=None, end=None) -> pd.DataFrame:
+    """
+    Events as a DataFrame (FIELDS, 'date' as Timestamp) sorted by ticker, date.
+    tickers: one ticker, a list, or None for the whole table.
+    """
+    sql = f"SELECT {', '.join(FIELDS)} FROM events WHERE 1 = 1"
+    params = []
+    if tickers is not None:
+        tickers = [tickers] if isinstance(tickers, str) else list(tickers)
+        sql += f" AND ticker IN ({', '.join('?' * len(tickers))})"
+        params += [str(t).upper() for t in tickers]
+    if start is not None:
+        sql += " AND date >= ?"
+        params.append(_to_date_str(start))
+    if end is not None:
+        sql += " AND date <= ?"
+        params.append(_to_date_str(end))
+    sql += " ORDER BY ticker, date"
+
+    df = pd.DataFrame.from_records(_connect().execute(sql, params).fetchall(), columns=FIELDS)
+    df['date'] = pd.to_datetime(df['date'])
+    return df
+
+
+def event_dates(ticker: str, start=None, end=None) -> list:
+    """Sorted report dates (Timestamps) of one ticker, up to `end` (default: today, no scheduled dates)."""
+    sql = "SELECT date FROM events WHERE ticker = ?"
+    params = [str(ticker).upper()]
+    if start is not None:
+        sql += " AND date >= ?"
+        params.append(_to_date_str(start))
+    sql += " AND date <= ?"
+    params.append(_to_date_str(end if end is not None else pd.Timestamp.now()))
+    sql += " ORDER BY date"
+    return [pd.Timestamp(r[0]) for r in _connect().execute(sql, params).fetchall()]
+
+
+def last_event(ticker: str, before=None):
+    """Latest stored report date on or before `before` (default: today), or None."""
+    before = _to_date_str(before if before is not None else pd.Timestamp.now())
+    row = _connect().execute(
+        "SELECT MAX(date) FROM events WHERE ticker = ? AND date <= ?", (str(ticker).upper(), before)
+    ).fetchone()
+    return pd.Timestamp(row[0]) if row and row[0] else None
+
+
+def refresh(ticker: str, fetchers: dict, ttl: float = REFRESH_TTL, force: bool = False) -> int:
+    """
+    Ask remote sources only for events after the last known (past) report date.
+
+    fetchers: {source: fetcher(ticker, since) -> DataFrame of FIELDS (ticker optional)}
+        since is the last known report date (Timestamp) or None for a full history;
+        rows before `since` are ignored.
+    Until one source has returned the full history of a ticker, since is None: a ticker
+    first seen through the earnings calendar (one upcoming/today row) is still backfilled.
+    A ticker is checked at most once per `ttl` seconds (failures included), so scoring a
+    universe does not re-hit the sources on every call. Returns the number of rows written.
+    """
+    ticker = str(ticker).strip().upper()
+    conn = _connect()
+    row = conn.execute("SELECT checked_at FROM refresh WHERE ticker = ?", (ticker,)).fetchone()
+    if not force and row is not None and time.time() - row[0] < ttl:
+        return 0
+
+    has_history = conn.execute("SELECT 1 FROM history WHERE ticker = ?", (ticker,)).fetchone() is not None
+    since = last_event(ticker) if has_history else None
+    written = 0
+    fetched = False
+    for source, fetcher in fetchers.items():
+        try:
+            df = fetcher(ticker, since)
+            if df is None:
+                # Fetchers return None on an HTTP failure: no history marker from this source
+                continue
+            fetched = True
+            if df.empty:
+                continue
+            df = df.assign(ticker=ticker)
+            if 'source' not in df.columns:
+                df['source'] = source
+            if since is not None:
+                # The last known event is re-sent so late EPS fields can fill in
+                df = df[pd.to_datetime(df['date']) >= since]
+            written += upsert(df)
+        except Exception as e:
+            # Serve the stored events if a source fails
+            print(f"[EarningsStore] Refresh failed ({source}:{ticker}): {e}")
+
+    with conn:
+        conn.execute("INSERT OR REPLACE INTO refresh (ticker, checked_at) VALUES (?, ?)", (ticker, time.time()))
+        if fetched and not has_history:
+            conn.execute("INSERT OR REPLACE INTO history (ticker, fetched_at) VALUES (?, ?)", (ticker, time.time()))
+    return written
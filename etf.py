@@ -1,577 +1,610 @@
-"""
-Active ETF Portfolio Monitor
-타임폴리오 Active ETF의 구성종목(PDF) 변화를 모니터링하는 모듈
-"""
-
-import requests
-from bs4 import BeautifulSoup
-from datetime import datetime, timedelta
-import pandas as pd
-import json
-import os
-from typing import Dict, List, Tuple
-import re
-import yfinance as yf
-import pytz
-import urllib3
-
-# 보안 인증서 경고 무시
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-
-
-class ActiveETFMonitor:
-    """Active ETF 포트폴리오 모니터링 클래스"""
-
-    BASE_URL = "https://timefolioetf.co.kr/m11_view.php"
-    KST = pytz.timezone('Asia/Seoul')  # 한국 표준시
-
-    # ISIN 코드 → yfinance 티커 매핑 테이블
-    ISIN_TO_TICKER = {
-        'CA13321L1085': 'CCJ',  # Cameco Corp
-        # 필요시 추가 매핑 추가
-    }
-
-    def __init__(self, data_dir: str = "./data", url: str = None, etf_name: str = None):
-        """
-        Args:
-            data_dir: 데이터 저장 디렉토리
-            url: ETF URL (예: https://timefolioetf.co.kr/m11_view.php?idx=2)
-                 None이면 기본값 (idx=5) 사용
-            etf_name: ETF 이름 (예: "Active ETF", "Value ETF")
-                      None이면 기본값 사용
-        """
-        # URL에서 idx 추출 (먼저 수행)
-        if url:
-            # URL 파싱해서 idx 추출
-            from urllib.parse import urlparse, parse_qs
-            parsed = urlparse(url)
-            query_params = parse_qs(parsed.query)
-            self.idx = query_params.get('idx', ['5'])[0]
-        else:
-            self.idx = '5'  # 기본값
-
-        # ETF별로 데이터 디렉토리 분리
-        # 예: ./data/idx_5/, ./data/idx_2/
-        self.data_dir = os.path.join(data_dir, f"idx_{self.idx}")
-        os.makedirs(self.data_dir, exist_ok=True)
-
-        # ETF 이름 설정
-        self.etf_name = etf_name if etf_name else 'Active ETF'
-
-    def get_portfolio_data(self, date: str = None) -> pd.DataFrame:
-        """
-        특정 날짜의 포트폴리오 데이터를 크롤링
-
-        Args:
-            date: 조회할 날짜 (YYYY-MM-DD), None이면 오늘 날짜
-
-        Returns:
-            DataFrame: 종목코드, 종목명, 수량, 평가금액, 비중
-        """
-        if date is None:
-            date = datetime.now(self.KST).strftime("%Y-%m-%d")
-
-        # URL 파라미터 구성
-        params = {
-            'idx': self.idx,
-            'cate': '',
-            'pdfDate': date
-        }
-
-        try:
-            # 브라우저 헤더 추가
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                'Accept-Language': 'ko-KR,ko;q=0.9,en-US;q=0.8,en;q=0.7',
-                'Accept-Encoding': 'gzip, deflate, br',
-                'Connection': 'keep-alive',
-                'Upgrade-Insecure-Requests': '1',
-                'Referer': 'https://timefolioetf.co.kr/'
-            }
-
-            # HTTP 요청 (SSL 검증 비활성화)
-            response = requests.get(self.BASE_URL, params=params, headers=headers, timeout=30, verify=False)
-            response.raise_for_status()
-            response.encoding = 'utf-8'
-
-            # HTML 파싱
-            soup = BeautifulSoup(response.text, 'html.parser')
-
-            # 구성종목 테이블 찾기
-            table = soup.find('table', class_='table3')
-            if not table:
-                raise ValueError(f"테이블을 찾을 수 없습니다. (날짜: {date})")
-
-            # 데이터 추출 (display:none인 행도 모두 포함)
-            rows = table.find('tbody').find_all('tr')
-            data = []
-
-            for row in rows:
-                cols = row.find_all('td')
-                if len(cols) == 5:
-                    # 숫자 파싱 (쉼표 제거)
-                    quantity_text = cols[2].get_text(strip=True).replace(',', '')
-                    value_text = cols[3].get_text(strip=True).replace(',', '')
-                    weight_text = cols[4].get_text(strip=True)
-
-                    data.append({
-                        '종목코드': cols[0].get_text(strip=True),
-                        '종목명': cols[1].get_text(strip=True),
-                        '수량': int(quantity_text) if quantity_text else 0,
-                        '평가금액': int(value_text) if value_text else 0,
-                        '비중': float(weight_text) if weight_text else 0.0
-                    })
-
-            df = pd.DataFrame(data)
-            df['날짜'] = date
-
-            print(f"[OK] {date} 데이터 수집 완료: {len(df)}개 종목")
-            return df
-
-        except requests.RequestException as e:
-            print(f"[ERR] 네트워크 오류: {e}")
-            raise
-        except Exception as e:
-            print(f"[ERR] 데이터 수집 오류: {e}")
-            raise
-
-    def save_data(self, df: pd.DataFrame, date: str):
-        """데이터를 JSON 파일로 저장"""
-        filename = os.path.join(self.data_dir, f"portfolio_{date}.json")
-        df.to_json(filename, orient='records', force_ascii=False, indent=2)
-        print(f"[OK] 데이터 저장 완료: {filename}")
-
-    def load_data(self, date: str) -> pd.DataFrame:
-        """저장된 데이터 로드"""
-        filename = os.path.join(self.data_dir, f"portfolio_{date}.json")
-        if os.path.exists(filename):
-            try:
-                return pd.read_json(filename)
-            except ValueError:
-                return None
-        return None
-
-    def load_history(self, days: int = 30) -> pd.DataFrame:
-        """
-        최근 N일간의 모든 포트폴리오 데이터를 로드하여 병합합니다.
-        
-        Returns:
-            DataFrame: [날짜, 종목코드, 종목명, 비중, 수량, 평가금액] 통합 테이블
-        """
-        all_dfs = []
-        
-        # 데이터 디렉토리 내의 모든 JSON 파일 검색
-        if not os.path.exists(self.data_dir):
-            return pd.DataFrame()
-            
-        files = [f for f in os.listdir(self.data_dir) if f.startswith('portfolio_') and f.endswith('.json')]
-        files.sort(reverse=True) # 최신순
-        
-        # 최근 N개 파일만 (또는 날짜 기준으로 N일 필터링도 가능하지만, 파일 개수로 제한하는게 단순함)
-        target_files = files[:days]
-        
-        for file in target_files:
-            date_str = file.replace('portfolio_', '').replace('.json', '')
-            file_path = os.path.join(self.data_dir, file)
-            try:
-                df = pd.read_json(file_path)
-                df['날짜'] = date_str
-                all_dfs.append(df)
-            except Exception:
-                continue
-                
-        if all_dfs:
-            return pd.concat(all_dfs, ignore_index=True)
-        else:
-            return pd.DataFrame()
-
-    def get_previous_business_day(self, date: str, lookback_days: int = 10) -> str:
-        """
-        이전 영업일 찾기 (데이터가 있는 날짜 기준)
-
-        Args:
-            date: 기준 날짜
-            lookback_days: 최대 조회 일수
-
-        Returns:
-            이전 영업일 (YYYY-MM-DD)
-        """
-        current_date = datetime.strptime(date, "%Y-%m-%d")
-
-        for i in range(1, lookback_days + 1):
-            prev_date = current_date - timedelta(days=i)
-            prev_date_str = prev_date.strftime("%Y-%m-%d")
-
-            # 저장된 데이터가 있는지 확인
-            if self.load_data(prev_date_str) is not None:
-                return prev_date_str
-
-            # 없으면 크롤링 시도
-            try:
-                df = self.get_portfolio_data(prev_date_str)
-                if len(df) > 0:
-                    self.save_data(df, prev_date_str)
-                    return prev_date_str
-            except:
-                continue
-
-        raise ValueError(f"{date}로부터 {lookback_days}일 이내에 이전 영업일을 찾을 수 없습니다.")
-
-    def _ticker_from_code(self, code: str) -> str:
-        """
-        종목코드를 yfinance 티커로 변환
-
-        Args:
-            code: PDF 종목코드 (예: "NVDA US EQUITY", "ESZ5 Index", "BRK/B US EQUITY", "CA13321L1085")
-
-        Returns:
-            yfinance 티커 (예: "NVDA", "BRK-B", "^GSPC", "CCJ")
-        """
-        # 공백과 접미사 제거
-        code = code.strip()
-
-        # ISIN 코드 먼저 체크 (길이가 12자이고 공백이 없는 경우)
-        # 예: CA13321L1085 (ISIN)
-        # 제외: "PG US EQUITY" (12자이지만 공백 있음)
-        if len(code) == 12 and ' ' not in code:
-            if code in self.ISIN_TO_TICKER:
-                return self.ISIN_TO_TICKER[code]
-            else:
-                # 매핑되지 않은 ISIN 코드
-                return None
-
-        # 선물 처리
-        if 'Index' in code or 'FUT' in code:
-            # S&P500 선물
-            if 'S&P' in code or 'ES' in code:
-                return '^GSPC'  # S&P 500 Index로 대체
-            # NASDAQ 100 선물 (NQZ5, NQH6 등)
-            if 'NQ' in code:
-                return 'NQ=F'  # NASDAQ 100 E-MINI Futures
-            # 기타 선물은 기초자산 반환 또는 None
-            return None
-
-        # US EQUITY 제거
-        if 'US EQUITY' in code:
-            ticker = code.replace('US EQUITY', '').strip()
-        # CT EQUITY 제거 (캐나다 주식 - 토론토 증권거래소)
-        elif 'CT EQUITY' in code:
-            ticker = code.replace('CT EQUITY', '').strip() + '.TO'
-        else:
-            ticker = code
-
-        # 티커 형식 변환: "/" → "-" (BRK/B → BRK-B, BRK/A → BRK-A)
-        # yfinance는 클래스 주식을 하이픈으로 표기
-        if '/' in ticker:
-            ticker = ticker.replace('/', '-')
-
-        return ticker if ticker else None
-
-    def get_market_returns(self, df_prev: pd.DataFrame, df_today: pd.DataFrame,
-                          date_prev: str, date_today: str) -> Dict[str, float]:
-        """
-        yfinance로 각 종목의 시장 수익률 가져오기 (Bulk Download 최적화)
-        """
-        market_returns = {}
-        print(f"[STATS] yfinance로 시장 수익률 수집 중... (Bulk Download)")
-
-        # 1. 티커 매핑 및 수집
-        code_map = {} # code -> ticker
-        valid_tickers = []
-        
-        for _, row in df_prev.iterrows():
-            code = row['종목코드']
-            if row['종목명'] == '현금' or code == '':
-                market_returns[code] = 0.0
-                continue
-                
-            ticker = self._ticker_from_code(code)
-            if ticker:
-                code_map[code] = ticker
-                valid_tickers.append(ticker)
-            else:
-                # 티커 없는 경우 바로 PDF Fallback 후보
-                pass
-
-        # 2. Bulk Download
-        if valid_tickers:
-            try:
-                # progress=False to keep stdout clean
-                bulk_data = yf.download(valid_tickers, period="5d", threads=True, progress=False)['Close']
-                
-                # If only one stock, bulk_data is Series, convert to DataFrame
-                if isinstance(bulk_data, pd.Series):
-                    bulk_data = bulk_data.to_frame(name=valid_tickers[0])
-            except Exception as e:
-                print(f"[ERR] Bulk Download Failed: {e}")
-                bulk_data = pd.DataFrame()
-        else:
-            bulk_data = pd.DataFrame()
-
-        # 3. 수익률 계산
-        for _, row in df_prev.iterrows():
-            code = row['종목코드']
-            stock_name = row['종목명']
-            
-            # 이미 처리된 경우 (현금 등)
-            if code in market_returns:
-                continue
-                
-            ticker = code_map.get(code)
-            
-            # yfinance 데이터 확인
-            yf_success = False
-            if ticker and not bulk_data.empty:
-                try:
-                    # Multi-index or Single Column handling
-                    if ticker in bulk_data.columns:
-                        hist = bulk_data[ticker].dropna()
-                        if len(hist) >= 2:
-                            prev_close = hist.iloc[-2]
-                            today_close = hist.iloc[-1]
-                            market_return = (today_close / prev_close - 1) if prev_close > 0 else 0.0
-                            market_returns[code] = market_return
-                            print(f"[OK] {ticker} ({stock_name}): {market_return*100:+.2f}%")
-                            yf_success = True
-                except Exception as e:
-                    pass
-            
-            # 4. Fallback (PDF 데이터)
-            if not yf_success:
-                try:
-                    today_row = df_today[df_today['종목코드'] == code]
-                    if len(today_row) > 0 and row['수량'] > 0 and today_row.iloc[0]['수량'] > 0:
-                        prev_price = row['평가금액'] / row['수량']
-                        today_price = today_row.iloc[0]['평가금액'] / today_row.iloc[0]['수량']
-                        pdf_return = (today_price / prev_price - 1) if prev_price > 0 else 0
-                        market_returns[code] = pdf_return
-                        print(f"[Info] {stock_name}: PDF 가격 사용 ({pdf_return*100:.2f}%)")
-                    else:
-                        market_returns[code] = 0.0
-                except:
-                    market_returns[code] = 0.0
-                    
-        return market_returns
-
-    def analyze_rebalancing(self, df_today: pd.DataFrame, df_prev: pd.DataFrame,
-                           date_prev: str = None, date_today: str = None) -> Dict:
-        """
-        리밸런싱 분석 (시장 수익률 기반)
-
-        시장 가격 변동만으로 설명되지 않는 비중 변화를 리밸런싱으로 감지
-        AUM 변화와 가격 변동 효과를 모두 제거
-
-        Args:
-            df_today: 금일 포트폴리오
-            df_prev: 전일 포트폴리오
-
-        Returns:
-            분석 결과 딕셔너리
-        """
-        # 종목코드를 기준으로 병합 (양쪽 모두 종목명 포함)
-        merged = pd.merge(
-            df_today[['종목코드', '종목명', '수량', '평가금액', '비중']],
-            df_prev[['종목코드', '종목명', '수량', '평가금액', '비중']],
-            on='종목코드',
-            how='outer',
-            suffixes=('_today', '_prev')
-        )
-
-        # 종목명 통합 (금일 우선, 없으면 전일 사용)
-        merged['종목명'] = merged['종목명_today'].fillna(merged['종목명_prev'])
-
-        # 숫자 컬럼만 0으로 채우기
-        numeric_columns = ['수량_today', '수량_prev', '평가금액_today', '평가금액_prev', '비중_today', '비중_prev']
-        merged[numeric_columns] = merged[numeric_columns].fillna(0)
-
-        # 1단계: yfinance로 시장 수익률 가져오기
-        if date_prev and date_today:
-            market_returns = self.get_market_returns(df_prev, df_today, date_prev, date_today)
-        else:
-            # 날짜 정보가 없으면 PDF 데이터로 fallback
-            print(f"[WARN]  날짜 정보 없음, PDF 데이터로 수익률 계산")
-            market_returns = {}
-            for _, row in df_prev.iterrows():
-                code = row['종목코드']
-                # PDF 데이터로 수익률 계산
-                prev_price = row['평가금액'] / row['수량'] if row['수량'] > 0 else 0
-                today_row = df_today[df_today['종목코드'] == code]
-                if len(today_row) > 0:
-                    today_price = today_row.iloc[0]['평가금액'] / today_row.iloc[0]['수량'] if today_row.iloc[0]['수량'] > 0 else 0
-                    market_returns[code] = (today_price / prev_price - 1) if prev_price > 0 else 0
-                else:
-                    market_returns[code] = 0
-
-        # 시장 수익률을 merged에 추가
-        merged['시장_수익률'] = merged['종목코드'].map(market_returns).fillna(0)
-
-        # 2단계: 가상 비중 계산 (시장 변동만 반영)
-        merged['가상_비중'] = merged['비중_prev'] * (1 + merged['시장_수익률'])
-
-        # 3단계: 정규화 (100%로 스케일링)
-        total_virtual_weight = merged['가상_비중'].sum()
-        if total_virtual_weight > 0:
-            merged['예상_비중'] = merged['가상_비중'] / total_virtual_weight * 100
-        else:
-            merged['예상_비중'] = 0
-
-        # 4단계: 실제 비중 변화 vs 예상 비중 변화
-        merged['순수_비중변화'] = merged['비중_today'] - merged['예상_비중']
-
-        # 5단계: 수량 변화 확인
-        merged['수량_변화'] = merged['수량_today'] - merged['수량_prev']
-
-        # 리밸런싱 감지
-        # - 의미있는 비중 변화 (±0.5%p 이상)
-        # - 또는 편입/편출 (수량이 0에서 변화)
-        # - 현금 제외
-        threshold = 0.5
-        rebalanced = merged[
-            ((abs(merged['순수_비중변화']) >= threshold) |
-             (merged['수량_prev'] == 0) |
-             (merged['수량_today'] == 0)) &
-            (merged['종목명'] != '현금')
-        ].copy()
-
-        # 편입/편출/비중확대/비중축소 구분
-        new_stocks = rebalanced[(rebalanced['수량_prev'] == 0) & (rebalanced['수량_today'] > 0)]  # 신규 편입
-        removed_stocks = rebalanced[(rebalanced['수량_today'] == 0) & (rebalanced['수량_prev'] > 0)]  # 편출
-
-        # 비중 확대/축소는 순수 비중 변화 + 수량 변화 모두 체크
-        # 수량이 증가했고, 비중도 의미있게 증가한 경우만
-        increased_stocks = rebalanced[(rebalanced['순수_비중변화'] > threshold) &
-                                     (rebalanced['수량_변화'] > 0) &
-                                     (rebalanced['수량_prev'] > 0) &
-                                     (rebalanced['수량_today'] > 0)]  # 비중 확대
-        decreased_stocks = rebalanced[(rebalanced['순수_비중변화'] < -threshold) &
-                                     (rebalanced['수량_변화'] < 0) &
-                                     (rebalanced['수량_prev'] > 0) &
-                                     (rebalanced['수량_today'] > 0)]  # 비중 축소
-
-        # 주식 비중 계산 (현금 제외)
-        stock_weight_prev = df_prev[df_prev['종목명'] != '현금']['비중'].sum()
-        stock_weight_today = df_today[df_today['종목명'] != '현금']['비중'].sum()
-
-        return {
-            'new_stocks': new_stocks.to_dict('records'),
-            'removed_stocks': removed_stocks.to_dict('records'),
-            'increased_stocks': increased_stocks.to_dict('records'),
-            'decreased_stocks': decreased_stocks.to_dict('records'),
-            'total_changes': len(rebalanced),
-            'stock_weight_prev': stock_weight_prev,
-            'stock_weight_today': stock_weight_today,
-        }
-
-    def format_summary(self, analysis: Dict, df_today: pd.DataFrame,
-                      date_today: str, date_prev: str) -> str:
-        """
-        분석 결과를 가독성 있게 포맷팅 (간결한 요약 형식)
-
-        Args:
-            analysis: analyze_rebalancing 결과
-            df_today: 금일 포트폴리오
-            date_today: 금일 날짜
-            date_prev: 전일 날짜
-
-        Returns:
-            포맷된 텍스트
-        """
-        lines = []
-
-        # ETF 이름
-        lines.append(f"<b>{self.etf_name}</b>")
-        lines.append("")
-
-        # 기준일
-        lines.append(f"• <b>기준일: {date_today} (vs {date_prev})</b>")
-        lines.append("")
-
-        # 리밸런싱 요약
-        lines.append("• <b>리밸런싱 요약(±0.5%p 이상*만 표시)</b>:")
-        lines.append(f"편입 {len(analysis['new_stocks'])}개, "
-                    f"편출 {len(analysis['removed_stocks'])}개, "
-                    f"비중 확대 {len(analysis['increased_stocks'])}개, "
-                    f"비중 축소 {len(analysis['decreased_stocks'])}개")
-        lines.append("")
-
-        # 편입 종목
-        if analysis['new_stocks']:
-            for stock in analysis['new_stocks']:
-                code = stock['종목코드'].replace(' US EQUITY', '').replace(' Index', '').strip()
-                lines.append(f"- {stock['종목명']}({code}) 편입 "
-                            f"(0.0 ▶ {stock['비중_today']:.1f}%) "
-                            f"{stock['순수_비중변화']:+.1f}")
-            lines.append("")
-
-        # 편출 종목
-        if analysis['removed_stocks']:
-            for stock in analysis['removed_stocks']:
-                code = stock['종목코드'].replace(' US EQUITY', '').replace(' Index', '').strip()
-                lines.append(f"- {stock['종목명']}({code}) 편출 "
-                            f"({stock['비중_prev']:.1f} ▶ 0.0%) "
-                            f"{stock['순수_비중변화']:+.1f}")
-            lines.append("")
-
-        # 비중 확대 종목
-        if analysis['increased_stocks']:
-            for stock in analysis['increased_stocks']:
-                code = stock['종목코드'].replace(' US EQUITY', '').replace(' Index', '').strip()
-                lines.append(f"- {stock['종목명']}({code}) 비중 확대 "
-                            f"({stock['비중_prev']:.1f} ▶ {stock['비중_today']:.1f}%) "
-                            f"{stock['순수_비중변화']:+.1f}")
-            lines.append("")
-
-        # 비중 축소 종목
-        if analysis['decreased_stocks']:
-            for stock in analysis['decreased_stocks']:
-                code = stock['종목코드'].replace(' US EQUITY', '').replace(' Index', '').strip()
-                lines.append(f"- {stock['종목명']}({code}) 비중 축소 "
-                            f"({stock['비중_prev']:.1f} ▶ {stock['비중_today']:.1f}%) "
-                            f"{stock['순수_비중변화']:+.1f}")
-            lines.append("")
-
-        # 리밸런싱 후 주식비중 변화
-        # stock_prev = analysis['stock_weight_prev']
-        # stock_today = analysis['stock_weight_today']
-        # stock_change = stock_today - stock_prev
-        # lines.append(f"• 리밸런싱 후 주식비중 변화 ({stock_prev:.1f} ▶ {stock_today:.1f}%)   {stock_change:+.1f}")
-        # lines.append("")
-
-        # 구성종목 Top 10
-        lines.append("• <b>구성종목 Top 10</b>:")
-        top10 = df_today.nlargest(10, '비중')
-        for idx, row in enumerate(top10.itertuples(), 1):
-            lines.append(f"{idx}. {row.종목명}  {row.비중:.2f}%")
-        lines.append("")
-
-        # 주석
-        lines.append("* 수량이 변한 종목 중, 가격효과(전일 비중×(1+시장수익률))를 제거한 예상비중 대비 실제비중의 차이")
-
-        return "\n".join(lines)
-
-
-if __name__ == "__main__":
-    # 테스트 코드
-    monitor = ActiveETFMonitor()
-
-    # 오늘 데이터 수집
-    today = datetime.now(pytz.timezone('Asia/Seoul')).strftime("%Y-%m-%d")
-    df_today = monitor.get_portfolio_data(today)
-    monitor.save_data(df_today, today)
-
-    # 전일 데이터 가져오기
-    try:
-        prev_day = monitor.get_previous_business_day(today)
-        df_prev = monitor.load_data(prev_day)
-
-        # 리밸런싱 분석
-        analysis = monitor.analyze_rebalancing(df_today, df_prev)
-
-        # 결과 출력
-        summary = monitor.format_summary(analysis, df_today, today, prev_day)
-        print(summary)
-    except Exception as e:
-        print(f"전일 데이터를 찾을 수 없습니다: {e}")
-        print(f"\n금일 포트폴리오 ({today}):")
+"""
+Active ETF Portfolio Monitor
+타임폴리오 Active ETF의 구성종목(PDF) 변화를 모니터링하는 모듈
+"""
+
+import requests
+from bs4 import BeautifulSoup
+from lxml import html as lxml_html
+from datetime import datetime
+import pandas as pd
+import numpy as np
+import json
+import os
+from typing import Dict, List, Tuple
+import re
+import yfinance as yf
+import pytz
+import urllib3
+import http_client
+import trading_calendar
+import portfolio_store
+import price_store
+import security_master
+
+# 보안 인증서 경고 무시
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+
+PORTFOLIO_COLUMNS = ['종목코드', '종목명', '수량', '평가금액', '비중']
+
+# 타임폴리오 Active ETF 상품 목록 (분류 -> 상품명 -> m11_view.php idx)
+TIMEFOLIO_ETFS = {
+    "해외주식형 (10종)": {
+        "글로벌탑픽": "22", "글로벌바이오": "9", "우주테크&방산": "20",
+        "S&P500": "5", "나스닥100": "2", "글로벌AI": "6",
+        "차이나AI": "19", "미국배당다우존스": "18",
+        "미국나스닥100채권혼합50": "10", "글로벌소비트렌드": "8"
+    },
+    "국내주식형 (7종)": {
+        "K신재생에너지": "16", "K바이오": "13", "Korea플러스배당": "12",
+        "코스피": "11", "코리아밸류업": "15", "K이노베이션": "17", "K컬처": "1"
+    }
+}
+
+# class="table3" 를 포함하는 테이블 (다중 클래스 대응)
+_TABLE3_XPATH = '//table[contains(concat(" ", normalize-space(@class), " "), " table3 ")]'
+
+
+def _cell_text(td) -> str:
+    """BeautifulSoup get_text(strip=True)와 동일: 텍스트 조각별 strip 후 연결"""
+    return ''.join(t.strip() for t in td.itertext())
+
+
+def _to_number_column(values: List[str], dtype):
+    """'1,234' 형태 문자열 리스트 → 숫자 컬럼 (빈 값은 0)"""
+    s = pd.Series(values, dtype=object).str.replace(',', '', regex=False)
+    s = s.where(s != '', '0')
+    return pd.to_numeric(s).astype(dtype)
+
+
+def parse_portfolio_html(page) -> pd.DataFrame:
+    """
+    타임폴리오 PDF 페이지(m11_view.php)에서 구성종목 테이블만 파싱 (lxml XPath)
+
+    Args:
+        page: HTML (bytes는 UTF-8로 디코딩, str 그대로 사용)
+
+    Returns:
+        DataFrame: 종목코드, 종목명, 수량, 평가금액, 비중 (display:none 행 포함)
+    """
+    if isinstance(page, bytes):
+        root = lxml_html.fromstring(page, parser=lxml_html.HTMLParser(encoding='utf-8'))
+    else:
+        root = lxml_html.fromstring(page)
+
+    tables = root.xpath(_TABLE3_XPATH)
+    if not tables:
+        raise ValueError("테이블을 찾을 수 없습니다.")
+    table = tables[0]
+
+    # 5열(td) 행만, 문서 순서대로 → 5개씩 끊어서 컬럼 단위로 구성
+    tds = table.xpath('./tbody//tr[count(td)=5]/td')
+    if not tds and not table.xpath('./tbody'):
+        tds = table.xpath('.//tr[count(td)=5]/td')
+    cells = [_cell_text(td) for td in tds]
+
+    return pd.DataFrame({
+        '종목코드': cells[0::5],
+        '종목명': cells[1::5],
+        '수량': _to_number_column(cells[2::5], 'int64'),
+        '평가금액': _to_number_column(cells[3::5], 'int64'),
+        '비중': _to_number_column(cells[4::5], 'float64'),
+    }, columns=PORTFOLIO_COLUMNS)
+
+
+def parse_portfolio_html_bs4(page) -> pd.DataFrame:
+    """기존 BeautifulSoup(html.parser) 파서 (벤치마크 비교/검증용)"""
+    if isinstance(page, bytes):
+        page = page.decode('utf-8', 'ignore')
+    soup = BeautifulSoup(page, 'html.parser')
+
+    table = soup.find('table', class_='table3')
+    if not table:
+        raise ValueError("테이블을 찾을 수 없습니다.")
+
+    rows = table.find('tbody').find_all('tr')
+    data = []
+
+    for row in rows:
+        cols = row.find_all('td')
+        if len(cols) == 5:
+            # 숫자 파싱 (쉼표 제거)
+            quantity_text = cols[2].get_text(strip=True).replace(',', '')
+            value_text = cols[3].get_text(strip=True).replace(',', '')
+            weight_text = cols[4].get_text(strip=True)
+
+            data.append({
+                '종목코드': cols[0].get_text(strip=True),
+                '종목명': cols[1].get_text(strip=True),
+                '수량': int(quantity_text) if quantity_text else 0,
+                '평가금액': int(value_text) if value_text else 0,
+                '비중': float(weight_text) if weight_text else 0.0
+            })
+
+    return pd.DataFrame(data, columns=PORTFOLIO_COLUMNS)
+
+
+def fetch_session_closes(tickers: List[str], from_date: str, to_date: str) -> pd.DataFrame:
+    """
+    yfinance 일괄 다운로드 종가 [from_date, to_date] (날짜 x 티커), price_store 세션 종가 fetcher
+    """
+    end = (pd.Timestamp(to_date) + pd.Timedelta(days=1)).strftime("%Y-%m-%d")  # yfinance end is exclusive
+    # progress=False to keep stdout clean
+    closes = yf.download(tickers, start=from_date, end=end, threads=True, progress=False)['Close']
+
+    # If only one stock, closes is Series, convert to DataFrame
+    if isinstance(closes, pd.Series):
+        closes = closes.to_frame(name=tickers[0])
+    if closes.index.tz is not None:
+        closes.index = closes.index.tz_localize(None)
+    return closes
+
+
+def price_sessions(tickers: pd.Series, date: str) -> pd.Series:
+    """
+    PDF 기준일 -> 티커별 가격 세션 ('YYYY-MM-DD')
+
+    기준일 PDF는 전 거래일 종가로 평가되므로, 티커 거래소(NYSE/KRX) 달력의 기준일 직전 거래일
+    """
+    exch = tickers.map(trading_calendar.exchange_for_ticker)
+    session_of = {e: trading_calendar.get_calendar(e).previous_session(date).strftime("%Y-%m-%d")
+                  for e in exch.dropna().unique()}
+    return exch.map(session_of)
+
+
+def session_closes(tickers, date_pairs, verbose: bool = False) -> pd.Series:
+    """
+    (전일, 금일) PDF 기준일 쌍마다 티커별 두 세션 종가를 price_store 캐시에서 조회
+    (저장소에 없는 점만 yfinance 1회 일괄 다운로드)
+
+    tickers: 티커 목록, date_pairs: [(date_prev, date_today), ...], verbose: 캐시/원격 조회 건수 출력
+    Returns: (ticker, 세션일) 인덱스 종가 Series (없으면 NaN)
+    """
+    tickers = pd.Series(list(dict.fromkeys(t for t in tickers if t)), dtype=object)
+    if tickers.empty:
+        return pd.Series(dtype=float)
+    dates = list(dict.fromkeys(d for pair in date_pairs for d in pair))
+    points = [p for d in dates for p in zip(tickers, price_sessions(tickers, d))]
+    return price_store.get_session_closes(points, fetch_session_closes, verbose=verbose)
+
+
+class ActiveETFMonitor:
+    """Active ETF 포트폴리오 모니터링 클래스"""
+
+    BASE_URL = "https://timefolioetf.co.kr/m11_view.php"
+    PROVIDER = "timefolio"  # portfolio_store provider key
+    KST = pytz.timezone('Asia/Seoul')  # 한국 표준시
+
+    def __init__(self, data_dir: str = "./data", url: str = None, etf_name: str = None):
+        """
+        Args:
+            data_dir: 데이터 저장 디렉토리
+            url: ETF URL (예: https://timefolioetf.co.kr/m11_view.php?idx=2)
+                 None이면 기본값 (idx=5) 사용
+            etf_name: ETF 이름 (예: "Active ETF", "Value ETF")
+                      None이면 기본값 사용
+        """
+        # URL에서 idx 추출 (먼저 수행)
+        if url:
+            # URL 파싱해서 idx 추출
+            from urllib.parse import urlparse, parse_qs
+            parsed = urlparse(url)
+            query_params = parse_qs(parsed.query)
+            self.idx = query_params.get('idx', ['5'])[0]
+        else:
+            self.idx = '5'  # 기본값
+
+        # 스냅샷은 portfolio_store(SQLite)에 ('timefolio', idx) 키로 저장
+        # 기존 JSON 디렉토리(예: ./data/idx_5/)는 최초 1회 가져오기용
+        self.data_dir = os.path.join(data_dir, f"idx_{self.idx}")
+        portfolio_store.import_json_dir(self.PROVIDER, self.idx, self.data_dir)
+
+        # ETF 이름 설정
+        self.etf_name = etf_name if etf_name else 'Active ETF'
+
+    @classmethod
+    def engine(cls, provider: str, fund: str, name: str = None) -> 'ActiveETFMonitor':
+        """
+        분석 메서드만 쓰는 인스턴스 (저장소 가져오기 없음)
+        공통 스키마로 변환한 다른 운용사 PDF에도 같은 시장수익률 조정 분석을 적용할 때 사용
+        """
+        obj = cls.__new__(cls)
+        obj.PROVIDER = provider
+        obj.idx = fund
+        obj.etf_name = name or fund
+        return obj
+
+    def get_portfolio_data(self, date: str = None) -> pd.DataFrame:
+        """
+        특정 날짜의 포트폴리오 데이터를 크롤링
+
+        Args:
+            date: 조회할 날짜 (YYYY-MM-DD), None이면 오늘 날짜
+
+        Returns:
+            DataFrame: 종목코드, 종목명, 수량, 평가금액, 비중
+        """
+        if date is None:
+            date = datetime.now(self.KST).strftime("%Y-%m-%d")
+
+        # URL 파라미터 구성
+        params = {
+            'idx': self.idx,
+            'cate': '',
+            'pdfDate': date
+        }
+
+        try:
+            # 브라우저 헤더 추가
+            headers = {
+                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+                'Accept-Language': 'ko-KR,ko;q=0.9,en-US;q=0.8,en;q=0.7',
+                'Accept-Encoding': 'gzip, deflate, br',
+                'Upgrade-Insecure-Requests': '1',
+                'Referer': 'https://timefolioetf.co.kr/'
+            }
+
+            # HTTP 요청 (공용 커넥션 풀, SSL 검증 비활성화)
+            response = http_client.get(self.BASE_URL, params=params, headers=headers, timeout=30)
+            response.raise_for_status()
+
+            # HTML 파싱 (lxml, table.table3 본문만 추출 / display:none인 행도 모두 포함)
+            try:
+                df = parse_portfolio_html(response.content)
+            except ValueError as e:
+                raise ValueError(f"{e} (날짜: {date})")
+            df['날짜'] = date
+
+            print(f"[OK] {date} 데이터 수집 완료: {len(df)}개 종목")
+            return df
+
+        except requests.RequestException as e:
+            print(f"[ERR] 네트워크 오류: {e}")
+            raise
+        except Exception as e:
+            print(f"[ERR] 데이터 수집 오류: {e}")
+            raise
+
+    def save_data(self, df: pd.DataFrame, date: str):
+        """데이터를 스냅샷 저장소에 저장 (같은 날짜는 덮어씀)"""
+        portfolio_store.save(self.PROVIDER, self.idx, date, df)
+        print(f"[OK] 데이터 저장 완료: {self.PROVIDER}/{self.idx} {date} ({len(df)}개 종목)")
+
+    @staticmethod
+    def _restore_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+        """저장소의 REAL 컬럼 → 크롤링 결과와 같은 정수형"""
+        df['수량'] = df['수량'].astype('int64')
+        df['평가금액'] = df['평가금액'].astype('int64')
+        return df
+
+    def load_data(self, date: str) -> pd.DataFrame:
+        """저장된 데이터 로드 (없으면 None)"""
+        df = portfolio_store.load(self.PROVIDER, self.idx, date)
+        return self._restore_dtypes(df) if df is not None else None
+
+    def load_history(self, days: int = 30) -> pd.DataFrame:
+        """
+        최근 N개 스냅샷의 포트폴리오 데이터를 로드하여 병합합니다. (쿼리 1회)
+        
+        Returns:
+            DataFrame: [종목코드, 종목명, 수량, 평가금액, 비중, 날짜] 통합 테이블 (최신순)
+        """
+        df = portfolio_store.load_history(self.PROVIDER, self.idx, days=days)
+        return self._restore_dtypes(df) if not df.empty else df
+
+    def load_stock_history(self, code: str) -> pd.DataFrame:
+        """단일 종목의 전체 기간 비중/수량 히스토리 (날짜 오름차순)"""
+        df = portfolio_store.stock_history(self.PROVIDER, self.idx, code)
+        return self._restore_dtypes(df) if not df.empty else df
+
+    def get_previous_business_day(self, date: str, lookback_days: int = 3) -> str:
+        """
+        이전 영업일 찾기 (KRX 거래일 달력 기준)
+
+        직전 KRX 거래일의 데이터를 로드(없으면 크롤링)합니다.
+        임시 휴장 등으로 해당 거래일 PDF가 없으면 그 이전 거래일로 넘어갑니다.
+
+        Args:
+            date: 기준 날짜
+            lookback_days: 최대 조회 거래일 수
+
+        Returns:
+            이전 영업일 (YYYY-MM-DD)
+        """
+        prev_date = portfolio_store.previous_snapshot_date(self.PROVIDER, self.idx, date,
+                                                           self.get_portfolio_data, lookback_days)
+        if prev_date is not None:
+            return prev_date
+
+        raise ValueError(f"{date} 이전 {lookback_days} 거래일 이내에 데이터가 있는 영업일을 찾을 수 없습니다.")
+
+    def _ticker_from_code(self, code: str) -> str:
+        """
+        종목코드를 yfinance 티커로 변환 (security_master 조회, 처음 보는 코드만 규칙 파싱)
+
+        Args:
+            code: PDF 종목코드 (예: "NVDA US EQUITY", "ESZ5 Index", "BRK/B US EQUITY", "CA13321L1085")
+
+        Returns:
+            yfinance 티커 (예: "NVDA", "BRK-B", "^GSPC", "CCJ"), 매핑 없으면 None (review 큐 등록)
+        """
+        return security_master.resolve([code], provider=f"{self.PROVIDER}:{self.idx}").iloc[0]
+
+    @staticmethod
+    def _pdf_returns(df_prev: pd.DataFrame, df_today: pd.DataFrame, require_today_qty: bool = True) -> pd.Series:
+        """
+        PDF 내재 가격(평가금액/수량) 기준 수익률 (종목코드 -> 수익률, 전일 종목 순서)
+
+        금일 PDF에 없거나 전일 가격이 0이면 0.
+        require_today_qty: 금일 수량이 0인 종목도 0으로 처리 (False면 금일 가격 0 → -100%)
+        """
+        cols = ['종목코드', '수량', '평가금액']
+        m = df_prev[cols].merge(df_today[cols].drop_duplicates('종목코드'), on='종목코드',
+                                how='left', suffixes=('_prev', '_today'))
+        q_prev = m['수량_prev'].to_numpy(dtype=float)
+        q_today = m['수량_today'].to_numpy(dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            prev_price = np.where(q_prev > 0, m['평가금액_prev'].to_numpy(dtype=float) / q_prev, 0.0)
+            today_price = np.where(q_today > 0, m['평가금액_today'].to_numpy(dtype=float) / q_today, 0.0)
+            ret = np.where(prev_price > 0, today_price / prev_price - 1, 0.0)
+
+        ok = ~np.isnan(q_today)  # 금일 PDF에 있는 종목
+        if require_today_qty:
+            ok &= q_today > 0
+        return pd.Series(np.where(ok, ret, 0.0), index=m['종목코드'].to_numpy())
+
+    def get_market_returns(self, df_prev: pd.DataFrame, df_today: pd.DataFrame,
+                          date_prev: str, date_today: str) -> Dict[str, float]:
+        """
+        yfinance로 각 종목의 시장 수익률 가져오기 (Bulk Download 최적화)
+
+        티커 매핑/종가 조회/PDF Fallback 모두 종목 단위 루프 없이 컬럼 연산으로 처리
+        종가는 date_prev/date_today 각각의 가격 세션(price_sessions) 종가를 price_store 캐시에서 읽음
+        → 같은 날짜 재분석, 과거일 분석, 여러 ETF 분석 모두 빠진 종가만 다운로드
+        """
+        print(f"[STATS] yfinance로 시장 수익률 수집 중... (세션 종가 캐시)")
+        prev = df_prev.drop_duplicates('종목코드')
+        codes = prev['종목코드']
+        cash = ((prev['종목명'] == '현금') | (codes == '')).to_numpy()
+
+        # 1. 티커 매핑 (security_master 일괄 조회, 미해결 코드는 review 큐)
+        tickers = pd.Series(None, index=codes.index, dtype=object)
+        tickers[~cash] = security_master.resolve(codes[~cash], prev['종목명'][~cash],
+                                                 provider=f"{self.PROVIDER}:{self.idx}").to_numpy()
+
+        # 2. 두 세션 종가 (캐시 → 빠진 점만 Bulk Download)
+        yf_ret = np.full(len(prev), np.nan)
+        has_ticker = tickers.notna().to_numpy()
+        if has_ticker.any():
+            t = tickers[has_ticker]
+            closes = session_closes(t, [(date_prev, date_today)])
+            close_prev = closes.reindex(pd.MultiIndex.from_arrays([t, price_sessions(t, date_prev)])).to_numpy()
+            close_today = closes.reindex(pd.MultiIndex.from_arrays([t, price_sessions(t, date_today)])).to_numpy()
+            with np.errstate(divide='ignore', invalid='ignore'):
+                yf_ret[has_ticker] = np.where(close_prev > 0, close_today / close_prev - 1,
+                                              np.where(np.isnan(close_prev), np.nan, 0.0))
+
+        # 3. 수익률: yfinance 종가 → 없으면 PDF 내재 가격 (4. Fallback) → 현금 0
+        pdf_ret = self._pdf_returns(prev, df_today).to_numpy()
+        use_yf = ~np.isnan(yf_ret)
+        returns = np.where(cash, 0.0, np.where(use_yf, yf_ret, pdf_ret))
+
+        n_yf = int((use_yf & ~cash).sum())
+        print(f"[OK] yfinance {n_yf}종목, PDF 가격 사용 {int((~use_yf & ~cash).sum())}종목, 현금 {int(cash.sum())}")
+        return dict(zip(codes, returns.tolist()))
+
+    def analyze_rebalancing(self, df_today: pd.DataFrame, df_prev: pd.DataFrame,
+                           date_prev: str = None, date_today: str = None) -> Dict:
+        """
+        리밸런싱 분석 (시장 수익률 기반)
+
+        시장 가격 변동만으로 설명되지 않는 비중 변화를 리밸런싱으로 감지
+        AUM 변화와 가격 변동 효과를 모두 제거
+
+        Args:
+            df_today: 금일 포트폴리오
+            df_prev: 전일 포트폴리오
+
+        Returns:
+            분석 결과 딕셔너리
+        """
+        # 종목코드를 기준으로 병합 (양쪽 모두 종목명 포함)
+        merged = pd.merge(
+            df_today[['종목코드', '종목명', '수량', '평가금액', '비중']],
+            df_prev[['종목코드', '종목명', '수량', '평가금액', '비중']],
+            on='종목코드',
+            how='outer',
+            suffixes=('_today', '_prev')
+        )
+
+        # 종목명 통합 (금일 우선, 없으면 전일 사용)
+        merged['종목명'] = merged['종목명_today'].fillna(merged['종목명_prev'])
+
+        # 숫자 컬럼만 0으로 채우기
+        numeric_columns = ['수량_today', '수량_prev', '평가금액_today', '평가금액_prev', '비중_today', '비중_prev']
+        merged[numeric_columns] = merged[numeric_columns].fillna(0)
+
+        # 1단계: yfinance로 시장 수익률 가져오기
+        if date_prev and date_today:
+            market_returns = self.get_market_returns(df_prev, df_today, date_prev, date_today)
+        else:
+            # 날짜 정보가 없으면 PDF 데이터로 fallback
+            print(f"[WARN]  날짜 정보 없음, PDF 데이터로 수익률 계산")
+            pdf_ret = self._pdf_returns(df_prev, df_today, require_today_qty=False)
+            # 중복 종목코드는 마지막 행 기준
+            market_returns = pdf_ret[~pdf_ret.index.duplicated(keep='last')].to_dict()
+
+        # 시장 수익률을 merged에 추가
+        merged['시장_수익률'] = merged['종목코드'].map(market_returns).fillna(0)
+
+        # 2단계: 가상 비중 계산 (시장 변동만 반영)
+        merged['가상_비중'] = merged['비중_prev'] * (1 + merged['시장_수익률'])
+
+        # 3단계: 정규화 (100%로 스케일링)
+        total_virtual_weight = merged['가상_비중'].sum()
+        if total_virtual_weight > 0:
+            merged['예상_비중'] = merged['가상_비중'] / total_virtual_weight * 100
+        else:
+            merged['예상_비중'] = 0
+
+        # 4단계: 실제 비중 변화 vs 예상 비중 변화
+        merged['순수_비중변화'] = merged['비중_today'] - merged['예상_비중']
+
+        # 5단계: 수량 변화 확인
+        merged['수량_변화'] = merged['수량_today'] - merged['수량_prev']
+
+        # 리밸런싱 감지
+        # - 의미있는 비중 변화 (±0.5%p 이상)
+        # - 또는 편입/편출 (수량이 0에서 변화)
+        # - 현금 제외
+        threshold = 0.5
+        rebalanced = merged[
+            ((abs(merged['순수_비중변화']) >= threshold) |
+             (merged['수량_prev'] == 0) |
+             (merged['수량_today'] == 0)) &
+            (merged['종목명'] != '현금')
+        ].copy()
+
+        # 편입/편출/비중확대/비중축소 구분
+        new_stocks = rebalanced[(rebalanced['수량_prev'] == 0) & (rebalanced['수량_today'] > 0)]  # 신규 편입
+        removed_stocks = rebalanced[(rebalanced['수량_today'] == 0) & (rebalanced['수량_prev'] > 0)]  # 편출
+
+        # 비중 확대/축소는 순수 비중 변화 + 수량 변화 모두 체크
+        # 수량이 증가했고, 비중도 의미있게 증가한 경우만
+        increased_stocks = rebalanced[(rebalanced['순수_비중변화'] > threshold) &
+                                     (rebalanced['수량_변화'] > 0) &
+                                     (rebalanced['수량_prev'] > 0) &
+                                     (rebalanced['수량_today'] > 0)]  # 비중 확대
+        decreased_stocks = rebalanced[(rebalanced['순수_비중변화'] < -threshold) &
+                                     (rebalanced['수량_변화'] < 0) &
+                                     (rebalanced['수량_prev'] > 0) &
+                                     (rebalanced['수량_today'] > 0)]  # 비중 축소
+
+        # 주식 비중 계산 (현금 제외)
+        stock_weight_prev = df_prev[df_prev['종목명'] != '현금']['비중'].sum()
+        stock_weight_today = df_today[df_today['종목명'] != '현금']['비중'].sum()
+
+        return {
+            'new_stocks': new_stocks.to_dict('records'),
+            'removed_stocks': removed_stocks.to_dict('records'),
+            'increased_stocks': increased_stocks.to_dict('records'),
+            'decreased_stocks': decreased_stocks.to_dict('records'),
+            'total_changes': len(rebalanced),
+            'stock_weight_prev': stock_weight_prev,
+            'stock_weight_today': stock_weight_today,
+        }
+
+    def format_summary(self, analysis: Dict, df_today: pd.DataFrame,
+                      date_today: str, date_prev: str) -> str:
+        """
+        분석 결과를 가독성 있게 포맷팅 (간결한 요약 형식)
+
+        Args:
+            analysis: analyze_rebalancing 결과
+            df_today: 금일 포트폴리오
+            date_today: 금일 날짜
+            date_prev: 전일 날짜
+
+        Returns:
+            포맷된 텍스트
+        """
+        lines = []
+
+        # ETF 이름
+        lines.append(f"<b>{self.etf_name}</b>")
+        lines.append("")
+
+        # 기준일
+        lines.append(f"• <b>기준일: {date_today} (vs {date_prev})</b>")
+        lines.append("")
+
+        # 리밸런싱 요약
+        lines.append("• <b>리밸런싱 요약(±0.5%p 이상*만 표시)</b>:")
+        lines.append(f"편입 {len(analysis['new_stocks'])}개, "
+                    f"편출 {len(analysis['removed_stocks'])}개, "
+                    f"비중 확대 {len(analysis['increased_stocks'])}개, "
+                    f"비중 축소 {len(analysis['decreased_stocks'])}개")
+        lines.append("")
+
+        # 편입 종목
+        if analysis['new_stocks']:
+            for stock in analysis['new_stocks']:
+                code = stock['종목코드'].replace(' US EQUITY', '').replace(' Index', '').strip()
+                lines.append(f"- {stock['종목명']}({code}) 편입 "
+                            f"(0.0 ▶ {stock['비중_today']:.1f}%) "
+                            f"{stock['순수_비중변화']:+.1f}")
+            lines.append("")
+
+        # 편출 종목
+        if analysis['removed_stocks']:
+            for stock in analysis['removed_stocks']:
+                code = stock['종목코드'].replace(' US EQUITY', '').replace(' Index', '').strip()
+                lines.append(f"- {stock['종목명']}({code}) 편출 "
+                            f"({stock['비중_prev']:.1f} ▶ 0.0%) "
+                            f"{stock['순수_비중변화']:+.1f}")
+            lines.append("")
+
+        # 비중 확대 종목
+        if analysis['increased_stocks']:
+            for stock in analysis['increased_stocks']:
+                code = stock['종목코드'].replace(' US EQUITY', '').replace(' Index', '').strip()
+                lines.append(f"- {stock['종목명']}({code}) 비중 확대 "
+                            f"({stock['비중_prev']:.1f} ▶ {stock['비중_today']:.1f}%) "
+                            f"{stock['순수_비중변화']:+.1f}")
+            lines.append("")
+
+        # 비중 축소 종목
+        if analysis['decreased_stocks']:
+            for stock in analysis['decreased_stocks']:
+                code = stock['종목코드'].replace(' US EQUITY', '').replace(' Index', '').strip()
+                lines.append(f"- {stock['종목명']}({code}) 비중 축소 "
+                            f"({stock['비중_prev']:.1f} ▶ {stock['비중_today']:.1f}%) "
+                            f"{stock['순수_비중변화']:+.1f}")
+            lines.append("")
+
+        # 리밸런싱 후 주식비중 변화
+        # stock_prev = analysis['stock_weight_prev']
+        # stock_today = analysis['stock_weight_today']
+        # stock_change = stock_today - stock_prev
+        # lines.append(f"• 리밸런싱 후 주식비중 변화 ({stock_prev:.1f} ▶ {stock_today:.1f}%)   {stock_change:+.1f}")
+        # lines.append("")
+
+        # 구성종목 Top 10
+        lines.append("• <b>구성종목 Top 10</b>:")
+        top10 = df_today.nlargest(10, '비중')
+        for idx, row in enumerate(top10.itertuples(), 1):
+            lines.append(f"{idx}. {row.종목명}  {row.비중:.2f}%")
+        lines.append("")
+
+        # 주석
+        lines.append("* 수량이 변한 종목 중, 가격효과(전일 비중×(1+시장수익률))를 제거한 예상비중 대비 실제비중의 차이")
+
+        return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    # 테스트 코드
+    monitor = ActiveETFMonitor()
+
+    # 오늘 데이터 수집
+    today = datetime.now(pytz.timezone('Asia/Seoul')).strftime("%Y-%m-%d")
+    df_today = monitor.get_portfolio_data(today)
+    monitor.save_data(df_today, today)
+
+    # 전일 데이터 가져오기
+    try:
+        prev_day = monitor.get_previous_business_day(today)
+        df_prev = monitor.load_data(prev_day)
+
+        # 리밸런싱 분석
+        analysis = monitor.analyze_rebalancing(df_today, df_prev)
+
+        # 결과 출력
+        summary = monitor.format_summary(analysis, df_today, today, prev_day)
+        print(summary)
+    except Exception as e:
+        print(f"전일 데이터를 찾을 수 없습니다: {e}")
+        print(f"\n금일 포트폴리오 ({today}):")
         print(df_today.to_string())
\ No newline at end of file
@@ -0,0 +1,89 @@
+"""
+Active ETF Holdings Backfill
+등록된 운용사(etf_providers) Active ETF 구성종목(PDF) 과거 스냅샷을 병렬로 일괄 수집하는 모듈
+
+- 기간 내 KRX 거래일만 대상 (trading_calendar), 이미 저장된 날짜는 건너뜀 → 중단 후 재실행 시 이어서 수집
+- 스냅샷은 portfolio_store에 공통 스키마로 저장, 데이터가 없는 날짜(임시 휴장 등)도 빈 스냅샷으로 기록
+  (날짜로부터 portfolio_store.EMPTY_RETRY_DAYS가 지난 뒤 확인한 빈 스냅샷만 확정, 그 전에는 재실행 시 다시 요청)
+- 운용사별 동시 요청 수 / 요청 간격 제한 (etf_providers.Scheduler)
+
+사용 예:
+    python etf_backfill.py --start 2024-01-01 --end 2024-12-31
+    python etf_backfill.py --start 2024-06-01 --idx 5 2 --no-kiwoom
+"""
+
+import argparse
+from datetime import datetime
+
+import pytz
+
+import etf_providers
+import portfolio_store
+import trading_calendar
+
+KST = pytz.timezone('Asia/Seoul')
+
+
+def business_days(start: str, end: str = None) -> list:
+    """[start, end] 구간의 KRX 거래일 (YYYY-MM-DD), end 기본값은 오늘(KST) 직전 거래일 (당일 PDF는 collect_today)"""
+    calendar = trading_calendar.get_calendar('KRX')
+    if end is None:
+        end = calendar.previous_session(datetime.now(KST).strftime("%Y-%m-%d"))
+    sessions = calendar.sessions_in_range(start, end)
+    return [d.strftime("%Y-%m-%d") for d in sessions]
+
+
+def backfill(start: str, end: str = None, selection: dict = None, limits: dict = None, progress=None) -> dict:
+    """
+    기간 내 누락된 스냅샷을 병렬 수집
+
+    Args:
+        start, end: 수집 기간 (YYYY-MM-DD), end 기본값은 직전 거래일
+        selection: {provider key: [fund id, ...] 또는 None(전체)}, None이면 등록된 전 운용사 전 상품
+        limits: provider key -> 동시 요청 수 (어댑터 max_concurrency 재정의)
+        progress: progress(done, total, label, date, status) 콜백 (선택)
+
+    Returns:
+        dict: {'saved', 'empty', 'failed', 'skipped'} 건수 및 실패 목록('errors')
+    """
+    dates = business_days(start, end)
+    funds = etf_providers.select(selection)
+
+    # 날짜를 안쪽 루프로 두지 않고 상품을 번갈아 배치 → 한 상품이 풀을 독점하지 않음
+    pending = {}
+    for provider, fund in funds:
+        done = portfolio_store.snapshot_dates(provider.key, fund, include_empty=True)
+        pending[(provider, fund)] = [d for d in dates if d not in done]
+    tasks = [(provider, fund, todo[i])
+             for i in range(max((len(p) for p in pending.values()), default=0))
+             for (provider, fund), todo in pending.items() if i < len(todo)]
+
+    skipped = len(funds) * len(dates) - len(tasks)
+    total = len(tasks)
+    print(f"[Backfill] {len(funds)} ETF x {len(dates)} 영업일: 수집 대상 {total}건 (건너뜀 {skipped}건)")
+    if not tasks:
+        return {'saved': 0, 'empty': 0, 'failed': 0, 'skipped': skipped, 'errors': []}
+
+    def report(done, total, item, status):
+        provider, fund, date = item
+        progress(done, total, f"{provider.label} {provider.funds().get(fund, fund)} ({fund})", date, status)
+
+    summary = etf_providers.Scheduler(limits).collect(tasks, report if progress else None)
+    summary['skipped'] = skipped
+    print(f"[Backfill] 완료: 저장 {summary['saved']}, 데이터 없음 {summary['empty']}, 실패 {summary['failed']}")
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Active ETF 구성종목 과거 스냅샷 백필")
+    parser.add_argument("--start", required=True, help="시작일 (YYYY-MM-DD)")
+    parser.add_argument("--end", default=None, help="종료일 (YYYY-MM-DD, 기본값: 직전 거래일)")
+    etf_providers.add_selection_args(parser)
+    args = parser.parse_args()
+    selection = etf_providers.selection_from_args(args)
+
+    result = backfill(args.start, args.end, selection,
+                      progress=lambda done, total, label, date, status: print(f"  [{done}/{total}] {label} {date}: {status}"))
+
+    for key, fund, date, err in result['errors'][:20]:
+        print(f"[ERR] {key}/{fund} {date}: {err}")
@@ -0,0 +1,168 @@
+"""
+Active ETF Consensus
+등록된 전 운용사(etf_providers: 타임폴리오 전체 상품, 키움 KOSEF 등) Active ETF의 당일 리밸런싱을 한 번에 분석해
+"오늘 액티브 매니저들이 무엇을 사고 팔았나"를 종목별로 집계하는 모듈
+
+- 펀드별 금일/전일 PDF는 portfolio_store에서 로드 (없으면 수집), 운용사별 동시성/요청 간격 제한 (etf_providers.Scheduler)
+- 전 펀드 전일 보유 종목의 합집합을 security_master로 티커 변환 → 세션 종가 캐시(price_store)에 없는 점만 yf.download 1회
+- 펀드마다 공통 분석 엔진으로 시장수익률 조정(drift-adjusted) analyze_rebalancing 실행
+- 종목별 매수/매도 펀드 수, 운용사 수, 순수 비중변화(의도된 비중 변화) 합계
+
+사용 예:
+    python etf_consensus.py                      # 오늘(KST)
+    python etf_consensus.py --date 2025-06-30 --no-kiwoom
+"""
+
+import argparse
+from datetime import datetime
+
+import pandas as pd
+import pytz
+
+import etf_providers
+from etf import session_closes
+import security_master
+
+KST = pytz.timezone('Asia/Seoul')
+
+# analyze_rebalancing 결과 구분 -> (한글 구분, 방향)
+ACTIONS = {
+    'new_stocks': ('신규 편입', 1),
+    'increased_stocks': ('비중 확대', 1),
+    'decreased_stocks': ('비중 축소', -1),
+    'removed_stocks': ('완전 편출', -1),
+}
+
+
+def load_snapshots(funds: list, date: str, limits: dict = None) -> tuple:
+    """
+    펀드별 (df_today, prev_date, df_prev) 병렬 로드 (운용사별 워커 풀)
+    funds: [(provider, fund)] (etf_providers.select 결과)
+    Returns: ({(provider, fund): (df_today, prev_date, df_prev)}, [((provider, fund), error)])
+    """
+    def load(provider, fund):
+        df_today = provider.load(fund, date)
+        if df_today is None:
+            raise ValueError(f"{date} PDF 없음")
+        prev_date = provider.previous_date(fund, date)
+        if prev_date is None:
+            raise ValueError(f"{date} 이전 영업일 PDF 없음")
+        return df_today, prev_date, provider.load(fund, prev_date, fetch=False)
+
+    results, errors = etf_providers.Scheduler(limits).map(load, funds)
+    return dict(results), errors
+
+
+def prefetch_closes(loaded: dict, date: str) -> pd.Series:
+    """전 펀드 전일 보유 종목 합집합의 세션 종가를 캐시에 채움 (빠진 점만 한 번에 다운로드)"""
+    codes = pd.concat([df_prev[df_prev['종목명'] != '현금']['종목코드'] for _, _, df_prev in loaded.values()],
+                      ignore_index=True)
+    tickers = security_master.resolve(codes.drop_duplicates())
+    pairs = list(dict.fromkeys((prev_date, date) for _, prev_date, _ in loaded.values()))
+    return session_closes(tickers.dropna(), pairs, verbose=True)
+
+
+def fund_changes(analysis: dict, provider: str, fund: str, name: str) -> pd.DataFrame:
+    """analyze_rebalancing 결과 -> 펀드별 변화 행 (구분, 방향, 순수_비중변화)"""
+    frames = []
+    for key, (label, side) in ACTIONS.items():
+        rows = pd.DataFrame(analysis.get(key, []))
+        if not rows.empty:
+            frames.append(rows.assign(구분=label, 방향=side))
+    if not frames:
+        return pd.DataFrame()
+    out = pd.concat(frames, ignore_index=True)
+    cols = ['종목코드', '종목명', '구분', '방향', '순수_비중변화', '비중_prev', '비중_today', '수량_변화']
+    return out[cols].assign(운용사=provider, 펀드=fund, 펀드명=name)
+
+
+def aggregate(changes: pd.DataFrame) -> pd.DataFrame:
+    """
+    종목별 컨센서스 (티커 기준, 미해결 코드는 종목코드 기준)
+
+    Returns:
+        DataFrame: 종목, 종목명, 매수_펀드수, 매도_펀드수, 순매수_펀드수, 운용사수,
+                   순수_비중변화_합, 매수_비중합, 매도_비중합, 펀드 (순수_비중변화_합 내림차순)
+    """
+    if changes.empty:
+        return pd.DataFrame()
+    tickers = security_master.resolve(changes['종목코드'])
+    d = changes.assign(
+        종목=tickers.fillna(changes['종목코드']).to_numpy(),
+        buy=(changes['방향'] > 0).astype(int),
+        sell=(changes['방향'] < 0).astype(int),
+        buy_w=changes['순수_비중변화'].where(changes['방향'] > 0, 0.0),
+        sell_w=changes['순수_비중변화'].where(changes['방향'] < 0, 0.0),
+    )
+    out = d.groupby('종목').agg(
+        종목명=('종목명', 'first'),
+        매수_펀드수=('buy', 'sum'),
+        매도_펀드수=('sell', 'sum'),
+        운용사수=('운용사', 'nunique'),
+        순수_비중변화_합=('순수_비중변화', 'sum'),
+        매수_비중합=('buy_w', 'sum'),
+        매도_비중합=('sell_w', 'sum'),
+        펀드=('펀드명', lambda s: ', '.join(dict.fromkeys(s))),
+    )
+    out.insert(3, '순매수_펀드수', out['매수_펀드수'] - out['매도_펀드수'])
+    return out.reset_index().sort_values(['순수_비중변화_합', '순매수_펀드수'], ascending=False, ignore_index=True)
+
+
+def consensus(date: str = None, selection: dict = None, limits: dict = None) -> dict:
+    """
+    전 펀드 당일 리밸런싱 컨센서스
+
+    Args:
+        date: 기준일 (YYYY-MM-DD), 기본값은 오늘(KST)
+        selection: {provider key: [fund id, ...] 또는 None(전체)}, None이면 등록된 전 운용사 전 상품
+        limits: provider key -> 동시 요청 수
+
+    Returns:
+        dict: {'date', 'table' (종목별 집계), 'changes' (펀드별 변화 행), 'funds' (펀드별 상태), 'errors'}
+    """
+    date = date or datetime.now(KST).strftime("%Y-%m-%d")
+    funds = etf_providers.select(selection)
+
+    loaded, errors = load_snapshots(funds, date, limits)
+    print(f"[Consensus] {date}: {len(funds)}개 펀드 중 {len(loaded)}개 로드 (실패 {len(errors)})")
+
+    # 합집합 세션 종가를 먼저 캐시에 채움 → 펀드별 분석은 로컬 저장소만 조회
+    if loaded:
+        prefetch_closes(loaded, date)
+
+    frames, status = [], []
+    for (provider, fund), (df_today, prev_date, df_prev) in loaded.items():
+        name = provider.funds().get(fund, fund)
+        try:
+            analysis = provider.engine(fund).analyze_rebalancing(df_today, df_prev, prev_date, date)
+            changes = fund_changes(analysis, provider.key, fund, name)
+            if not changes.empty:
+                frames.append(changes)
+            status.append({'운용사': provider.key, '펀드': fund, '펀드명': name, '전일': prev_date,
+                           '변화': len(changes), '상태': 'OK'})
+        except Exception as e:
+            errors.append(((provider, fund), str(e)))
+    for (provider, fund), err in errors:
+        status.append({'운용사': provider.key, '펀드': fund, '펀드명': provider.funds().get(fund, fund), '전일': None,
+                       '변화': 0, '상태': f"Error: {err}"})
+
+    changes = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    table = aggregate(changes)
+    print(f"[Consensus] 완료: 변화 {len(changes)}건, 종목 {len(table)}개")
+    return {'date': date, 'table': table, 'changes': changes, 'funds': pd.DataFrame(status),
+            'errors': [(provider.funds().get(fund, fund), err) for (provider, fund), err in errors]}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Active ETF 운용사 컨센서스 (당일 리밸런싱 종목별 집계)")
+    parser.add_argument("--date", default=None, help="기준일 (YYYY-MM-DD, 기본값: 오늘)")
+    etf_providers.add_selection_args(parser)
+    parser.add_argument("--top", type=int, default=30, help="출력할 종목 수")
+    args = parser.parse_args()
+    selection = etf_providers.selection_from_args(args)
+
+    result = consensus(args.date, selection)
+    if not result['table'].empty:
+        print(result['table'].head(args.top).to_string(index=False))
+    for name, err in result['errors']:
+        print(f"[ERR] {name}: {err}")
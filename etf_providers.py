@@ -0,0 +1,329 @@
+"""
+Active ETF Providers
+운용사 사이트별 PDF 수집기를 플러그인으로 등록하고, 저장/전일 탐색/분석과 동시 수집 스케줄러를 공통으로 쓰는 모듈
+
+- ETFProvider: 어댑터는 key/label/funds()/fetch()(+ 필요하면 normalize())만 구현
+  → 공통 스키마(etf.PORTFOLIO_COLUMNS, 현금은 종목명 '현금' / 종목코드 '')로 portfolio_store에 저장
+- 저장/로드/직전 영업일 탐색(portfolio_store.previous_snapshot_date), 시장수익률 조정 분석
+  (ActiveETFMonitor.engine), 리밸런싱 타임라인(etf_timeline)은 모든 운용사가 같은 코드 사용
+- Scheduler: 운용사별 워커 풀(max_concurrency) + 요청 간 최소 간격(min_interval)으로 모든 등록 운용사를 동시에 수집
+
+새 운용사 추가 예:
+    @register
+    class SamsungProvider(ETFProvider):
+        key, label, min_interval = "samsung", "삼성 KODEX", 0.5
+        def funds(self): return {"123456": "KODEX ... 액티브"}
+        def fetch(self, fund, date): ...  # 해당 날짜 PDF (빈 DataFrame = 미공시, 네트워크 오류는 raise)
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+import etf_timeline
+import portfolio_store
+from etf import ActiveETFMonitor, PORTFOLIO_COLUMNS, TIMEFOLIO_ETFS
+from etf_kiwoom import KiwoomETFMonitor, to_common as kiwoom_to_common
+
+_registry = {}
+
+
+class ETFProvider:
+    """
+    Active ETF 운용사 어댑터 (플러그인 기본 클래스)
+
+    서브클래스 구현: key, label, funds(), fetch(); 스키마가 다르면 normalize()
+    요청 제한: max_concurrency (Scheduler 워커 수), min_interval (요청 시작 간격)
+    """
+
+    key = None             # portfolio_store provider 키 (예: 'timefolio')
+    label = None           # 표시 이름
+    max_concurrency = 2    # 동시 요청 수
+    min_interval = 0.0     # 요청 시작 간 최소 간격 (초)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._next_request = 0.0
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.key})"
+
+    # --- 어댑터 구현 ---
+    def funds(self) -> dict:
+        """fund id -> 상품명"""
+        raise NotImplementedError
+
+    def fetch(self, fund: str, date: str) -> pd.DataFrame:
+        """해당 날짜 PDF 원본 (빈 DataFrame = 미공시), 네트워크 오류는 raise"""
+        raise NotImplementedError
+
+    def normalize(self, df: pd.DataFrame) -> pd.DataFrame:
+        """원본 PDF -> 공통 스키마 (PORTFOLIO_COLUMNS)"""
+        return df
+
+    # --- 공통 ---
+    def _throttle(self):
+        """요청 시작 간격 보장 (운용사 단위, 스레드 간 공유)"""
+        if self.min_interval <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_request - now
+            self._next_request = max(now, self._next_request) + self.min_interval
+        if wait > 0:
+            time.sleep(wait)
+
+    def download(self, fund: str, date: str) -> pd.DataFrame:
+        """요청 간격 제한 → 수집 → 공통 스키마 (빈 DataFrame = 미공시)"""
+        self._throttle()
+        df = self.fetch(fund, date)
+        if df is None or df.empty:
+            return pd.DataFrame(columns=PORTFOLIO_COLUMNS)
+        return self.normalize(df)[PORTFOLIO_COLUMNS]
+
+    def save(self, fund: str, date: str, df: pd.DataFrame):
+        portfolio_store.save(self.key, fund, date, df)
+
+    def load(self, fund: str, date: str, fetch: bool = True):
+        """저장된 스냅샷 (공통 스키마), 없으면 fetch=True일 때 수집 후 저장; 없으면 None"""
+        df = portfolio_store.load(self.key, fund, date)
+        if df is not None:
+            return self.normalize(df)
+        if not fetch:
+            return None
+        df = self.download(fund, date)
+        if df.empty:
+            return None
+        self.save(fund, date, df)
+        return df
+
+    def previous_date(self, fund: str, date: str, lookback_days: int = 3):
+        """date 직전 KRX 거래일 중 PDF가 있는 날짜 (없으면 None)"""
+        return portfolio_store.previous_snapshot_date(self.key, fund, date, lambda d: self.download(fund, d),
+                                                      lookback_days)
+
+    def history(self, fund: str, days: int = 30) -> pd.DataFrame:
+        """최근 N개 스냅샷 (공통 스키마 + '날짜', 최신순)"""
+        df = portfolio_store.load_history(self.key, fund, days=days)
+        return self.normalize(df) if not df.empty else df
+
+    def engine(self, fund: str) -> ActiveETFMonitor:
+        """공통 분석 엔진 (시장수익률 조정 analyze_rebalancing)"""
+        return ActiveETFMonitor.engine(self.key, fund, self.funds().get(fund, fund))
+
+    def analyze(self, fund: str, date: str) -> dict:
+        """
+        date의 리밸런싱 분석 (전일 PDF 자동 탐색)
+        Returns: {'date', 'prev_date', 'today', 'prev', 'analysis'}
+        """
+        df_today = self.load(fund, date)
+        if df_today is None:
+            raise ValueError(f"{self.key}/{fund} {date} PDF 없음")
+        prev_date = self.previous_date(fund, date)
+        if prev_date is None:
+            raise ValueError(f"{self.key}/{fund} {date} 이전 영업일 PDF 없음")
+        df_prev = self.load(fund, prev_date, fetch=False)
+        analysis = self.engine(fund).analyze_rebalancing(df_today, df_prev, prev_date, date)
+        return {'date': date, 'prev_date': prev_date, 'today': df_today, 'prev': df_prev, 'analysis': analysis}
+
+    def timeline(self, fund: str, days: int = 250, market: bool = True) -> dict:
+        """저장 이력 전체의 리밸런싱 타임라인 (etf_timeline)"""
+        return etf_timeline.rebalancing_timeline(self.history(fund, days), market=market,
+                                                 provider=f"{self.key}:{fund}")
+
+
+def register(cls):
+    """운용사 어댑터 등록 (클래스 데코레이터, 인스턴스 1개를 레지스트리에 보관)"""
+    _registry[cls.key] = cls()
+    return cls
+
+
+def get(key: str) -> ETFProvider:
+    return _registry[key]
+
+
+def providers() -> list:
+    """등록된 운용사 어댑터 (등록 순서)"""
+    return list(_registry.values())
+
+
+def select(selection: dict = None) -> list:
+    """
+    (provider, fund) 목록
+    selection: {provider key: [fund id, ...] 또는 None(전체)}; None이면 등록된 전 운용사 전 상품
+    """
+    if selection is None:
+        selection = {p.key: None for p in providers()}
+    out = []
+    for key, funds in selection.items():
+        provider = get(key)
+        for fund in (provider.funds() if funds is None else funds):
+            out.append((provider, str(fund)))
+    return out
+
+
+def add_selection_args(parser):
+    """CLI 공통 옵션: --providers / --idx (타임폴리오) / --no-kiwoom / --data-dir"""
+    parser.add_argument("--providers", nargs="*", default=None,
+                        help=f"운용사 목록 (기본값: 등록된 전체 {list(_registry)})")
+    parser.add_argument("--idx", nargs="*", default=None, help="타임폴리오 idx 목록 (기본값: 전체 상품)")
+    parser.add_argument("--no-kiwoom", action="store_true", help="키움 ETF 제외")
+    parser.add_argument("--data-dir", default="./data", help="타임폴리오 기존 JSON 디렉토리")
+
+
+def selection_from_args(args) -> dict:
+    """add_selection_args 옵션 -> select()용 selection"""
+    TimefolioProvider.data_dir = args.data_dir
+    keys = args.providers or list(_registry)
+    selection = {key: None for key in keys if not (key == KiwoomProvider.key and args.no_kiwoom)}
+    if args.idx is not None and TimefolioProvider.key in selection:
+        selection[TimefolioProvider.key] = args.idx
+    return selection
+
+
+@register
+class TimefolioProvider(ETFProvider):
+    """타임폴리오 (HTML 테이블, ActiveETFMonitor 크롤러 재사용)"""
+
+    key = ActiveETFMonitor.PROVIDER
+    label = "TIMEFOLIO"
+    max_concurrency = 4
+    min_interval = 0.25    # 초당 최대 4회 요청
+
+    data_dir = "./data"  # 기존 JSON 디렉토리 (상품별 최초 1회 가져오기)
+
+    def __init__(self):
+        super().__init__()
+        self._monitors = {}
+        self._monitors_lock = threading.Lock()
+
+    def funds(self) -> dict:
+        return {idx: name for cat in TIMEFOLIO_ETFS.values() for name, idx in cat.items()}
+
+    def monitor(self, fund: str) -> ActiveETFMonitor:
+        with self._monitors_lock:
+            if fund not in self._monitors:
+                self._monitors[fund] = ActiveETFMonitor(data_dir=self.data_dir,
+                                                        url=f"{ActiveETFMonitor.BASE_URL}?idx={fund}",
+                                                        etf_name=self.funds().get(fund))
+            return self._monitors[fund]
+
+    def fetch(self, fund: str, date: str) -> pd.DataFrame:
+        try:
+            return self.monitor(fund).get_portfolio_data(date)
+        except ValueError:
+            # 테이블 없음 = 해당 날짜 PDF 미공시
+            return pd.DataFrame()
+
+
+@register
+class KiwoomProvider(ETFProvider):
+    """키움 KOSEF (AJAX JSON, '보유수량' / CASH 코드 → 공통 스키마, 저장은 KiwoomETFMonitor.save_data와 같은 인코딩)"""
+
+    key = KiwoomETFMonitor.PROVIDER
+    label = "KIWOOM"
+    max_concurrency = 2
+    min_interval = 0.5     # 초당 최대 2회 요청
+
+    def __init__(self):
+        super().__init__()
+        self._monitor = None
+        self._monitor_lock = threading.Lock()
+
+    def funds(self) -> dict:
+        return {"459790": "KOSEF 미국성장기업30 Active"}
+
+    def monitor(self) -> KiwoomETFMonitor:
+        with self._monitor_lock:
+            if self._monitor is None:
+                self._monitor = KiwoomETFMonitor()
+            return self._monitor
+
+    def fetch(self, fund: str, date: str) -> pd.DataFrame:
+        monitor = self.monitor()
+        if fund != monitor.etf_code:
+            raise ValueError(f"지원하지 않는 키움 상품: {fund}")
+        return monitor.fetch_data_from_api(date, raise_errors=True)
+
+    def normalize(self, df: pd.DataFrame) -> pd.DataFrame:
+        return kiwoom_to_common(df)
+
+    def save(self, fund: str, date: str, df: pd.DataFrame):
+        monitor = self.monitor()
+        if fund != monitor.etf_code:
+            raise ValueError(f"지원하지 않는 키움 상품: {fund}")
+        monitor.save_data(df, date)
+
+
+class Scheduler:
+    """
+    (provider, fund, 작업) 단위 동시 실행: 운용사별 워커 풀, 운용사 간에는 병렬
+    요청 간격은 각 어댑터의 min_interval로 제한 (ETFProvider.download)
+    """
+
+    def __init__(self, limits: dict = None):
+        # limits: provider key -> 동시 요청 수 (어댑터 max_concurrency 재정의)
+        self.limits = limits or {}
+
+    def map(self, fn, items: list, progress=None) -> tuple:
+        """
+        fn(provider, fund, *args)를 items [(provider, fund, *args), ...]마다 실행
+        운용사별로 번갈아 제출 → 한 운용사/상품이 풀을 독점하지 않음
+        progress(done, total, item, 결과 또는 'failed') 콜백 (선택)
+
+        Returns: ([(item, result)], [(item, error)]) (완료 순)
+        """
+        if not items:
+            return [], []
+        by_provider = {}
+        for item in items:
+            by_provider.setdefault(item[0], []).append(item)
+        ordered = [q[i] for i in range(max(len(q) for q in by_provider.values()))
+                   for q in by_provider.values() if i < len(q)]
+
+        executors = {p: ThreadPoolExecutor(max_workers=self.limits.get(p.key, p.max_concurrency),
+                                           thread_name_prefix=f"etf-{p.key}")
+                     for p in by_provider}
+        results, errors = [], []
+        try:
+            futures = {executors[item[0]].submit(fn, *item): item for item in ordered}
+            for done, future in enumerate(as_completed(futures), 1):
+                item = futures[future]
+                try:
+                    status = future.result()
+                    results.append((item, status))
+                except Exception as e:
+                    errors.append((item, str(e)))
+                    status = 'failed'
+                if progress:
+                    progress(done, len(ordered), item, status)
+        finally:
+            for ex in executors.values():
+                ex.shutdown(wait=True)
+        return results, errors
+
+    def collect(self, tasks: list, progress=None) -> dict:
+        """
+        [(provider, fund, date)] 수집 → 저장 (미공시 날짜는 빈 스냅샷으로 기록, EMPTY_RETRY_DAYS 이후 확인분만 확정)
+        progress(done, total, (provider, fund, date), 'saved' | 'empty' | 'failed') 콜백 (선택)
+        Returns: {'saved', 'empty', 'failed', 'errors': [(provider key, fund, date, error)]}
+        """
+        def run(provider, fund, date):
+            df = provider.download(fund, date)
+            provider.save(fund, date, df)
+            return 'empty' if df.empty else 'saved'
+
+        results, errors = self.map(run, tasks, progress)
+        summary = {'saved': 0, 'empty': 0, 'failed': len(errors),
+                   'errors': [(p.key, fund, date, err) for (p, fund, date), err in errors]}
+        for _, status in results:
+            summary[status] += 1
+        return summary
+
+    def collect_today(self, date: str, selection: dict = None, progress=None) -> dict:
+        """등록된 전 운용사 상품의 date PDF 중 저장되지 않은 것만 동시 수집 (공시 전 빈 결과는 다음 호출에 재시도)"""
+        tasks = [(p, fund, date) for p, fund in select(selection)
+                 if date not in portfolio_store.snapshot_dates(p.key, fund, include_empty=True)]
+        return self.collect(tasks, progress)
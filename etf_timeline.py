@@ -0,0 +1,189 @@
+"""
+Active ETF Rebalancing Timeline
+저장된 N일치 PDF를 날짜 x 종목 행렬(수량/평가금액/비중)로 펼쳐, 연속한 모든 스냅샷 쌍의
+시장수익률 조정 순수 비중변화(analyze_rebalancing의 '순수_비중변화')를 한 번에 계산하는 모듈
+
+- 시장수익률: 각 날짜의 가격 세션 종가(price_store 세션 종가 캐시) → 없으면 PDF 내재 가격 → 현금 0
+- 쌍별 계산(가상 비중 → 정규화 → 순수 비중변화)은 행렬 연산 1회, 종목/날짜 단위 루프 없음
+- 편입/편출/비중확대/비중축소 이벤트는 analyze_rebalancing과 같은 기준(±0.5%p, 수량 변화)으로 분류
+
+사용 예:
+    python etf_timeline.py --idx 22 --days 250
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+import price_store
+import security_master
+import trading_calendar
+from etf import ActiveETFMonitor, fetch_session_closes
+
+MATRIX_COLUMNS = ['수량', '평가금액', '비중']
+
+# 이벤트 구분 (analyze_rebalancing 결과 키 순서와 동일)
+EVENT_LABELS = ['신규 편입', '완전 편출', '비중 확대', '비중 축소']
+
+
+def pivot_history(history: pd.DataFrame) -> dict:
+    """
+    저장 이력(PORTFOLIO_COLUMNS + '날짜') -> 날짜 x 종목코드 행렬 (날짜 오름차순, 없는 종목은 0)
+
+    같은 날짜에 종목코드가 중복되면 수량/평가금액/비중을 합산 (현금 행 등)
+    Returns: {'수량', '평가금액', '비중': DataFrame, '보유': bool DataFrame (해당 날짜 PDF에 있음), '종목명': Series}
+    """
+    dates, date_pos = np.unique(history['날짜'].to_numpy(dtype=str), return_inverse=True)
+    codes, code_pos = np.unique(history['종목코드'].fillna('').to_numpy(dtype=str), return_inverse=True)
+    shape = (len(dates), len(codes))
+
+    out = {}
+    for col in MATRIX_COLUMNS:
+        m = np.zeros(shape)
+        np.add.at(m, (date_pos, code_pos), history[col].to_numpy(dtype=float))
+        out[col] = pd.DataFrame(m, index=pd.Index(dates, name='날짜'), columns=pd.Index(codes, name='종목코드'))
+    present = np.zeros(shape, dtype=bool)
+    present[date_pos, code_pos] = True
+    out['보유'] = pd.DataFrame(present, index=out['수량'].index, columns=out['수량'].columns)
+
+    # 종목명: 마지막 날짜의 이름
+    last = pd.DataFrame({'code': codes[code_pos], 'date': date_pos, 'name': history['종목명'].to_numpy()})
+    out['종목명'] = last.sort_values('date', kind='stable').drop_duplicates('code', keep='last') \
+        .set_index('code')['name'].reindex(codes)
+    return out
+
+
+def _session_matrix(tickers: pd.Series, dates) -> np.ndarray:
+    """날짜 x 티커 가격 세션 ('YYYY-MM-DD', 티커 거래소의 날짜 직전 거래일, 티커 없으면 None)"""
+    exch = tickers.map(lambda t: trading_calendar.exchange_for_ticker(t) if t else None)
+    sessions = np.full((len(dates), len(tickers)), None, dtype=object)
+    for e in exch.dropna().unique():
+        cal = trading_calendar.get_calendar(e)
+        col = np.array([cal.previous_session(d).strftime("%Y-%m-%d") for d in dates], dtype=object)
+        sessions[:, (exch == e).to_numpy()] = col[:, None]
+    return sessions
+
+
+def _close_matrix(tickers: pd.Series, dates, need: np.ndarray) -> np.ndarray:
+    """날짜 x 종목 세션 종가 (need인 칸만 조회, 캐시에 없는 점은 1회 일괄 다운로드, 없으면 NaN)"""
+    sessions = _session_matrix(tickers, dates)
+    rows, cols = np.nonzero(need & tickers.notna().to_numpy()[None, :])
+    closes = np.full(need.shape, np.nan)
+    if len(rows) == 0:
+        return closes
+    t = tickers.to_numpy()[cols]
+    s = sessions[rows, cols]
+    stored = price_store.get_session_closes(zip(t, s), fetch_session_closes, verbose=True)
+    closes[rows, cols] = stored.reindex(pd.MultiIndex.from_arrays([t, s])).to_numpy()
+    return closes
+
+
+def rebalancing_timeline(history: pd.DataFrame, market: bool = True, provider: str = None,
+                         threshold: float = 0.5) -> dict:
+    """
+    저장 이력 전체의 연속 스냅샷 쌍별 리밸런싱 (analyze_rebalancing과 같은 계산, 행렬 연산 1회)
+
+    Args:
+        history: PORTFOLIO_COLUMNS + '날짜' (ActiveETFMonitor.load_history 결과)
+        market: True면 세션 종가 기반 시장수익률 (없는 종목은 PDF 내재 가격), False면 PDF 내재 가격만
+        provider: security_master review 큐 라벨 (예: 'timefolio:22')
+        threshold: 비중 확대/축소 판정 기준 (%p)
+
+    Returns:
+        dict: {'수량', '평가금액', '비중': 날짜 x 종목 행렬,
+               '시장_수익률', '예상_비중', '순수_비중변화', '수량_변화': 금일 날짜 x 종목 행렬 (첫 날짜 제외),
+               '이벤트': 편입/편출/비중확대/비중축소 행 (날짜, 전일, 종목코드, 종목명, 구분, 순수_비중변화, ...),
+               '종목명': 종목코드 -> 종목명}
+    """
+    if history is None or history.empty:
+        return {}
+    p = pivot_history(history)
+    q, v, w = (p[c].to_numpy() for c in MATRIX_COLUMNS)
+    present = p['보유'].to_numpy()
+    dates, codes = p['수량'].index, p['수량'].columns
+    names = p['종목명']
+    cash = ((names == '현금') | (codes == '')).to_numpy()
+
+    q_prev, q_today = q[:-1], q[1:]
+    w_prev, w_today = w[:-1], w[1:]
+
+    # 1단계: 시장 수익률 (전일 보유 종목) - PDF 내재 가격 Fallback, 금일 수량 0이면 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        price = np.where(q > 0, v / q, 0.0)
+        pdf_ret = np.where((price[:-1] > 0) & (q_today > 0), price[1:] / price[:-1] - 1, 0.0)
+    ret = pdf_ret
+    if market and len(dates) > 1:
+        tickers = pd.Series(None, index=codes, dtype=object)
+        tickers[~cash] = security_master.resolve(pd.Series(codes[~cash]), names[~cash].to_numpy(),
+                                                 provider=provider).to_numpy()
+        # 전일 PDF 종목의 전일/금일 세션 종가만 조회
+        need = np.zeros_like(present)
+        need[:-1] |= present[:-1]
+        need[1:] |= present[:-1]
+        closes = _close_matrix(tickers, dates, need)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mkt_ret = np.where(closes[:-1] > 0, closes[1:] / closes[:-1] - 1,
+                               np.where(np.isnan(closes[:-1]), np.nan, 0.0))
+        ret = np.where(np.isnan(mkt_ret), pdf_ret, mkt_ret)
+    ret = np.where(cash[None, :] | ~present[:-1], 0.0, ret)
+
+    # 2~4단계: 가상 비중 → 정규화 → 순수 비중변화
+    virtual = w_prev * (1 + ret)
+    total = virtual.sum(axis=1, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        expected = np.where(total > 0, virtual / total * 100, 0.0)
+    pure = w_today - expected
+    dq = q_today - q_prev
+
+    # 이벤트 분류 (analyze_rebalancing 기준, 현금 제외, 두 날짜 중 한쪽 PDF에 있는 종목만)
+    in_pair = (present[:-1] | present[1:]) & ~cash[None, :]
+    both = (q_prev > 0) & (q_today > 0)
+    label = np.full(pure.shape, -1)
+    label[(dq > 0) & (pure > threshold) & both] = 2
+    label[(dq < 0) & (pure < -threshold) & both] = 3
+    label[(q_prev > 0) & (q_today == 0)] = 1
+    label[(q_prev == 0) & (q_today > 0)] = 0
+    rows, cols = np.nonzero((label >= 0) & in_pair)
+
+    events = pd.DataFrame({
+        '날짜': dates[1:][rows],
+        '전일': dates[:-1][rows],
+        '종목코드': codes[cols],
+        '종목명': names.to_numpy()[cols],
+        '구분': np.array(EVENT_LABELS, dtype=object)[label[rows, cols]],
+        '순수_비중변화': pure[rows, cols],
+        '비중_prev': w_prev[rows, cols],
+        '비중_today': w_today[rows, cols],
+        '수량_변화': dq[rows, cols],
+        '시장_수익률': ret[rows, cols],
+    })
+
+    def frame(m):
+        return pd.DataFrame(m, index=dates[1:], columns=codes)
+
+    print(f"[Timeline] {len(dates)}개 스냅샷, {len(codes)}개 종목, 이벤트 {len(events)}건")
+    return {
+        '수량': p['수량'], '평가금액': p['평가금액'], '비중': p['비중'],
+        '시장_수익률': frame(ret), '예상_비중': frame(expected), '순수_비중변화': frame(pure), '수량_변화': frame(dq),
+        '이벤트': events, '종목명': names,
+    }
+
+
+def monitor_timeline(monitor: ActiveETFMonitor, days: int = 250, market: bool = True) -> dict:
+    """최근 days개 저장 스냅샷의 리밸런싱 타임라인 (저장소 쿼리 1회)"""
+    history = monitor.load_history(days=days)
+    return rebalancing_timeline(history, market=market, provider=f"{monitor.PROVIDER}:{monitor.idx}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Active ETF 리밸런싱 타임라인 (저장된 PDF 이력 전체)")
+    parser.add_argument("--idx", required=True, help="타임폴리오 상품 idx")
+    parser.add_argument("--days", type=int, default=250, help="최근 스냅샷 수")
+    parser.add_argument("--no-market", action="store_true", help="시장 종가 없이 PDF 내재 가격만 사용")
+    args = parser.parse_args()
+
+    mon = ActiveETFMonitor(url=f"{ActiveETFMonitor.BASE_URL}?idx={args.idx}")
+    result = monitor_timeline(mon, args.days, market=not args.no_market)
+    if result:
+        print(result['이벤트'].sort_values(['날짜', '순수_비중변화'], ascending=[False, False]).to_string(index=False))
@@ -0,0 +1,211 @@
+"""
+Kenneth French Factor Mirror
+Fama-French 일별 팩터(SMB/HML, MOM)를 로컬 바이너리(.npy)로 미러링하는 모듈
+
+- 파싱된 시계열을 팩터당 .npy 하나(날짜 + 팩터 컬럼 구조화 배열)로 저장 → np.load(mmap_mode='r')로 즉시 로드
+- 갱신은 임시 파일 작성 후 rename 한 번으로 교체 → 동시 reader가 새 날짜/이전 값이 섞인 미러를 보지 않음
+- 갱신은 조건부 GET (ETag / Last-Modified) → 원본 파일이 바뀐 경우에만 다운로드
+- CHECK_INTERVAL 이내에는 네트워크 확인 자체를 생략
+"""
+
+import io
+import json
+import os
+import time
+import zipfile
+
+import numpy as np
+import pandas as pd
+from numpy.lib.recfunctions import structured_to_unstructured
+
+import http_client
+
+FACTOR_DIR = os.environ.get("FACTOR_STORE_DIR", os.path.join("data", "factors"))
+
+# 원본 파일 변경 여부 확인 주기 (초)
+CHECK_INTERVAL = 12 * 3600
+
+BASE_URL = "https://mba.tuck.dartmouth.edu/pages/faculty/ken.french/ftp/"
+
+# name -> (zip file, columns to keep)
+DATASETS = {
+    'ff3': ("F-F_Research_Data_Factors_daily_CSV.zip", ['SMB', 'HML']),
+    'mom': ("F-F_Momentum_Factor_daily_CSV.zip", ['Mom']),
+}
+
+
+def _paths(name):
+    base = os.path.join(FACTOR_DIR, name)
+    return base + ".npy", base + "_meta.json"
+
+
+def _legacy_paths(name):
+    """Earlier layout: separate dates / values arrays"""
+    base = os.path.join(FACTOR_DIR, name)
+    return base + "_dates.npy", base + "_values.npy"
+
+
+def _read_meta(name):
+    meta_path = _paths(name)[1]
+    if not os.path.exists(meta_path):
+        return {}
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (ValueError, OSError):
+        return {}
+
+
+def _write_meta(name, meta):
+    meta_path = _paths(name)[1]
+    tmp = meta_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp, meta_path)
+
+
+def parse_french_csv(raw, columns):
+    """
+    Parse a French-library daily CSV in one pass.
+    The data block starts after a free-text preamble: its header is the line right
+    before the first row whose first field is an 8-digit date (YYYYMMDD), and it ends
+    at the first non-date row (copyright footer / annual section).
+    Returns DataFrame indexed by Date with `columns` converted from percent to decimals.
+    """
+    lines = raw.decode('utf-8', 'ignore').splitlines()
+
+    start = None
+    for i, line in enumerate(lines):
+        first = line.split(',', 1)[0].strip()
+        if len(first) == 8 and first.isdigit():
+            start = i
+            break
+    if start is None:
+        raise ValueError("No daily rows found in factor file")
+
+    end = start
+    while end < len(lines):
+        first = lines[end].split(',', 1)[0].strip()
+        if not (len(first) == 8 and first.isdigit()):
+            break
+        end += 1
+
+    header = lines[start - 1] if start > 0 else ""
+    names = [c.strip() for c in header.split(',')]
+    names[0] = 'Date'
+
+    df = pd.read_csv(io.StringIO("\n".join(lines[start:end])), header=None, names=names)
+    df['Date'] = pd.to_datetime(df['Date'].astype(str), format='%Y%m%d', errors='coerce')
+    df = df.dropna(subset=['Date']).set_index('Date')
+
+    cols = [c for c in columns if c in df.columns] or [df.columns[0]]
+    return df[cols].astype(float) / 100.0
+
+
+def _save_arrays(name, df):
+    os.makedirs(FACTOR_DIR, exist_ok=True)
+    path = _paths(name)[0]
+
+    # One record per date: dates and factor columns live in one file, swapped in with one rename
+    arr = np.empty(len(df), dtype=[('Date', 'datetime64[D]')] + [(str(c), np.float64) for c in df.columns])
+    arr['Date'] = df.index.values.astype('datetime64[D]')
+    for c in df.columns:
+        arr[str(c)] = df[c].to_numpy(dtype=np.float64)
+
+    tmp = path + ".tmp.npy"
+    np.save(tmp, arr)
+    os.replace(tmp, path)
+
+    for legacy in _legacy_paths(name):
+        if os.path.exists(legacy):
+            os.remove(legacy)
+
+
+def _load_arrays(name, columns=None):
+    path = _paths(name)[0]
+    if not os.path.exists(path):
+        return _migrate_legacy(name, columns)
+    arr = np.load(path, mmap_mode='r')
+    names = list(arr.dtype.names[1:])
+    index = pd.DatetimeIndex(np.asarray(arr['Date']).astype('datetime64[ns]'), name='Date')
+    # Factor fields share one dtype: a strided view on the memory map (no copy)
+    values = structured_to_unstructured(arr[names], copy=False)
+    return pd.DataFrame(values, index=index, columns=names, copy=False)
+
+
+def _migrate_legacy(name, columns):
+    """Rewrite a mirror saved in the earlier two-file layout (served offline until the next download)."""
+    dates_path, values_path = _legacy_paths(name)
+    if not (columns and os.path.exists(dates_path) and os.path.exists(values_path)):
+        return None
+    dates = np.load(dates_path)
+    values = np.load(values_path)
+    if len(dates) != len(values):
+        return None
+    _save_arrays(name, pd.DataFrame(values, index=pd.DatetimeIndex(dates.astype('datetime64[ns]')),
+                                    columns=columns))
+    return _load_arrays(name)
+
+
+def refresh(name, force=False):
+    """
+    Bring the local mirror of `name` up to date.
+    Sends a conditional GET (If-None-Match / If-Modified-Since); a 304 only touches the metadata.
+    Returns True if a new file was downloaded and parsed.
+    """
+    filename, columns = DATASETS[name]
+    meta = _read_meta(name)
+
+    if not force and meta and time.time() - meta.get('checked_at', 0) < CHECK_INTERVAL:
+        return False
+
+    headers = {"User-Agent": "Mozilla/5.0"}
+    has_mirror = os.path.exists(_paths(name)[0])
+    if has_mirror and meta.get('etag'):
+        headers['If-None-Match'] = meta['etag']
+    if has_mirror and meta.get('last_modified'):
+        headers['If-Modified-Since'] = meta['last_modified']
+
+    r = http_client.get(BASE_URL + filename, headers=headers, timeout=15)
+
+    if r.status_code == 304 and has_mirror:
+        meta['checked_at'] = time.time()
+        _write_meta(name, meta)
+        return False
+
+    if r.status_code != 200:
+        raise ValueError(f"Factor download failed ({name}): HTTP {r.status_code}")
+
+    with zipfile.ZipFile(io.BytesIO(r.content)) as z:
+        csv_filename = [f for f in z.namelist() if f.lower().endswith('.csv')][0]
+        df = parse_french_csv(z.read(csv_filename), columns)
+
+    _save_arrays(name, df)
+    _write_meta(name, {
+        'columns': list(df.columns),
+        'etag': r.headers.get('ETag'),
+        'last_modified': r.headers.get('Last-Modified'),
+        'checked_at': time.time(),
+        'rows': len(df),
+        'last_date': df.index[-1].strftime("%Y-%m-%d") if len(df) else None,
+    })
+    return True
+
+
+def load_factors(name):
+    """
+    Return the mirrored factor DataFrame (memory-mapped), refreshing it first if due.
+    If the refresh fails, the existing mirror is served; returns None if there is none.
+    """
+    try:
+        refresh(name)
+    except Exception as e:
+        print(f"[FactorStore] Refresh failed ({name}): {e}")
+
+    meta = _read_meta(name)
+    columns = meta.get('columns') or DATASETS[name][1]
+    try:
+        return _load_arrays(name, columns)
+    except Exception as e:
+        print(f"[FactorStore] Load failed ({name}): {e}")
+        return None
@@ -0,0 +1,108 @@
+"""
+Shared HTTP Client
+모든 크롤러/데이터 수집 모듈이 공유하는 커넥션 풀 기반 HTTP 클라이언트
+
+- 호스트별 keep-alive 커넥션 풀 (api.nasdaq.com, query2.finance.yahoo.com 등)
+- 통일된 timeout / retry 정책
+- SSL 검증 비활성화 (사내망 환경 대응)
+"""
+
+import os
+import threading
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+# ---------------------------------------------------------
+# Config (환경변수로 재정의 가능)
+# ---------------------------------------------------------
+POOL_CONNECTIONS = int(os.environ.get("HTTP_POOL_CONNECTIONS", 16))  # 캐시할 호스트 풀 개수
+POOL_MAXSIZE = int(os.environ.get("HTTP_POOL_MAXSIZE", 32))          # 호스트당 최대 커넥션 수
+DEFAULT_TIMEOUT = float(os.environ.get("HTTP_TIMEOUT", 10))
+MAX_RETRIES = int(os.environ.get("HTTP_RETRIES", 2))
+BACKOFF_FACTOR = float(os.environ.get("HTTP_BACKOFF", 0.3))
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+}
+
+_session = None
+_lock = threading.Lock()
+
+
+def _build_session(pool_connections, pool_maxsize, max_retries, backoff_factor):
+    retry = Retry(
+        total=max_retries,
+        connect=max_retries,
+        read=max_retries,
+        status=max_retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUS,
+        allowed_methods=frozenset(['GET', 'POST', 'HEAD']),
+        raise_on_status=False,  # 최종 응답은 호출자가 status_code로 판단
+    )
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry)
+
+    session = requests.Session()
+    session.verify = False
+    session.headers.update(DEFAULT_HEADERS)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def configure(pool_connections=None, pool_maxsize=None, max_retries=None, backoff_factor=None, timeout=None):
+    """
+    Rebuild the shared session with new pool / retry settings.
+    Call once at startup (e.g. before a large Batch Run) to size the pools.
+    """
+    global _session, POOL_CONNECTIONS, POOL_MAXSIZE, MAX_RETRIES, BACKOFF_FACTOR, DEFAULT_TIMEOUT
+
+    with _lock:
+        if pool_connections is not None: POOL_CONNECTIONS = pool_connections
+        if pool_maxsize is not None: POOL_MAXSIZE = pool_maxsize
+        if max_retries is not None: MAX_RETRIES = max_retries
+        if backoff_factor is not None: BACKOFF_FACTOR = backoff_factor
+        if timeout is not None: DEFAULT_TIMEOUT = timeout
+
+        old = _session
+        _session = _build_session(POOL_CONNECTIONS, POOL_MAXSIZE, MAX_RETRIES, BACKOFF_FACTOR)
+
+    if old is not None:
+        old.close()
+    return _session
+
+
+def get_session():
+    """
+    Return the process-wide pooled session (lazily created, thread-safe).
+    Also suitable for `yf.Ticker(..., session=...)` / `yf.download(..., session=...)`.
+    """
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                _session = _build_session(POOL_CONNECTIONS, POOL_MAXSIZE, MAX_RETRIES, BACKOFF_FACTOR)
+    return _session
+
+
+def request(method, url, timeout=None, **kwargs):
+    """
+    Issue a request through the shared pool.
+    `headers` are merged on top of the session defaults; timeout defaults to DEFAULT_TIMEOUT.
+    """
+    kwargs.setdefault('verify', False)
+    return get_session().request(method, url, timeout=timeout or DEFAULT_TIMEOUT, **kwargs)
+
+
+def get(url, **kwargs):
+    return request('GET', url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request('POST', url, **kwargs)
@@ -0,0 +1,138 @@
+"""
+Idio Score Nightly Precompute
+universe_stocks.csv 전체 종목의 Idio Score를 미국장 마감 후 일괄 계산해 score_store에 저장하는 배치
+
+- 기준일(as_of): 현재 시각(뉴욕) 기준 마감된 마지막 NYSE 세션
+- 기본: idio_state.run_batch (종목별 회귀 상태에 새 거래일만 반영 후 점수 계산, 이력 길이와 무관) → basis 'ex_ante'
+- --refit: logic_idio.run_idio_batch (전체 기간 재적합 + Delta Score 부트스트랩) → basis 'full_sample'
+- 결과는 (ticker, as_of) 행으로 저장
+- 같은 기준일에 이미 저장된 종목은 건너뜀 → 중단 후 재실행 시 이어서 계산 (--force로 전체 재계산)
+- 대시보드는 저장된 최신 행을 바로 읽고, 표에 없는 종목만 on-demand 계산
+
+사용 예 (cron, 평일 미국 동부 17:30):
+    30 17 * * 1-5  cd /path/to/app && python idio_precompute.py
+    python idio_precompute.py --tickers AAPL NVDA TSLA --force
+    python idio_precompute.py --refit --force   # 전체 기간 재적합 (부트스트랩 신뢰구간 포함)
+"""
+
+import argparse
+from datetime import datetime
+
+import pandas as pd
+import pytz
+
+import idio_state
+import logic_idio
+import score_store
+import trading_calendar
+
+NY = pytz.timezone('America/New_York')
+# 정규장 마감 (미국 동부) 이후를 당일 세션 확정으로 간주
+US_CLOSE_HOUR = 16
+# 이 종목 수마다 중간 저장
+SAVE_EVERY = 50
+
+
+def last_closed_session(now: datetime = None) -> pd.Timestamp:
+    """마감된 마지막 NYSE 세션 (장중/개장 전이면 직전 세션)"""
+    now = now.astimezone(NY) if now is not None else datetime.now(NY)
+    calendar = trading_calendar.get_calendar('NYSE')
+    today = pd.Timestamp(now.date())
+    if calendar.is_session(today) and now.hour >= US_CLOSE_HOUR:
+        return today
+    return calendar.previous_session(today)
+
+
+def result_row(ticker: str, res: dict) -> dict:
+    """run_idio_batch / idio_state.run_batch 결과 dict -> score_store 행"""
+    betas = res.get('Betas') or {}
+    return {
+        'ticker': ticker,
+        'delta_score': res.get('Raw Score'),
+        'delta_ci_low': res.get('Delta_CI_Low'),
+        'delta_ci_high': res.get('Delta_CI_High'),
+        'delta_p_value': res.get('Delta_P_Value'),
+        'gs_incl': res.get('GS_Score_Incl'),
+        'gs_excl': res.get('GS_Score_Excl'),
+        'mean_incl': res.get('Avg Daily Returns'),
+        'vol_incl': res.get('Daily Volatility'),
+        'mean_excl': res.get('Mean_Excl'),
+        'vol_excl': res.get('Vol_Excl'),
+        'beta_market': betas.get('Market'),
+        'beta_sector': betas.get('Sector'),
+        'beta_smb': betas.get('SMB'),
+        'beta_hml': betas.get('HML'),
+        'beta_mom': betas.get('MOM'),
+        'event_count': res.get('Event_Count'),
+        'events_matched': res.get('Events_Matched'),
+        'status': res.get('Status'),
+        'basis': res.get('Basis', 'full_sample'),
+    }
+
+
+def score_and_store(tickers: list, sector_map: dict = None, as_of=None, progress=None,
+                    refit: bool = False) -> pd.DataFrame:
+    """
+    Score tickers and write every result (failures included) under as_of.
+    refit=False: incremental state (idio_state.run_batch, new bars only, basis 'ex_ante');
+    refit=True: full refit with bootstrap intervals (run_idio_batch, basis 'full_sample').
+    progress: progress(done, total, ticker, result_dict) callback (optional)
+    Returns the written rows.
+    """
+    as_of = as_of if as_of is not None else last_closed_session()
+    if refit:
+        results = logic_idio.run_idio_batch(tickers, sector_map, bootstrap=logic_idio.BOOTSTRAP_REPS)
+    else:
+        results = idio_state.run_batch(tickers, sector_map)
+    rows, pending = [], []
+    for done, (t, res) in enumerate(results, 1):
+        rows.append(result_row(t, res))
+        pending.append(rows[-1])
+        if progress:
+            progress(done, len(tickers), t, res)
+        # 중간 저장: 중단되어도 계산된 종목은 남김
+        if len(pending) >= SAVE_EVERY:
+            score_store.save(as_of, pd.DataFrame(pending))
+            pending = []
+    score_store.save(as_of, pd.DataFrame(pending))
+    return pd.DataFrame(rows)
+
+
+def precompute(tickers: list = None, as_of=None, force: bool = False, progress=None, refit: bool = False) -> dict:
+    """
+    Nightly run over the universe (or the given tickers), incremental unless refit=True.
+
+    Returns:
+        dict: {'as_of', 'scored', 'failed', 'skipped'}
+    """
+    as_of = pd.Timestamp(as_of) if as_of is not None else last_closed_session()
+    universe = logic_idio.load_universe()
+    sector_map = dict(zip(universe['Ticker'], universe['Sector']))
+    if tickers is None:
+        tickers = universe['Ticker'].tolist()
+    tickers = list(dict.fromkeys(tickers))
+
+    # 같은 기준일이라도 다른 basis 행(대시보드 Full Sample 계산 등)은 완료로 보지 않음
+    basis = 'full_sample' if refit else idio_state.BASIS
+    done = set() if force else score_store.scored_tickers(as_of, basis=basis)
+    targets = [t for t in tickers if t not in done]
+    print(f"[Precompute] 기준일 {as_of.date()}: {len(tickers)}종목 중 계산 대상 {len(targets)} (건너뜀 {len(tickers) - len(targets)})")
+
+    rows = score_and_store(targets, sector_map, as_of, progress, refit) if targets else pd.DataFrame()
+    ok = int((rows['status'] == 'Success').sum()) if not rows.empty else 0
+    summary = {'as_of': as_of, 'scored': ok, 'failed': len(rows) - ok, 'skipped': len(tickers) - len(targets)}
+    print(f"[Precompute] 완료: 성공 {summary['scored']}, 실패 {summary['failed']}")
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Idio Score 유니버스 야간 사전 계산")
+    parser.add_argument("--tickers", nargs="*", default=None, help="계산할 종목 (기본값: universe_stocks.csv 전체)")
+    parser.add_argument("--as-of", default=None, help="기준일 (YYYY-MM-DD, 기본값: 마감된 마지막 NYSE 세션)")
+    parser.add_argument("--force", action="store_true", help="이미 저장된 종목도 다시 계산")
+    parser.add_argument("--refit", action="store_true",
+                        help="증분 상태 대신 전체 기간 재적합 (in-sample 베타 + 부트스트랩 신뢰구간)")
+    args = parser.parse_args()
+
+    precompute(args.tickers, as_of=args.as_of, force=args.force, refit=args.refit,
+               progress=lambda done, total, t, res: print(f"  [{done}/{total}] {t}: {res['Status']}"))
@@ -0,0 +1,353 @@
+"""
+Incremental Idio Regression State
+종목별 회귀 충분통계량을 SQLite에 저장해 새 거래일만 반영하는 증분 업데이트 모듈
+
+- 상태: 가중 X'X, X'y, 처리한 관측치 수, 마지막 처리일, ex-ante 잔차의 누적 모멘트 (sum|e|, sum e, sum e^2, n)
+- 하루 추가 = rank-one 업데이트 O(p^2) (+ 롤링 모드는 빠지는 날 다운데이트) → 이력 길이와 무관
+- 잔차는 전날까지의 베타로 계산 (point-in-time) → 한 번 기록된 잔차는 이후 변하지 않아 누적 모멘트가 정확
+  (전체 기간 in-sample 베타는 새 관측치마다 과거 잔차가 모두 바뀌므로 증분 갱신이 불가능)
+- Exclusive 통계 = 전체 누적 모멘트 - 실적 구간(T-2..T+2) 날짜들의 잔차 합 (이벤트 수에 비례하는 조회 한 번)
+- 모드: expanding (전체 누적), EW (halflife), Rolling (window) — logic_idio.rls_betas 와 같은 베타/잔차
+- run_batch(): 야간 사전 계산(idio_precompute)과 Batch Run의 점수 계산 경로 (score_store basis 'ex_ante')
+"""
+
+import os
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+import logic_event
+import sqlite_store
+
+DB_PATH = os.environ.get("IDIO_STATE_PATH", os.path.join("data", "idio_state.sqlite"))
+
+FACTORS = ['Market', 'Sector', 'SMB', 'HML', 'MOM']
+# 잔차 계산 시작 전 최소 관측치 (logic_idio.RLS_MIN_OBS 와 동일)
+MIN_OBS = 60
+# score_store basis: 전날까지의 베타로 계산한 잔차 (in-sample 전체 기간 베타와 다름)
+BASIS = 'ex_ante'
+
+
+def _init_schema(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS state (
+            ticker     TEXT NOT NULL,
+            mode       TEXT NOT NULL,
+            factors    TEXT NOT NULL,
+            last_date  TEXT NOT NULL,
+            n_obs      INTEGER NOT NULL,
+            xtx        BLOB NOT NULL,
+            xty        BLOB NOT NULL,
+            sum_abs    REAL NOT NULL,
+            sum_e      REAL NOT NULL,
+            sum_sq     REAL NOT NULL,
+            n_resid    INTEGER NOT NULL,
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (ticker, mode)
+        ) WITHOUT ROWID
+    """)
+    # 일별 관측치 (롤링 다운데이트용 x, y) + ex-ante 잔차 (warm-up 구간은 NULL)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS days (
+            ticker TEXT NOT NULL,
+            mode   TEXT NOT NULL,
+            date   TEXT NOT NULL,
+            x      BLOB NOT NULL,
+            y      REAL NOT NULL,
+            resid  REAL,
+            PRIMARY KEY (ticker, mode, date)
+        ) WITHOUT ROWID
+    """)
+
+
+def _connect():
+    """Per-thread SQLite connection (universe refresh workers write concurrently)."""
+    return sqlite_store.connect(DB_PATH, _init_schema)
+
+
+def mode_key(window=None, halflife=None) -> str:
+    """'expanding' / 'roll252' / 'ew63'"""
+    if window:
+        return f"roll{int(window)}"
+    if halflife:
+        return f"ew{int(halflife)}"
+    return "expanding"
+
+
+class _State:
+    """One ticker's sufficient statistics for one beta mode."""
+
+    def __init__(self, factors, p):
+        self.factors = factors
+        self.last_date = None
+        self.n_obs = 0
+        self.xtx = np.zeros((p, p))
+        self.xty = np.zeros(p)
+        self.moments = np.zeros(4)  # sum|e|, sum e, sum e^2, n
+
+    def beta(self):
+        return np.linalg.pinv(self.xtx) @ self.xty
+
+
+def _load(ticker, mode):
+    row = _connect().execute(
+        "SELECT factors, last_date, n_obs, xtx, xty, sum_abs, sum_e, sum_sq, n_resid "
+        "FROM state WHERE ticker = ? AND mode = ?", (ticker, mode)
+    ).fetchone()
+    if row is None:
+        return None
+    factors = row[0].split(',')
+    p = len(factors) + 1
+    st = _State(factors, p)
+    st.last_date = pd.Timestamp(row[1])
+    st.n_obs = row[2]
+    st.xtx = np.frombuffer(row[3], dtype=np.float64).reshape(p, p).copy()
+    st.xty = np.frombuffer(row[4], dtype=np.float64).copy()
+    st.moments = np.array(row[5:9], dtype=float)
+    return st
+
+
+def reset(ticker: str, window=None, halflife=None):
+    """Drop a ticker's state (next update rebuilds it from the full history)."""
+    mode = mode_key(window, halflife)
+    conn = _connect()
+    with conn:
+        conn.execute("DELETE FROM state WHERE ticker = ? AND mode = ?", (ticker, mode))
+        conn.execute("DELETE FROM days WHERE ticker = ? AND mode = ?", (ticker, mode))
+
+
+def update(ticker: str, df: pd.DataFrame, window=None, halflife=None, min_obs: int = MIN_OBS) -> int:
+    """
+    Append the bars of df after the stored last date (rank-one update per new bar).
+
+    df: enriched market data (Stock + factor columns, DatetimeIndex), as for calculate_idio_score.
+    The state is rebuilt from df when it is missing or the factor set changed.
+    Returns the number of bars processed.
+    """
+    mode = mode_key(window, halflife)
+    factors = [c for c in FACTORS if c in df.columns]
+    if not factors:
+        return 0
+    data = df[['Stock'] + factors].dropna()
+    if data.index.tz is not None:
+        data = data.tz_localize(None)
+    data.index = data.index.normalize()
+
+    st = _load(ticker, mode)
+    if st is not None and st.factors != factors:
+        reset(ticker, window, halflife)
+        st = None
+    if st is None:
+        st = _State(factors, len(factors) + 1)
+    else:
+        data = data[data.index > st.last_date]
+    if data.empty:
+        return 0
+
+    lam = 0.5 ** (1.0 / halflife) if (halflife and not window) else 1.0
+    p = len(factors) + 1
+    n0 = max(min_obs or 0, p + 1)
+    if window:
+        n0 = min(n0, window)
+
+    # Rolling mode: the last `window` bars (x, y), to downdate the bar leaving the window
+    tail = deque(_tail(ticker, mode, window), maxlen=window + 1) if window else None
+
+    X = np.hstack([np.ones((len(data), 1)), data[factors].to_numpy(dtype=float)])
+    y = data['Stock'].to_numpy(dtype=float)
+    rows = []
+    for i, d in enumerate(data.index):
+        x = X[i]
+        resid = None
+        if st.n_obs >= n0:
+            # Ex-ante residual: betas from the days before
+            resid = float(y[i] - x @ st.beta())
+            st.moments += (abs(resid), resid, resid * resid, 1.0)
+
+        st.xtx = lam * st.xtx + np.outer(x, x)
+        st.xty = lam * st.xty + x * y[i]
+        st.n_obs += 1
+        rows.append((ticker, mode, d.strftime("%Y-%m-%d"), x.tobytes(), float(y[i]), resid))
+
+        if window:
+            tail.append((x, y[i]))
+            if len(tail) > window:
+                x_old, y_old = tail.popleft()
+                st.xtx -= np.outer(x_old, x_old)
+                st.xty -= x_old * y_old
+            if st.n_obs % window == 0:
+                # Periodic exact re-seed on the window (bounds subtraction drift)
+                xs = np.array([b[0] for b in tail])
+                st.xtx = xs.T @ xs
+                st.xty = xs.T @ np.array([b[1] for b in tail])
+
+    st.last_date = data.index[-1]
+    conn = _connect()
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO days (ticker, mode, date, x, y, resid) VALUES (?, ?, ?, ?, ?, ?)", rows)
+        conn.execute(
+            "INSERT OR REPLACE INTO state (ticker, mode, factors, last_date, n_obs, xtx, xty, "
+            "sum_abs, sum_e, sum_sq, n_resid, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (ticker, mode, ','.join(factors), st.last_date.strftime("%Y-%m-%d"), st.n_obs,
+             st.xtx.tobytes(), st.xty.tobytes(), *map(float, st.moments[:3]), int(st.moments[3]), time.time())
+        )
+    return len(data)
+
+
+def _tail(ticker, mode, n):
+    """Last n stored bars as [(x, y)] in date order."""
+    rows = _connect().execute(
+        "SELECT x, y FROM days WHERE ticker = ? AND mode = ? ORDER BY date DESC LIMIT ?", (ticker, mode, n)
+    ).fetchall()
+    return [(np.frombuffer(x, dtype=np.float64), y) for x, y in reversed(rows)]
+
+
+def _event_window_dates(ticker, mode, event_sessions, window):
+    """
+    Stored dates inside every event window, positioned on the ticker's own rows like
+    logic_event.event_window_mask (events must fall on a stored date). Two index seeks per event.
+    Returns (sorted dates, number of events matched).
+    """
+    conn = _connect()
+    dates = set()
+    matched = 0
+    for d in pd.DatetimeIndex(event_sessions).dropna().normalize().unique():
+        day = d.strftime("%Y-%m-%d")
+        after = conn.execute(
+            "SELECT date FROM days WHERE ticker = ? AND mode = ? AND date >= ? ORDER BY date LIMIT ?",
+            (ticker, mode, day, window[1] + 1)
+        ).fetchall()
+        if not after or after[0][0] != day:
+            continue
+        matched += 1
+        before = conn.execute(
+            "SELECT date FROM days WHERE ticker = ? AND mode = ? AND date < ? ORDER BY date DESC LIMIT ?",
+            (ticker, mode, day, -window[0])
+        ).fetchall()
+        dates.update(r[0] for r in after + before)
+    return sorted(dates), matched
+
+
+def score(ticker: str, window=None, halflife=None, event_sessions=None, event_window=logic_event.EVENT_WINDOW):
+    """
+    Current betas and Inclusive / Exclusive efficiency from the stored state.
+
+    event_sessions: earnings dates on trading sessions (fetched from the earnings store when None).
+    Returns dict with the calculate_idio_score comp_stats keys (GS_Score_Incl/Excl, Delta_Score,
+    Mean/Vol Incl/Excl, Event_Count, Events_Matched), 'Betas', 'Last_Date', 'Obs'
+    — or None if the ticker has no state.
+    """
+    mode = mode_key(window, halflife)
+    st = _load(ticker, mode)
+    if st is None:
+        return None
+
+    if event_sessions is None:
+        import logic_sweep
+        try:
+            event_sessions = logic_sweep._event_sessions(ticker)
+        except Exception as e:
+            print(f"Earnings Date Error: {e}")
+            event_sessions = pd.DatetimeIndex([])
+
+    in_event = np.zeros(4)
+    event_sessions = pd.DatetimeIndex(event_sessions).dropna()
+    dates, matched = _event_window_dates(ticker, mode, event_sessions, event_window)
+    if dates:
+        conn = _connect()
+        # 이벤트 구간 날짜 수만큼만 조회 (SQLite 변수 수 제한 고려해 나눠서)
+        for i in range(0, len(dates), 500):
+            chunk = dates[i:i + 500]
+            row = conn.execute(
+                f"SELECT SUM(ABS(resid)), SUM(resid), SUM(resid * resid), COUNT(resid) FROM days "
+                f"WHERE ticker = ? AND mode = ? AND date IN ({', '.join('?' * len(chunk))})",
+                [ticker, mode] + chunk
+            ).fetchone()
+            in_event += np.nan_to_num(np.array(row, dtype=float))
+
+    incl = st.moments
+    excl = incl - in_event
+    score_incl, mu_incl, sigma_incl = (float(v) for v in logic_event.gs_score(*incl))
+    if excl[3] > 0:
+        score_excl, mu_excl, sigma_excl = (float(v) for v in logic_event.gs_score(*excl))
+    else:
+        score_excl, mu_excl, sigma_excl = score_incl, mu_incl, sigma_incl
+
+    beta = st.beta()
+    return {
+        'GS_Score_Incl': score_incl,
+        'GS_Score_Excl': score_excl,
+        'Delta_Score': score_incl - score_excl,
+        'Mean_Incl': mu_incl,
+        'Vol_Incl': sigma_incl,
+        'Mean_Excl': mu_excl,
+        'Vol_Excl': sigma_excl,
+        'Event_Count': len(event_sessions.normalize().unique()),
+        'Events_Matched': matched,
+        'Betas': dict(zip(['Intercept'] + st.factors, map(float, beta))),
+        'Last_Date': st.last_date,
+        'Obs': int(incl[3]),
+    }
+
+
+def result(res: dict, added: int) -> dict:
+    """score() dict -> logic_idio.run_idio_batch result format (no bootstrap interval on this basis)"""
+    return {
+        'Raw Score': res['Delta_Score'],
+        'Avg Daily Returns': res['Mean_Incl'],
+        'Daily Volatility': res['Vol_Incl'],
+        'GS_Score_Incl': res['GS_Score_Incl'],
+        'GS_Score_Excl': res['GS_Score_Excl'],
+        'Mean_Excl': res['Mean_Excl'],
+        'Vol_Excl': res['Vol_Excl'],
+        'Event_Count': res['Event_Count'],
+        'Events_Matched': res['Events_Matched'],
+        'Betas': res['Betas'],
+        'Last_Date': res['Last_Date'],
+        'Bars_Added': added,
+        'Basis': BASIS,
+        'Status': 'Success',
+    }
+
+
+def run_batch(tickers, sector_map=None, window=None, halflife=None, max_workers=8):
+    """
+    Daily universe update: fetch inputs concurrently (same stage as run_idio_batch),
+    append each ticker's new bars and score from the state (no refit over the history).
+    Yields (ticker, result_dict) in completion order, in the run_idio_batch result format
+    (+ 'Bars_Added', 'Last_Date', 'Basis'); failures carry 'Status' like run_idio_batch.
+    """
+    import logic_idio
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    sector_map = sector_map or {}
+    tickers = list(dict.fromkeys(tickers))
+    if not tickers:
+        return
+
+    empty = {'Raw Score': 0.0, 'Avg Daily Returns': 0.0, 'Daily Volatility': 0.0, 'Basis': BASIS}
+
+    def _one(t):
+        m_data = logic_idio._fetch_batch_inputs(t, sector_map.get(t, '지수'))
+        if m_data is None or m_data.empty:
+            return dict(empty, Status='Data Fail')
+        added = update(t, m_data, window, halflife)
+        res = score(t, window, halflife)
+        if res is None:
+            return dict(empty, Status='No State')
+        return result(res, added)
+
+    logic_idio.get_factor_panel()
+    workers = max(1, min(max_workers, len(tickers)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(_one, t): t for t in tickers}
+        for future in as_completed(futures):
+            t = futures[future]
+            try:
+                yield t, future.result()
+            except Exception as e:
+                print(f"[IdioState] {t}: {e}")
+                yield t, dict(empty, Status=f'Error: {str(e)}')
@@ -0,0 +1,124 @@
+"""
+Batched Factor Regression
+여러 종목의 팩터 회귀(OLS)를 한 번에 푸는 모듈
+
+- 종목 수익률 행렬 Y (날짜 x 종목)를 공통 팩터 행렬 X로 한 번에 회귀
+- 결측이 없는 종목: X를 한 번 QR 분해 → 모든 종목을 한 번의 삼각 시스템 풀이로
+- 결측이 있는 종목: 종목별 마스크 가중 Gram 행렬 (k x p x p)을 배치로 풀이
+- 섹터 팩터는 종목마다 다르므로 섹터(ETF)별로 그룹을 나눠 그룹마다 X를 구성
+"""
+
+import numpy as np
+import pandas as pd
+
+# 종목당 최소 관측치 (이보다 적으면 베타/잔차 NaN)
+MIN_OBS = 30
+
+
+def _solve_masked(X, Y, min_obs=MIN_OBS):
+    """
+    OLS of every column of Y on X with per-column missing-data masks.
+
+    X: (T, p) design matrix (rows with any NaN are unusable for every column)
+    Y: (T, k) responses (NaN = missing for that column only)
+    Returns B (p, k) coefficients and E (T, k) residuals (NaN outside each column's mask).
+    """
+    T, p = X.shape
+    k = Y.shape[1]
+    B = np.full((p, k), np.nan)
+    E = np.full((T, k), np.nan)
+    if k == 0:
+        return B, E
+
+    row_ok = np.isfinite(X).all(axis=1)
+    mask = np.isfinite(Y) & row_ok[:, None]
+    need = max(min_obs, p)
+
+    # 1. Columns observed on every usable row: one QR of the shared X
+    full = mask[row_ok].all(axis=0) & (row_ok.sum() >= need)
+    if full.any():
+        Xv = X[row_ok]
+        Yv = Y[row_ok][:, full]
+        try:
+            Q, R = np.linalg.qr(Xv)
+            B[:, full] = np.linalg.solve(R, Q.T @ Yv)
+        except np.linalg.LinAlgError:
+            # Rank-deficient X (e.g. constant factor): minimum-norm solution
+            B[:, full] = np.linalg.lstsq(Xv, Yv, rcond=None)[0]
+
+    # 2. Columns with their own gaps: batched masked normal equations
+    partial = ~mask[row_ok].all(axis=0)
+    partial &= mask.sum(axis=0) >= need
+    if partial.any():
+        Xz = np.where(row_ok[:, None], X, 0.0)
+        W = mask[:, partial].astype(float)
+        Yz = np.where(mask[:, partial], Y[:, partial], 0.0)
+
+        G = np.einsum('tk,ti,tj->kij', W, Xz, Xz)  # (k, p, p)
+        b = (Xz.T @ Yz).T                          # (k, p)
+        try:
+            B[:, partial] = np.linalg.solve(G, b[..., None])[..., 0].T
+        except np.linalg.LinAlgError:
+            B[:, partial] = (np.linalg.pinv(G) @ b[..., None])[..., 0].T
+
+    fitted = np.where(row_ok[:, None], X, 0.0) @ np.nan_to_num(B)
+    E = np.where(mask & np.isfinite(B).all(axis=0), Y - fitted, np.nan)
+    return B, E
+
+
+def fit_factor_panel(returns, factors, sector_returns=None, sector_of=None,
+                     add_intercept=True, min_obs=MIN_OBS):
+    """
+    Regress many stocks on shared factors (+ a per-stock sector factor) in batched NumPy calls.
+
+    Args:
+        returns: DataFrame (Date x Ticker) of stock returns; NaN = missing
+        factors: DataFrame (Date x Factor) shared by all tickers (e.g. Market, SMB, HML, MOM)
+        sector_returns: DataFrame (Date x SectorKey) of sector factor returns (optional)
+        sector_of: dict Ticker -> SectorKey; tickers not in it are fit without a Sector column
+        add_intercept: include an 'Intercept' column (sklearn LinearRegression default)
+        min_obs: minimum usable observations per ticker
+
+    Returns:
+        betas: DataFrame (Ticker x ['Intercept', *factors, 'Sector']), NaN where not fit / not used
+        residuals: DataFrame (Date x Ticker) aligned to returns.index, NaN outside each ticker's sample
+    """
+    returns = returns.astype(float)
+    index = returns.index
+    tickers = list(returns.columns)
+
+    factors = factors.reindex(index).astype(float)
+    factor_cols = list(factors.columns)
+    sector_of = sector_of or {}
+    use_sector = sector_returns is not None and any(t in sector_of for t in tickers)
+
+    out_cols = (['Intercept'] if add_intercept else []) + factor_cols + (['Sector'] if use_sector else [])
+    betas = np.full((len(tickers), len(out_cols)), np.nan)
+    resid = np.full(returns.shape, np.nan)
+
+    # Group tickers by sector key: each group shares one design matrix
+    groups = {}
+    for j, t in enumerate(tickers):
+        key = sector_of.get(t) if use_sector else None
+        if key is not None and key not in sector_returns.columns:
+            key = None
+        groups.setdefault(key, []).append(j)
+
+    base = [np.ones((len(index), 1))] if add_intercept else []
+    base.append(factors.values)
+    Y_all = returns.values
+
+    for key, cols in groups.items():
+        parts = list(base)
+        if key is not None:
+            parts.append(sector_returns[key].reindex(index).astype(float).values[:, None])
+        X = np.hstack(parts)
+
+        B, E = _solve_masked(X, Y_all[:, cols], min_obs=min_obs)
+
+        # X columns follow out_cols order ('Sector' last, only when the group has one)
+        betas[np.ix_(cols, list(range(X.shape[1])))] = B.T
+        resid[:, cols] = E
+
+    return (pd.DataFrame(betas, index=tickers, columns=out_cols),
+            pd.DataFrame(resid, index=index, columns=tickers))
@@ -0,0 +1,194 @@
+"""
+Idio Score Sensitivity Sweep
+이벤트 구간 / 룩백 / 팩터 조합 그리드에 대한 Idio Score(Delta) 민감도를 한 번에 계산하는 모듈
+
+- 회귀: [1, 팩터, 종목] 교차곱의 누적합(prefix sum) 1회 → 룩백별 Gram 행렬은 누적합 차이,
+  팩터 조합별 Gram은 부분 행렬 → 조합당 배치 Cholesky 한 번으로 모든 룩백의 베타 계산
+- 스코어: 잔차 행렬 (날짜 x 변형)의 |e|, e, e^2 합을 이벤트 구간 마스크 (날짜 x 구간)와 행렬곱
+  → 포함/제외 통계가 모든 (변형 x 구간) 조합에 대해 한 번에 나옴
+- 단일 변형 (전체 팩터, 전체 기간, T-2..T+2)은 calculate_idio_score의 Delta Score와 동일
+"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+import logic_event
+import trading_calendar
+
+FACTORS = ['Market', 'Sector', 'SMB', 'HML', 'MOM']
+
+# 기본 그리드: 이벤트 구간 반폭 (T-k..T+k), 룩백 (거래일, None = 전체), 팩터 조합
+SWEEP_WINDOWS = [0, 1, 2, 3, 5]
+SWEEP_LOOKBACKS = [None, 504, 252]
+SWEEP_FACTOR_SETS = [
+    ('Market',),
+    ('Market', 'Sector'),
+    ('Market', 'Sector', 'SMB', 'HML'),
+    ('Market', 'Sector', 'SMB', 'HML', 'MOM'),
+]
+
+
+def _event_sessions(ticker_symbol):
+    """Earnings dates snapped to the ticker's exchange sessions (same source as calculate_idio_score)."""
+    import logic_crawler
+    real_dates = logic_crawler.fetch_historical_earnings_dates(ticker_symbol)
+    if len(real_dates) == 0:
+        return pd.DatetimeIndex([])
+    calendar = trading_calendar.get_calendar(trading_calendar.exchange_for_ticker(ticker_symbol))
+    return calendar.snap_forward(real_dates).dropna()
+
+
+def sweep_idio_scores(df, ticker_symbol, windows=SWEEP_WINDOWS, lookbacks=SWEEP_LOOKBACKS,
+                      factor_sets=SWEEP_FACTOR_SETS, event_sessions=None) -> pd.DataFrame:
+    """
+    Delta Score for every (factor set, lookback, event window) combination.
+
+    Args:
+        df: enriched market data (Stock + factor columns), as passed to calculate_idio_score
+        windows: half-widths k of the event window T-k..T+k
+        lookbacks: trailing sample lengths in sessions (None = all rows)
+        factor_sets: tuples of factor columns; columns missing from df are dropped from a set
+        event_sessions: event dates already on trading sessions (fetched when None)
+
+    Returns:
+        DataFrame, one row per variant: Factors, Lookback, Window, Delta_Score, GS_Incl, GS_Excl,
+        Mean_Incl, Vol_Incl, Mean_Excl, Vol_Excl, Events, Obs
+    """
+    # Factor sets restricted to the available columns (deduplicated, order kept)
+    sets = list(dict.fromkeys(tuple(c for c in fs if c in df.columns) for fs in factor_sets))
+    sets = [fs for fs in sets if fs]
+    cols = [c for c in FACTORS if any(c in fs for fs in sets)]
+    if not sets:
+        return pd.DataFrame()
+
+    data = df[['Stock'] + cols].dropna()
+    T, m = len(data), len(cols)
+    if T < 3:
+        return pd.DataFrame()
+
+    # 1. Cross-product prefix sums of Z = [1, factors, y]: C[t] = sum_{s<t} z_s z_s^T
+    X = np.hstack([np.ones((T, 1)), data[cols].to_numpy(dtype=float)])
+    y = data['Stock'].to_numpy(dtype=float)
+    Z = np.hstack([X, y[:, None]])
+    C = np.concatenate([np.zeros((1, m + 2, m + 2)), np.cumsum(Z[:, :, None] * Z[:, None, :], axis=0)])
+
+    lbs = sorted({min(int(L), T) if L else T for L in lookbacks}, reverse=True)
+    S = C[T] - C[[T - L for L in lbs]]  # (n_lookbacks, m+2, m+2)
+
+    # 2. One batched Cholesky solve per factor set (all lookbacks at once)
+    variants, B = [], []
+    for fs in sets:
+        idx = [0] + [1 + cols.index(c) for c in fs]
+        G = S[:, idx][:, :, idx]
+        b = S[:, idx, -1]
+        try:
+            L_chol = np.linalg.cholesky(G)
+            beta = np.linalg.solve(np.swapaxes(L_chol, 1, 2), np.linalg.solve(L_chol, b[..., None]))[..., 0]
+        except np.linalg.LinAlgError:
+            # Singular Gram (e.g. constant / all-zero factor): minimum-norm solution
+            beta = (np.linalg.pinv(G) @ b[..., None])[..., 0]
+        for j, L in enumerate(lbs):
+            full = np.zeros(m + 1)
+            full[idx] = beta[j]
+            B.append(full)
+            variants.append(('+'.join(fs), L))
+    B = np.array(B).T  # (m+1, V)
+
+    # 3. Residuals of every variant, zeroed outside its lookback
+    start = T - np.array([L for _, L in variants])
+    inside = np.arange(T)[:, None] >= start[None, :]
+    E = np.where(inside, y[:, None] - X @ B, 0.0)
+    stats = np.stack([np.abs(E), E, E ** 2, inside.astype(float)])  # (4, T, V)
+
+    # 4. Event-window masks (T, W) and window sums by one matmul
+    if event_sessions is None:
+        try:
+            event_sessions = _event_sessions(ticker_symbol)
+        except Exception as e:
+            print(f"Earnings Date Error: {e}")
+            event_sessions = pd.DatetimeIndex([])
+    events = pd.DataFrame({'ticker': ticker_symbol, 'date': pd.DatetimeIndex(event_sessions)})
+    ks = list(dict.fromkeys(int(k) for k in windows))
+    M = np.column_stack([
+        logic_event.event_window_mask(data.index, [ticker_symbol], events, window=(-k, k), max_gap_days=0)[:, 0]
+        for k in ks
+    ]).astype(float)
+
+    incl = stats.sum(axis=1)                       # (4, V)
+    in_event = np.einsum('tw,qtv->qwv', M, stats)  # (4, W, V)
+    excl = incl[:, None, :] - in_event
+
+    score_incl, mu_incl, sigma_incl = logic_event.gs_score(*incl)
+    score_excl, mu_excl, sigma_excl = logic_event.gs_score(*excl)
+    # Everything excluded: fall back to the inclusive stats (as calculate_idio_score)
+    empty = excl[3] == 0
+    score_excl = np.where(empty, score_incl[None, :], score_excl)
+    mu_excl = np.where(empty, mu_incl[None, :], mu_excl)
+    sigma_excl = np.where(empty, sigma_incl[None, :], sigma_excl)
+
+    rows, _, _ = logic_event.event_positions(data.index, [ticker_symbol], events, max_gap_days=0)
+    n_events = (rows[None, :] >= start[:, None]).sum(axis=1)
+
+    W, V = len(ks), len(variants)
+    out = pd.DataFrame({
+        'Factors': np.repeat([f for f, _ in variants], W),
+        'Lookback': np.repeat([L for _, L in variants], W),
+        'Window': np.tile([f"T-{k}..T+{k}" for k in ks], V),
+        'Delta_Score': (score_incl[None, :] - score_excl).T.ravel(),
+        'GS_Incl': np.repeat(score_incl, W),
+        'GS_Excl': score_excl.T.ravel(),
+        'Mean_Incl': np.repeat(mu_incl, W),
+        'Vol_Incl': np.repeat(sigma_incl, W),
+        'Mean_Excl': mu_excl.T.ravel(),
+        'Vol_Excl': sigma_excl.T.ravel(),
+        'Events': np.repeat(n_events, W),
+        'Obs': np.repeat(T - start, W),
+    })
+    return out
+
+
+def summarize_sweep(sweep: pd.DataFrame, by: str = 'Ticker') -> pd.DataFrame:
+    """Robustness of the Delta Score across variants: mean / std / min / max / share of positive variants."""
+    if sweep.empty:
+        return pd.DataFrame()
+    d = sweep.assign(Positive=sweep['Delta_Score'] > 0)
+    g = d.groupby(by) if by in d.columns else d.groupby(lambda _: 'All')
+    return g.agg(Mean=('Delta_Score', 'mean'), Std=('Delta_Score', 'std'), Min=('Delta_Score', 'min'),
+                 Max=('Delta_Score', 'max'), Positive_Share=('Positive', 'mean'))
+
+
+def sweep_universe(tickers, sector_map=None, max_workers=8, **grid) -> pd.DataFrame:
+    """
+    Sweep many tickers: inputs are fetched concurrently (same stage as run_idio_batch),
+    each ticker's grid is evaluated in one sweep_idio_scores call.
+    Returns the stacked sweep with a leading 'Ticker' column.
+    """
+    import logic_idio
+
+    sector_map = sector_map or {}
+    tickers = list(dict.fromkeys(tickers))
+    if not tickers:
+        return pd.DataFrame()
+
+    frames = []
+    workers = max(1, min(max_workers, len(tickers)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(logic_idio._fetch_batch_inputs, t, sector_map.get(t, '지수')): t for t in tickers}
+        for future in as_completed(futures):
+            t = futures[future]
+            try:
+                m_data = future.result()
+                if m_data is None or m_data.empty:
+                    continue
+                res = sweep_idio_scores(m_data, t, **grid)
+                if not res.empty:
+                    frames.append(res.assign(Ticker=t))
+            except Exception as e:
+                print(f"[Sweep] {t}: {e}")
+
+    if not frames:
+        return pd.DataFrame()
+    out = pd.concat(frames, ignore_index=True)
+    return out[['Ticker'] + [c for c in out.columns if c != 'Ticker']]
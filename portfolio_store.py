@@ -0,0 +1,250 @@
+"""
+Portfolio Snapshot Store
+Active ETF 구성종목(PDF) 일별 스냅샷을 로컬 SQLite에 저장하는 모듈
+
+- (provider, etf, date, seq) 키 (seq = PDF 내 행 순번, 같은 종목코드 행(현금 등)도 모두 보관), 타입 지정 컬럼 → 날짜/종목코드 인덱스 조회
+- 상품 전체 기간 로드, 단일 종목 비중 히스토리 조회가 쿼리 한 번
+- 기존 portfolio_YYYY-MM-DD.json 파일은 import_json_dir()로 한 번만 가져옴
+- previous_snapshot_date(): 운용사 공통 "직전 영업일 PDF" 탐색 (KRX 거래일 달력, 없으면 수집 함수로 보충)
+"""
+
+import os
+import time
+
+import pandas as pd
+
+import sqlite_store
+import trading_calendar
+
+DB_PATH = os.environ.get("PORTFOLIO_STORE_PATH", os.path.join("data", "portfolio_store.sqlite"))
+
+# 빈 스냅샷(PDF 없음)은 날짜로부터 이 일수가 지난 뒤 확인한 경우에만 확정 → 그 전에는 재수집 대상
+# (공시 전 조회, 일시적인 "테이블 없음" 페이지를 영구 휴장으로 기록하지 않음, price_store.MISSING_RETRY_DAYS와 같은 방식)
+EMPTY_RETRY_DAYS = 5
+
+# 저장 스키마 (DataFrame 컬럼명 -> SQLite 컬럼명)
+COLUMNS = {
+    '종목코드': 'code',
+    '종목명': 'name',
+    '수량': 'quantity',
+    '평가금액': 'value',
+    '비중': 'weight',
+}
+
+
+def _init_schema(conn):
+    columns = [r[1] for r in conn.execute("PRAGMA table_info(holdings)").fetchall()]
+    if columns and 'seq' not in columns:
+        # 이전 스키마 (provider, etf, date, code) 키 → 행 순번 키로 이전
+        conn.execute("ALTER TABLE holdings RENAME TO holdings_v1")
+        conn.execute("DROP INDEX IF EXISTS idx_holdings_code")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS holdings (
+            provider TEXT NOT NULL,
+            etf      TEXT NOT NULL,
+            date     TEXT NOT NULL,
+            seq      INTEGER NOT NULL,
+            code     TEXT NOT NULL,
+            name     TEXT,
+            quantity REAL,
+            value    REAL,
+            weight   REAL,
+            PRIMARY KEY (provider, etf, date, seq)
+        ) WITHOUT ROWID
+    """)
+    if columns and 'seq' not in columns:
+        conn.execute("""
+            INSERT INTO holdings (provider, etf, date, seq, code, name, quantity, value, weight)
+            SELECT provider, etf, date, ROW_NUMBER() OVER (PARTITION BY provider, etf, date ORDER BY code) - 1,
+                   code, name, quantity, value, weight
+            FROM holdings_v1
+        """)
+        conn.execute("DROP TABLE holdings_v1")
+    # 단일 종목 히스토리 조회용
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_holdings_code ON holdings (provider, etf, code, date)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS snapshots (
+            provider TEXT NOT NULL,
+            etf      TEXT NOT NULL,
+            date     TEXT NOT NULL,
+            n_rows   INTEGER NOT NULL,
+            saved_at REAL NOT NULL,
+            PRIMARY KEY (provider, etf, date)
+        ) WITHOUT ROWID
+    """)
+
+
+def _connect():
+    """Per-thread SQLite connection (backfill workers write concurrently)."""
+    return sqlite_store.connect(DB_PATH, _init_schema)
+
+
+def _to_frame(rows) -> pd.DataFrame:
+    df = pd.DataFrame.from_records(rows, columns=['날짜'] + list(COLUMNS))
+    return df[list(COLUMNS) + ['날짜']]
+
+
+def save(provider: str, etf: str, date: str, df: pd.DataFrame):
+    """
+    One date's holdings (replaces an existing snapshot of the same date).
+    df must carry the COLUMNS keys (종목코드, 종목명, 수량, 평가금액, 비중).
+    Every row is kept in PDF order, including rows sharing a 종목코드 (e.g. several cash lines).
+    An empty df records the date as checked with no holdings (e.g. holiday).
+    """
+    records = []
+    if df is not None and not df.empty:
+        records = [
+            (provider, etf, date, seq, str(code), name, float(qty), float(value), float(weight))
+            for seq, (code, name, qty, value, weight)
+            in enumerate(df[list(COLUMNS)].itertuples(index=False, name=None))
+        ]
+    conn = _connect()
+    with conn:
+        conn.execute("DELETE FROM holdings WHERE provider = ? AND etf = ? AND date = ?", (provider, etf, date))
+        conn.executemany(
+            "INSERT INTO holdings (provider, etf, date, seq, code, name, quantity, value, weight) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            records
+        )
+        stored = conn.execute(
+            "SELECT COUNT(*) FROM holdings WHERE provider = ? AND etf = ? AND date = ?", (provider, etf, date)
+        ).fetchone()[0]
+        if stored != len(records):
+            # Rolls back the snapshot instead of saving a partial PDF
+            raise ValueError(f"{provider}/{etf} {date}: {len(records)}행 중 {stored}행만 저장됨")
+        conn.execute(
+            "INSERT OR REPLACE INTO snapshots (provider, etf, date, n_rows, saved_at) VALUES (?, ?, ?, ?, ?)",
+            (provider, etf, date, len(records), time.time())
+        )
+
+
+def load(provider: str, etf: str, date: str):
+    """One date's holdings, or None if the date was never saved."""
+    rows = _connect().execute(
+        "SELECT date, code, name, quantity, value, weight FROM holdings "
+        "WHERE provider = ? AND etf = ? AND date = ? ORDER BY weight DESC, seq",
+        (provider, etf, date)
+    ).fetchall()
+    if not rows:
+        return None
+    return _to_frame(rows)
+
+
+def load_history(provider: str, etf: str, days: int = None, start: str = None, end: str = None) -> pd.DataFrame:
+    """
+    Holdings for the latest `days` snapshots (and/or a [start, end] date range), newest first.
+    """
+    sql = "SELECT date FROM snapshots WHERE provider = ? AND etf = ? AND n_rows > 0"
+    params = [provider, etf]
+    if start is not None:
+        sql += " AND date >= ?"
+        params.append(start)
+    if end is not None:
+        sql += " AND date <= ?"
+        params.append(end)
+    sql += " ORDER BY date DESC"
+    if days is not None:
+        sql += " LIMIT ?"
+        params.append(int(days))
+
+    dates = [r[0] for r in _connect().execute(sql, params).fetchall()]
+    if not dates:
+        return pd.DataFrame()
+
+    rows = _connect().execute(
+        "SELECT date, code, name, quantity, value, weight FROM holdings "
+        "WHERE provider = ? AND etf = ? AND date BETWEEN ? AND ? ORDER BY date DESC, seq",
+        (provider, etf, dates[-1], dates[0])
+    ).fetchall()
+    return _to_frame(rows)
+
+
+def stock_history(provider: str, etf: str, code: str, start: str = None) -> pd.DataFrame:
+    """Weight / quantity history of a single holding (ascending by date)."""
+    sql = ("SELECT date, code, name, quantity, value, weight FROM holdings "
+           "WHERE provider = ? AND etf = ? AND code = ?")
+    params = [provider, etf, code]
+    if start is not None:
+        sql += " AND date >= ?"
+        params.append(start)
+    sql += " ORDER BY date, seq"
+    return _to_frame(_connect().execute(sql, params).fetchall())
+
+
+def snapshot_dates(provider: str, etf: str, include_empty: bool = False) -> set:
+    """
+    Dates with a saved snapshot.
+    include_empty=True adds dates checked with no holdings, but only once the check ran at least
+    EMPTY_RETRY_DAYS after the date (earlier empty checks stay due for another fetch).
+    """
+    if not include_empty:
+        rows = _connect().execute(
+            "SELECT date FROM snapshots WHERE provider = ? AND etf = ? AND n_rows > 0", (provider, etf)).fetchall()
+        return {r[0] for r in rows}
+    rows = _connect().execute(
+        "SELECT date, n_rows, saved_at FROM snapshots WHERE provider = ? AND etf = ?", (provider, etf)).fetchall()
+    settle = pd.Timedelta(days=EMPTY_RETRY_DAYS).total_seconds()
+    return {d for d, n, saved_at in rows if n > 0 or saved_at >= pd.Timestamp(d).timestamp() + settle}
+
+
+def previous_snapshot_date(provider: str, etf: str, date: str, fetch=None, lookback_days: int = 3):
+    """
+    Latest KRX session before `date` that has holdings, checking up to `lookback_days` sessions back.
+
+    Stored snapshots are used first; otherwise fetch(session) -> DataFrame (store schema) is tried
+    and saved when non-empty (fetch errors skip to the previous session).
+    Returns the date (YYYY-MM-DD) or None.
+    """
+    calendar = trading_calendar.get_calendar('KRX')
+    prev_session = calendar.previous_session(date)
+    stored = snapshot_dates(provider, etf)
+
+    for i in range(lookback_days):
+        prev_date = calendar.sessions_ago(prev_session, i).strftime("%Y-%m-%d")
+        if prev_date in stored:
+            return prev_date
+        if fetch is None:
+            continue
+        try:
+            df = fetch(prev_date)
+        except Exception:
+            continue
+        if df is not None and not df.empty:
+            save(provider, etf, prev_date, df)
+            return prev_date
+    return None
+
+
+def import_json_dir(provider: str, etf: str, data_dir: str, column_map: dict = None) -> int:
+    """
+    Import legacy portfolio_YYYY-MM-DD.json files not yet in the store.
+    column_map renames provider-specific columns to the store schema (e.g. {'보유수량': '수량'}).
+    Returns the number of imported snapshots.
+    """
+    if not os.path.isdir(data_dir):
+        return 0
+
+    files = [f for f in os.listdir(data_dir) if f.startswith('portfolio_') and f.endswith('.json')]
+    if not files:
+        return 0
+
+    stored = snapshot_dates(provider, etf)
+    imported = 0
+    for file in sorted(files):
+        date = file[len('portfolio_'):-len('.json')]
+        if date in stored:
+            continue
+        try:
+            df = pd.read_json(os.path.join(data_dir, file), dtype={'종목코드': str})
+            if column_map:
+                df = df.rename(columns=column_map)
+            if df.empty or not set(COLUMNS).issubset(df.columns):
+                continue
+            save(provider, etf, date, df)
+            imported += 1
+        except Exception as e:
+            print(f"[PortfolioStore] Import failed ({file}): {e}")
+
+    if imported:
+        print(f"[PortfolioStore] {provider}/{etf}: JSON 스냅샷 {imported}개 가져옴")
+    return imported
@@ -0,0 +1,251 @@
+"""
+Local Price Store
+Nasdaq / Yahoo / FDR 일별 종가를 로컬 SQLite에 누적 저장하는 모듈
+
+- (source, ticker, date) 키로 종가 보관 → 재시작/다중 레플리카에서도 warm start
+- 마지막 저장 봉 이후의 구간(tail)만 원격에서 요청
+- 겹치는 봉의 가격이 달라지면(액면분할/수정주가) 해당 티커 전체 재수집
+- get_session_closes(): (티커, 세션일) 단위 종가 캐시 → 요청한 점 중 빠진 것만 일괄 조회 (ETF 리밸런싱 귀속용)
+"""
+
+import os
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+import sqlite_store
+
+DB_PATH = os.environ.get("PRICE_STORE_PATH", os.path.join("data", "price_store.sqlite"))
+
+# 같은 티커를 이 시간(초) 안에 다시 원격 조회하지 않음
+REFRESH_TTL = 3600
+# 겹치는 봉의 종가 차이가 이 비율을 넘으면 과거 가격이 수정된 것으로 판단
+ADJUST_TOLERANCE = 1e-3
+
+# 세션 종가 캐시의 source 키
+SESSION_SOURCE = 'session'
+# 이 일수보다 오래된 세션에 봉이 없으면 '없음'(NULL)으로 기록해 재요청하지 않음 (최근 세션은 지연 게시 대비 재시도,
+# 다운로드에서 봉을 하나도 받지 못한 티커는 일시 실패로 보고 기록하지 않음)
+MISSING_RETRY_DAYS = 5
+
+
+def _init_schema(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS prices (
+            source TEXT NOT NULL,
+            ticker TEXT NOT NULL,
+            date   TEXT NOT NULL,
+            close  REAL,
+            PRIMARY KEY (source, ticker, date)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS coverage (
+            source     TEXT NOT NULL,
+            ticker     TEXT NOT NULL,
+            start      TEXT NOT NULL,
+            fetched_at REAL NOT NULL,
+            PRIMARY KEY (source, ticker)
+        ) WITHOUT ROWID
+    """)
+
+
+def _connect():
+    """Per-thread SQLite connection (batch workers write concurrently)."""
+    return sqlite_store.connect(DB_PATH, _init_schema)
+
+
+def _to_date_str(d):
+    return pd.Timestamp(d).strftime("%Y-%m-%d")
+
+
+def load(ticker, source, start=None, end=None):
+    """
+    Read stored closes as a float Series indexed by Date (ascending).
+    """
+    sql = "SELECT date, close FROM prices WHERE source = ? AND ticker = ?"
+    params = [source, ticker]
+    if start is not None:
+        sql += " AND date >= ?"
+        params.append(_to_date_str(start))
+    if end is not None:
+        sql += " AND date <= ?"
+        params.append(_to_date_str(end))
+    sql += " ORDER BY date"
+
+    rows = _connect().execute(sql, params).fetchall()
+    if not rows:
+        return pd.Series(dtype=float, name=ticker)
+
+    dates, closes = zip(*rows)
+    s = pd.Series(closes, index=pd.to_datetime(list(dates)), name=ticker, dtype=float)
+    s.index.name = 'Date'
+    return s
+
+
+def last_bar(ticker, source):
+    """(date, close) of the latest stored bar, or (None, None)."""
+    row = _connect().execute(
+        "SELECT date, close FROM prices WHERE source = ? AND ticker = ? ORDER BY date DESC LIMIT 1",
+        (source, ticker)
+    ).fetchone()
+    if row is None:
+        return None, None
+    return pd.Timestamp(row[0]), row[1]
+
+
+def upsert(ticker, source, closes, replace=False):
+    """
+    Write a Series of closes (DatetimeIndex). replace=True drops the ticker's history first.
+    """
+    closes = closes.dropna()
+    conn = _connect()
+    with conn:
+        if replace:
+            conn.execute("DELETE FROM prices WHERE source = ? AND ticker = ?", (source, ticker))
+        conn.executemany(
+            "INSERT OR REPLACE INTO prices (source, ticker, date, close) VALUES (?, ?, ?, ?)",
+            [(source, ticker, d.strftime("%Y-%m-%d"), float(v)) for d, v in closes.items()]
+        )
+
+
+def _get_coverage(ticker, source):
+    row = _connect().execute(
+        "SELECT start, fetched_at FROM coverage WHERE source = ? AND ticker = ?",
+        (source, ticker)
+    ).fetchone()
+    if row is None:
+        return None, 0.0
+    return pd.Timestamp(row[0]), row[1]
+
+
+def _set_coverage(ticker, source, start):
+    conn = _connect()
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO coverage (source, ticker, start, fetched_at) VALUES (?, ?, ?, ?)",
+            (source, ticker, _to_date_str(start), time.time())
+        )
+
+
+def get_history(ticker, source, fetcher, start, end=None):
+    """
+    Return closes for [start, end] from the store, fetching only what is missing.
+
+    fetcher(ticker, from_date, to_date) -> Series of closes (DatetimeIndex), dates as 'YYYY-MM-DD'.
+    - Cold store (or start earlier than stored coverage): full fetch of [start, end], extended to
+      the last stored bar so an older-start query with a past `end` does not drop newer bars.
+    - Warm store: fetch from the last stored bar (1-bar overlap) to end.
+      If the overlapping close changed (split / adjustment), refetch the full range.
+    """
+    start = pd.Timestamp(start).normalize()
+    end = pd.Timestamp(end).normalize() if end is not None else pd.Timestamp(datetime.now().date())
+
+    cov_start, fetched_at = _get_coverage(ticker, source)
+    last_date, last_close = last_bar(ticker, source)
+
+    if cov_start is None or last_date is None or start < cov_start:
+        # Cold (or coverage too short): full range, through the stored tail since it is replaced
+        fetch_end = max(end, last_date) if last_date is not None else end
+        s = fetcher(ticker, _to_date_str(start), _to_date_str(fetch_end))
+        if s is not None and not s.empty:
+            upsert(ticker, source, s, replace=True)
+            _set_coverage(ticker, source, start)
+
+    elif last_date < end and time.time() - fetched_at > REFRESH_TTL:
+        # Warm: tail only (overlap the last stored bar to detect adjustments)
+        try:
+            s = fetcher(ticker, _to_date_str(last_date), _to_date_str(end))
+            if s is not None and not s.empty:
+                overlap = s.get(last_date)
+                if overlap is not None and last_close and abs(overlap / last_close - 1) > ADJUST_TOLERANCE:
+                    full = fetcher(ticker, _to_date_str(cov_start), _to_date_str(end))
+                    if full is not None and not full.empty:
+                        upsert(ticker, source, full, replace=True)
+                else:
+                    upsert(ticker, source, s)
+        except Exception as e:
+            # Serve the stored history if the delta fetch fails
+            print(f"[PriceStore] Tail fetch failed ({source}:{ticker}): {e}")
+        _set_coverage(ticker, source, cov_start)
+
+    return load(ticker, source, start, end)
+
+
+def default_start(years=3):
+    """Start date for a trailing N-year window."""
+    return (datetime.now() - timedelta(days=365 * years)).date()
+
+
+def _load_points(tickers, dates, source):
+    """Stored (ticker, date) -> close (None = checked, no bar) for the given tickers x dates."""
+    conn = _connect()
+    out = {}
+    for i in range(0, len(tickers), 500):
+        chunk = tickers[i:i + 500]
+        rows = conn.execute(
+            f"SELECT ticker, date, close FROM prices WHERE source = ? "
+            f"AND ticker IN ({', '.join('?' * len(chunk))}) AND date IN ({', '.join('?' * len(dates))})",
+            [source] + chunk + dates
+        ).fetchall()
+        out.update(((t, d), c) for t, d, c in rows)
+    return out
+
+
+def get_session_closes(points, fetcher, source=SESSION_SOURCE, verbose=False):
+    """
+    Closes for exact (ticker, session date) points; only points not in the store are fetched, in one bulk call.
+
+    points: iterable of (ticker, date)
+    fetcher(tickers, from_date, to_date) -> DataFrame of closes (DatetimeIndex x ticker columns), dates as 'YYYY-MM-DD'.
+    Every bar returned for the fetched tickers is stored (a ticker's points then come from the same download).
+    Points with no bar, older than MISSING_RETRY_DAYS, are recorded as NULL so they are not requested again,
+    but only for tickers that got at least one bar in this download (an all-NaN column is usually a
+    transient failure such as a rate limit, and is retried on the next call).
+    verbose=True prints the cache hit / fetch counts.
+    Returns a float Series indexed by (ticker, 'YYYY-MM-DD'), NaN where no close exists.
+    """
+    points = [(t, d) for t, d in points if t is not None and pd.notna(t)]
+    day = {d: _to_date_str(d) for d in {d for _, d in points}}
+    keys = list(dict.fromkeys((str(t), day[d]) for t, d in points))
+    if not keys:
+        return pd.Series(dtype=float)
+    tickers = list(dict.fromkeys(t for t, _ in keys))
+    dates = sorted({d for _, d in keys})
+    stored = _load_points(tickers, dates, source)
+
+    missing = [k for k in keys if k not in stored]
+    if missing:
+        miss_tickers = list(dict.fromkeys(t for t, _ in missing))
+        miss_dates = [d for _, d in missing]
+        try:
+            df = fetcher(miss_tickers, min(miss_dates), max(miss_dates))
+        except Exception as e:
+            print(f"[PriceStore] Session fetch failed ({len(miss_tickers)} tickers): {e}")
+            df = None
+
+        rows = []
+        if df is not None and not df.empty:
+            df = df.reindex(columns=miss_tickers)
+            for t in miss_tickers:
+                col = df[t].dropna()
+                rows += [(source, t, d.strftime("%Y-%m-%d"), float(v)) for d, v in col.items()]
+            got = {(t, d) for _, t, d, _ in rows}
+            fetched = {t for t, _ in got}
+            # 봉을 받은 티커인데 해당 세션만 없는 오래된 점 → NULL 기록 (거래정지/상장폐지 이후 등)
+            cutoff = _to_date_str(pd.Timestamp.now().normalize() - pd.Timedelta(days=MISSING_RETRY_DAYS))
+            rows += [(source, t, d, None) for t, d in missing
+                     if t in fetched and (t, d) not in got and d < cutoff]
+
+        if rows:
+            conn = _connect()
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO prices (source, ticker, date, close) VALUES (?, ?, ?, ?)", rows)
+            stored.update(((t, d), c) for _, t, d, c in rows)
+        if verbose:
+            print(f"[PriceStore] 세션 종가 {len(keys)}건 중 {len(missing)}건 원격 조회 ({len(miss_tickers)}종목)")
+
+    return pd.Series([stored.get(k) for k in keys], index=pd.MultiIndex.from_tuples(keys, names=['ticker', 'date']),
+                     dtype=float)
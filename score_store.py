@@ -0,0 +1,181 @@
+"""
+Idio Score Store
+유니버스 Idio Score 사전 계산 결과를 날짜별로 저장하는 모듈 (SQLite)
+
+- (ticker, as_of) 키: Delta Score (+ 부트스트랩 신뢰구간/p-value), GS Score(포함/제외), 평균/변동성, 팩터 베타, 이벤트 수
+- basis: 잔차 기준 ('ex_ante' = idio_state 증분 상태의 전날까지 베타, 'full_sample' = 전체 기간 재적합)
+- 대시보드는 latest()로 종목별 최신 행을, history()로 종목별 점수 추이를 바로 조회
+- 값은 idio_precompute.py (미국장 마감 후 야간 배치)와 대시보드의 on-demand 계산이 기록
+"""
+
+import os
+import time
+
+import pandas as pd
+
+import sqlite_store
+
+DB_PATH = os.environ.get("SCORE_STORE_PATH", os.path.join("data", "score_store.sqlite"))
+
+# 저장 컬럼 (ticker, as_of 제외)
+SCORE_COLUMNS = [
+    'delta_score', 'delta_ci_low', 'delta_ci_high', 'delta_p_value', 'gs_incl', 'gs_excl',
+    'mean_incl', 'vol_incl', 'mean_excl', 'vol_excl',
+    'beta_market', 'beta_sector', 'beta_smb', 'beta_hml', 'beta_mom',
+    'event_count', 'events_matched', 'status', 'basis',
+]
+_ALL_COLUMNS = ['ticker', 'as_of'] + SCORE_COLUMNS + ['computed_at']
+
+# 잔차 기준 (basis 컬럼) -> 화면 표시
+BASIS_LABELS = {
+    'ex_ante': 'Ex-ante 잔차 (전날까지의 베타, 증분 상태)',
+    'full_sample': 'Full Sample Beta',
+}
+
+# 대시보드가 사전 계산 점수를 그대로 쓰는 최대 경과일 (주말/휴장 포함 달력일)
+MAX_AGE_DAYS = 4
+
+
+def _init_schema(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS scores (
+            ticker         TEXT NOT NULL,
+            as_of          TEXT NOT NULL,
+            delta_score    REAL,
+            delta_ci_low   REAL,
+            delta_ci_high  REAL,
+            delta_p_value  REAL,
+            gs_incl        REAL,
+            gs_excl        REAL,
+            mean_incl      REAL,
+            vol_incl       REAL,
+            mean_excl      REAL,
+            vol_excl       REAL,
+            beta_market    REAL,
+            beta_sector    REAL,
+            beta_smb       REAL,
+            beta_hml       REAL,
+            beta_mom       REAL,
+            event_count    INTEGER,
+            events_matched INTEGER,
+            status         TEXT,
+            basis          TEXT,
+            computed_at    REAL NOT NULL,
+            PRIMARY KEY (ticker, as_of)
+        ) WITHOUT ROWID
+    """)
+    # 이전 스키마 파일: 추가된 컬럼 보강
+    existing = {r[1] for r in conn.execute("PRAGMA table_info(scores)")}
+    for col in ('delta_ci_low', 'delta_ci_high', 'delta_p_value'):
+        if col not in existing:
+            conn.execute(f"ALTER TABLE scores ADD COLUMN {col} REAL")
+    if 'basis' not in existing:
+        # 이전 행은 모두 전체 기간 재적합 결과
+        conn.execute("ALTER TABLE scores ADD COLUMN basis TEXT DEFAULT 'full_sample'")
+    # 날짜별 전체 유니버스 조회용
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_scores_as_of ON scores (as_of, ticker)")
+
+
+def _connect():
+    """Per-thread SQLite connection."""
+    return sqlite_store.connect(DB_PATH, _init_schema)
+
+
+def _to_date_str(d):
+    return pd.Timestamp(d).strftime("%Y-%m-%d")
+
+
+def _frame(rows) -> pd.DataFrame:
+    df = pd.DataFrame.from_records(rows, columns=_ALL_COLUMNS)
+    df['as_of'] = pd.to_datetime(df['as_of'])
+    return df
+
+
+def save(as_of, rows: pd.DataFrame, replace: bool = True) -> int:
+    """
+    Write one scoring run. rows: DataFrame with 'ticker' and SCORE_COLUMNS (missing columns = NULL).
+    Re-running the same as_of replaces the ticker's row (replace=False keeps an existing row:
+    dashboard full-sample results never overwrite a nightly row, while the nightly run replaces them).
+    """
+    if rows is None or rows.empty:
+        return 0
+    df = rows.reindex(columns=['ticker'] + SCORE_COLUMNS).astype(object)
+    df = df.where(df.notna(), None)
+    day, now = _to_date_str(as_of), time.time()
+    records = [(r[0], day, *r[1:], now) for r in df.itertuples(index=False, name=None)]
+
+    conn = _connect()
+    with conn:
+        conn.executemany(
+            f"INSERT OR {'REPLACE' if replace else 'IGNORE'} INTO scores ({', '.join(_ALL_COLUMNS)}) "
+            f"VALUES ({', '.join('?' * len(_ALL_COLUMNS))})",
+            records
+        )
+    return len(records)
+
+
+def latest(tickers=None, max_age_days: int = None, success_only: bool = True, basis: str = None) -> pd.DataFrame:
+    """
+    Latest row per ticker (indexed by ticker).
+    max_age_days: ignore rows older than this many calendar days (None = any age).
+    basis: only rows of one residual basis (None = any; rankings should use one)
+    """
+    where, params = [], []
+    if success_only:
+        where.append("status = 'Success'")
+    if basis is not None:
+        where.append("basis = ?")
+        params.append(basis)
+    if max_age_days is not None:
+        where.append("as_of >= ?")
+        params.append(_to_date_str(pd.Timestamp.now().normalize() - pd.Timedelta(days=max_age_days)))
+    if tickers is not None:
+        tickers = list(tickers)
+        if not tickers:
+            return _frame([]).set_index('ticker')
+        where.append(f"ticker IN ({', '.join('?' * len(tickers))})")
+        params += tickers
+    cond = " AND ".join(where) or "1 = 1"
+
+    # 종목별 최신 as_of 행 (PK 순서로 MAX 조회 후 조인)
+    sql = (f"SELECT {', '.join('s.' + c for c in _ALL_COLUMNS)} FROM scores s JOIN ("
+           f"  SELECT ticker, MAX(as_of) AS as_of FROM scores WHERE {cond} GROUP BY ticker"
+           f") m ON s.ticker = m.ticker AND s.as_of = m.as_of")
+    rows = _connect().execute(sql, params).fetchall()
+    return _frame(rows).set_index('ticker').sort_values('delta_score', ascending=False)
+
+
+def history(ticker: str, start=None, basis: str = None) -> pd.DataFrame:
+    """Score history of one ticker (ascending by as_of, successful runs only, optionally one basis)."""
+    sql = f"SELECT {', '.join(_ALL_COLUMNS)} FROM scores WHERE ticker = ? AND status = 'Success'"
+    params = [ticker]
+    if basis is not None:
+        sql += " AND basis = ?"
+        params.append(basis)
+    if start is not None:
+        sql += " AND as_of >= ?"
+        params.append(_to_date_str(start))
+    sql += " ORDER BY as_of"
+    rows = _connect().execute(sql, params).fetchall()
+    return _frame(rows).set_index('as_of')
+
+
+def scored_tickers(as_of, success_only: bool = True, basis: str = None) -> set:
+    """
+    Tickers already written for one as_of date (resume support for the precompute job).
+    basis: only rows of that basis count (a dashboard full-sample row doesn't mark an ex-ante run done)
+    """
+    sql = "SELECT ticker FROM scores WHERE as_of = ?"
+    params = [_to_date_str(as_of)]
+    if success_only:
+        sql += " AND status = 'Success'"
+    if basis is not None:
+        sql += " AND basis = ?"
+        params.append(basis)
+    return {r[0] for r in _connect().execute(sql, params).fetchall()}
+
+
+def run_dates() -> list:
+    """Distinct as_of dates (ascending)."""
+    rows = _connect().execute("SELECT DISTINCT as_of FROM scores ORDER BY as_of").fetchall()
+    return [pd.Timestamp(r[0]) for r in rows]
@@ -0,0 +1,269 @@
+"""
+Security Master
+ETF PDF 종목코드 → 시장 티커(yfinance 표기) 매핑을 로컬 SQLite에 영구 저장하는 모듈
+
+- 코드 유형: ISIN (CA13321L1085), BBG (NVDA US EQUITY, BRK/B US EQUITY, ESZ5 Index), KRX (005930), TICKER (키움 itemCode 등)
+- resolve(): 고유 코드만 메모리 해시 인덱스에서 조회 → 처음 보는 코드만 규칙 파싱 후 저장 (분석마다 재파싱 없음)
+  인덱스는 DB 파일(+WAL) 수정 시각이 바뀌면 다시 읽음 (다른 프로세스의 CLI add_mapping/import_csv 반영)
+- 규칙으로 풀리지 않는 코드(매핑 없는 ISIN, KRX 코드 등)는 review 큐에 쌓고, 검토 후 add_mapping()/import_csv()로 등록
+- 티커는 yfinance 표기 (BRK-B, CCJ, 000660.KS); Nasdaq 표기는 nasdaq_ticker()로 변환
+"""
+
+import os
+import re
+import threading
+import time
+
+import pandas as pd
+
+import sqlite_store
+
+DB_PATH = os.environ.get("SECURITY_MASTER_PATH", os.path.join("data", "security_master.sqlite"))
+
+CODE_TYPES = ('ISIN', 'BBG', 'KRX', 'TICKER')
+
+# 수동 매핑 시드 (최초 연결 시 등록)
+SEED_MAPPINGS = [
+    ('CA13321L1085', 'CCJ', 'ISIN'),  # Cameco Corp
+]
+
+_ISIN_RE = r'^[A-Z]{2}[A-Z0-9]{9}[0-9]$'
+_KRX_RE = r'^A?[0-9]{6}$'
+_TICKER_RE = r'^[A-Z][A-Z0-9]{0,5}([./-][A-Z])?$'
+
+_lock = threading.Lock()
+# code -> ticker (None = review 대기), 프로세스 내 공유
+_index = None
+_index_path = None
+_index_stamp = None
+
+
+def _init_schema(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS securities (
+            code       TEXT PRIMARY KEY,
+            code_type  TEXT NOT NULL,
+            ticker     TEXT NOT NULL,
+            name       TEXT,
+            source     TEXT NOT NULL,
+            updated_at REAL NOT NULL
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS review (
+            code       TEXT PRIMARY KEY,
+            code_type  TEXT NOT NULL,
+            name       TEXT,
+            provider   TEXT,
+            first_seen REAL NOT NULL,
+            last_seen  REAL NOT NULL,
+            seen       INTEGER NOT NULL DEFAULT 1
+        ) WITHOUT ROWID
+    """)
+
+    seeded = conn.execute("SELECT 1 FROM securities LIMIT 1").fetchone()
+    if seeded is None:
+        with conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO securities (code, code_type, ticker, name, source, updated_at) "
+                "VALUES (?, ?, ?, NULL, 'seed', ?)",
+                [(code, code_type, ticker, time.time()) for code, ticker, code_type in SEED_MAPPINGS]
+            )
+
+
+def _connect():
+    """Per-thread SQLite connection."""
+    return sqlite_store.connect(DB_PATH, _init_schema)
+
+
+def _stamp():
+    """Modification times of the DB file and its WAL (changes when any process commits)."""
+    out = []
+    for path in (DB_PATH, DB_PATH + "-wal"):
+        try:
+            out.append(os.stat(path).st_mtime_ns)
+        except OSError:
+            out.append(None)
+    return tuple(out)
+
+
+def _mark_written():
+    """Own writes are already in the index: don't reload for them."""
+    global _index_stamp
+    with _lock:
+        if _index_path == DB_PATH:
+            _index_stamp = _stamp()
+
+
+def _load_index() -> dict:
+    """Mappings + review codes as one dict (reloaded when the DB changed on disk, e.g. a CLI import)."""
+    global _index, _index_path, _index_stamp
+    with _lock:
+        if _index is None or _index_path != DB_PATH or _stamp() != _index_stamp:
+            conn = _connect()
+            index = {c: None for (c,) in conn.execute("SELECT code FROM review")}
+            index.update(conn.execute("SELECT code, ticker FROM securities"))
+            _index, _index_path, _index_stamp = index, DB_PATH, _stamp()
+        return _index
+
+
+def classify(codes: pd.Series) -> pd.Series:
+    """Code type per code (ISIN / BBG / KRX / TICKER, None if unknown)."""
+    codes = codes.astype(str).str.strip()
+    out = pd.Series(None, index=codes.index, dtype=object)
+    is_isin = codes.str.match(_ISIN_RE)
+    is_bbg = codes.str.contains(r' (?:EQUITY|Equity|Index|INDEX|Comdty|COMDTY)$') | codes.str.contains('FUT', regex=False)
+    is_krx = codes.str.match(_KRX_RE)
+    is_ticker = codes.str.match(_TICKER_RE)
+    out[is_ticker] = 'TICKER'
+    out[is_krx] = 'KRX'
+    out[is_bbg] = 'BBG'
+    out[is_isin & ~is_bbg] = 'ISIN'
+    return out
+
+
+def parse(codes: pd.Series) -> pd.Series:
+    """
+    Rule-based tickers (vectorized string ops); None where no rule applies.
+
+    BBG: "NVDA US EQUITY" -> NVDA, "BRK/B US EQUITY" -> BRK-B, "RY CT EQUITY" -> RY.TO,
+         S&P500 선물 ("ESZ5 Index") -> ^GSPC, NASDAQ100 선물 ("NQH6 Index") -> NQ=F
+    TICKER: 그대로 (클래스 주식 "BRK.B", "BRK/B" -> "BRK-B")
+    ISIN / KRX: 규칙 없음 (매핑 등록 필요)
+    """
+    codes = codes.astype(str).str.strip()
+    kind = classify(codes)
+    out = pd.Series(None, index=codes.index, dtype=object)
+
+    future = codes.str.contains('Index', regex=False) | codes.str.contains('FUT', regex=False)
+    out[future & (codes.str.contains('S&P', regex=False) | codes.str.contains('ES', regex=False))] = '^GSPC'
+    out[future & out.isna() & codes.str.contains('NQ', regex=False)] = 'NQ=F'
+
+    us = ~future & codes.str.contains('US EQUITY', regex=False)
+    out[us] = codes[us].str.replace('US EQUITY', '', regex=False).str.strip()
+    ct = ~future & ~us & codes.str.contains('CT EQUITY', regex=False)
+    out[ct] = codes[ct].str.replace('CT EQUITY', '', regex=False).str.strip() + '.TO'
+    plain = (kind == 'TICKER').to_numpy() & ~future
+    out[plain] = codes[plain].str.replace(r'\.([A-Z])$', r'-\1', regex=True)
+
+    out = out.where(out.isna(), out.astype(str).str.replace('/', '-', regex=False))
+    return out.where(out != '', None)
+
+
+def resolve(codes, names=None, provider: str = None) -> pd.Series:
+    """
+    Tickers for PDF codes (aligned to codes; None = unresolved / cash).
+
+    Unique codes are looked up in the in-memory index; new codes are rule-parsed once,
+    stored (securities or review queue) and indexed, so later calls never re-parse them.
+    Codes already in the review queue get seen + 1 / last_seen / provider updated (one batch write).
+    names: optional 종목명 aligned to codes (stored with review items for the reviewer)
+    provider: e.g. 'timefolio:5' (stored with review items)
+    """
+    codes = pd.Series(codes, dtype=object).fillna('').astype(str).str.strip()
+    index = _load_index()
+
+    uniq = pd.unique(codes[codes != ''])
+    new = [c for c in uniq if c not in index]
+    pending = [c for c in uniq if c in index and index[c] is None]
+    if pending:
+        conn = _connect()
+        with conn:
+            conn.executemany(
+                "UPDATE review SET seen = seen + 1, last_seen = ?, provider = COALESCE(?, provider) WHERE code = ?",
+                [(time.time(), provider, c) for c in pending])
+        _mark_written()
+    if new:
+        new_codes = pd.Series(new, dtype=object)
+        tickers = parse(new_codes)
+        kinds = classify(new_codes).fillna('TICKER')
+        name_of = {}
+        if names is not None:
+            name_of = dict(zip(codes, pd.Series(names, dtype=object).where(lambda s: s.notna(), None)))
+
+        now = time.time()
+        ok = tickers.notna().to_numpy()
+        found = [(c, k, t, name_of.get(c), now) for c, k, t in zip(new_codes[ok], kinds[ok], tickers[ok])]
+        missing = [(c, k, name_of.get(c), provider, now, now) for c, k in zip(new_codes[~ok], kinds[~ok])]
+
+        conn = _connect()
+        with conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO securities (code, code_type, ticker, name, source, updated_at) "
+                "VALUES (?, ?, ?, ?, 'rule', ?)", found)
+            conn.executemany("""
+                INSERT INTO review (code, code_type, name, provider, first_seen, last_seen)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (code) DO UPDATE SET last_seen = excluded.last_seen, seen = review.seen + 1,
+                    provider = COALESCE(excluded.provider, review.provider)
+            """, missing)
+        _mark_written()
+        with _lock:
+            index.update((c, t) for c, _, t, _, _ in found)
+            index.update((c, None) for c, *_ in missing)
+        if missing:
+            print(f"[SecurityMaster] 미해결 코드 {len(missing)}건 review 큐 등록 (예: {missing[0][0]})")
+
+    return pd.Series([index.get(c) for c in codes], index=codes.index, dtype=object)
+
+
+def resolve_one(code: str):
+    """Ticker for one code (None if unresolved)."""
+    return resolve([code]).iloc[0]
+
+
+def add_mapping(code: str, ticker: str, code_type: str = None, name: str = None, source: str = 'manual'):
+    """Register / override one mapping (removes the code from the review queue)."""
+    code = str(code).strip()
+    code_type = code_type or classify(pd.Series([code])).iloc[0] or 'TICKER'
+    conn = _connect()
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO securities (code, code_type, ticker, name, source, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)", (code, code_type, ticker, name, source, time.time()))
+        conn.execute("DELETE FROM review WHERE code = ?", (code,))
+    index = _load_index()
+    with _lock:
+        index[code] = ticker
+    _mark_written()
+
+
+def import_csv(path: str, source: str = 'manual') -> int:
+    """Bulk mappings from a CSV with 'code' and 'ticker' columns ('code_type', 'name' optional)."""
+    df = pd.read_csv(path, dtype=str, encoding='utf-8-sig')
+    df.columns = [c.strip().lower() for c in df.columns]
+    if not {'code', 'ticker'}.issubset(df.columns):
+        raise ValueError(f"{path}: 'code', 'ticker' 컬럼이 필요합니다")
+    df = df.dropna(subset=['code', 'ticker'])
+    for row in df.reindex(columns=['code', 'ticker', 'code_type', 'name']).itertuples(index=False):
+        add_mapping(row.code, row.ticker.strip(), None if pd.isna(row.code_type) else row.code_type,
+                    None if pd.isna(row.name) else row.name, source)
+    print(f"[SecurityMaster] {os.path.basename(path)}: 매핑 {len(df)}건 가져옴")
+    return len(df)
+
+
+def review_queue() -> pd.DataFrame:
+    """Unresolved codes, most frequently seen first."""
+    cols = ['code', 'code_type', 'name', 'provider', 'first_seen', 'last_seen', 'seen']
+    df = pd.DataFrame.from_records(
+        _connect().execute(f"SELECT {', '.join(cols)} FROM review ORDER BY seen DESC, last_seen DESC").fetchall(),
+        columns=cols)
+    for c in ('first_seen', 'last_seen'):
+        df[c] = pd.to_datetime(df[c], unit='s')
+    return df
+
+
+def mappings() -> pd.DataFrame:
+    """All stored mappings."""
+    cols = ['code', 'code_type', 'ticker', 'name', 'source', 'updated_at']
+    df = pd.DataFrame.from_records(
+        _connect().execute(f"SELECT {', '.join(cols)} FROM securities ORDER BY code").fetchall(), columns=cols)
+    df['updated_at'] = pd.to_datetime(df['updated_at'], unit='s')
+    return df
+
+
+def nasdaq_ticker(ticker: str) -> str:
+    """yfinance 표기 -> Nasdaq 표기 (BRK-B -> BRK.B); 해외 접미사/지수/선물은 None"""
+    if not ticker or ticker.startswith('^') or '=' in ticker or re.search(r'\.[A-Z]{1,2}$', ticker):
+        return None
+    return ticker.replace('-', '.')
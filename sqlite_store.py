@@ -0,0 +1,46 @@
+"""
+SQLite Store Helper
+로컬 SQLite 저장소(price/earnings/score/idio/security/portfolio)가 공유하는 연결 헬퍼
+
+- 스레드별·DB 경로별 연결 캐시 (배치 워커가 동시에 쓰기 때문)
+- WAL + synchronous=NORMAL, 잠금 대기 30초
+- 새 연결마다 init(conn)으로 스키마 생성/마이그레이션/시드 후 commit
+"""
+
+import os
+import sqlite3
+import threading
+
+_local = threading.local()
+
+
+def connect(path, init=None):
+    """Per-thread WAL connection to `path`; `init(conn)` runs once per new connection.
+
+    The connection is cached before `init` runs, so seeding code may call the
+    store's own `_connect()` again without opening a second connection.
+    """
+    conns = getattr(_local, 'conns', None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(path)
+    if conn is not None:
+        return conn
+
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conns[path] = conn
+    try:
+        if init is not None:
+            init(conn)
+        conn.commit()
+    except Exception:
+        conns.pop(path, None)
+        conn.close()
+        raise
+    return conn
@@ -0,0 +1,221 @@
+"""
+Trading Calendar
+KRX / NYSE 거래일 달력 모듈 (휴장일 반영, 미리 계산된 세션 배열 기반 O(1) 조회)
+
+- 달력 범위 전체의 일자별 '직전 세션 위치'를 numpy 배열로 미리 계산
+  → 이전/다음 거래일, N 거래일 전 조회가 배열 인덱싱 한 번
+- NYSE: 규칙 기반 공휴일 (pandas holiday rules) + 임시 휴장일
+- KRX: 고정 공휴일 + 연말 휴장일(12월 마지막 평일) + 음력 명절/대체공휴일/선거일 표(KRX_HOLIDAYS)
+  KRX 달력 범위는 KRX_HOLIDAYS 표의 연도로 제한 (범위 밖 날짜 조회는 ValueError, 명절을 거래일로 취급하지 않음)
+  → 매년 다음 해 휴장일을 KRX_HOLIDAYS에 추가해야 합니다.
+"""
+
+from datetime import date
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.holiday import (
+    AbstractHolidayCalendar, GoodFriday, Holiday, USLaborDay, USMartinLutherKingJr,
+    USMemorialDay, USPresidentsDay, USThanksgivingDay, nearest_workday, sunday_to_monday,
+)
+
+CALENDAR_START = "2000-01-01"
+CALENDAR_END = "2030-12-31"
+
+
+# ---------------------------------------------------------
+# NYSE
+# ---------------------------------------------------------
+class _NYSEHolidayCalendar(AbstractHolidayCalendar):
+    rules = [
+        # 토요일 신정은 전년도 금요일로 대체하지 않음
+        Holiday('New Years Day', month=1, day=1, observance=sunday_to_monday),
+        USMartinLutherKingJr,
+        USPresidentsDay,
+        GoodFriday,
+        USMemorialDay,
+        Holiday('Juneteenth', month=6, day=19, start_date='2022-01-01', observance=nearest_workday),
+        Holiday('Independence Day', month=7, day=4, observance=nearest_workday),
+        USLaborDay,
+        USThanksgivingDay,
+        Holiday('Christmas', month=12, day=25, observance=nearest_workday),
+    ]
+
+
+# 규칙 외 임시 휴장 (국가 애도일, 재해 등)
+NYSE_SPECIAL_CLOSURES = [
+    "2001-09-11", "2001-09-12", "2001-09-13", "2001-09-14",
+    "2004-06-11", "2007-01-02", "2012-10-29", "2012-10-30",
+    "2018-12-05", "2025-01-09",
+]
+
+
+# ---------------------------------------------------------
+# KRX
+# ---------------------------------------------------------
+# 매년 같은 날짜의 휴장일 (월, 일): 신정, 삼일절, 근로자의 날, 어린이날, 현충일, 광복절, 개천절, 한글날, 성탄절
+KRX_FIXED_HOLIDAYS = [(1, 1), (3, 1), (5, 1), (5, 5), (6, 6), (8, 15), (10, 3), (10, 9), (12, 25)]
+
+# 음력 명절(설날/추석/부처님오신날), 대체공휴일, 선거일, 임시공휴일 (평일만 기재)
+# KRX 달력은 이 표의 첫 해 ~ 마지막 해만 포함: 매년 KRX 휴장일 공고 후 다음 해를 추가할 것
+KRX_HOLIDAYS = {
+    2015: ["02-18", "02-19", "02-20", "05-25", "08-14", "09-28", "09-29"],
+    2016: ["02-08", "02-09", "02-10", "04-13", "05-06", "09-14", "09-15", "09-16"],
+    2017: ["01-27", "01-30", "05-03", "05-09", "10-02", "10-04", "10-05", "10-06"],
+    2018: ["02-15", "02-16", "05-07", "05-22", "06-13", "09-24", "09-25", "09-26"],
+    2019: ["02-04", "02-05", "02-06", "05-06", "09-12", "09-13"],
+    2020: ["01-24", "01-27", "04-15", "04-30", "08-17", "09-30", "10-01", "10-02"],
+    2021: ["02-11", "02-12", "05-19", "08-16", "09-20", "09-21", "09-22", "10-04", "10-11"],
+    2022: ["01-31", "02-01", "02-02", "03-09", "06-01", "09-09", "09-12", "10-10"],
+    2023: ["01-23", "01-24", "05-29", "09-28", "09-29", "10-02"],
+    2024: ["02-09", "02-12", "04-10", "05-06", "05-15", "09-16", "09-17", "09-18", "10-01"],
+    2025: ["01-27", "01-28", "01-29", "01-30", "03-03", "05-06", "06-03", "10-06", "10-07", "10-08"],
+    2026: ["02-16", "02-17", "02-18", "03-02", "05-25", "06-03", "08-17", "09-24", "09-25", "10-05"],
+    2027: ["02-08", "02-09", "05-13", "08-16", "09-14", "09-15", "09-16", "10-04", "10-11", "12-27"],
+}
+
+
+def _nyse_holidays(start, end):
+    rule_based = _NYSEHolidayCalendar().holidays(start=start, end=end)
+    return rule_based.union(pd.to_datetime(NYSE_SPECIAL_CLOSURES))
+
+
+def _krx_holidays(start, end):
+    years = range(pd.Timestamp(start).year, pd.Timestamp(end).year + 1)
+    days = [date(y, m, d) for y in years for m, d in KRX_FIXED_HOLIDAYS]
+    days += [pd.Timestamp(f"{y}-{md}").date() for y, mds in KRX_HOLIDAYS.items() if y in years for md in mds]
+    # 연말 휴장일: 12월의 마지막 평일
+    days += [pd.bdate_range(f"{y}-12-24", f"{y}-12-31")[-1].date() for y in years]
+    return pd.DatetimeIndex(pd.to_datetime(days))
+
+
+HOLIDAY_RULES = {
+    'NYSE': _nyse_holidays,
+    'KRX': _krx_holidays,
+}
+
+# 거래소별 달력 범위 (KRX: 음력 휴장일 표가 있는 연도만)
+CALENDAR_RANGES = {
+    'NYSE': (CALENDAR_START, CALENDAR_END),
+    'KRX': (f"{min(KRX_HOLIDAYS)}-01-01", f"{max(KRX_HOLIDAYS)}-12-31"),
+}
+
+
+# ---------------------------------------------------------
+# Calendar
+# ---------------------------------------------------------
+def _to_day(d) -> np.datetime64:
+    if isinstance(d, np.datetime64):
+        return d.astype('datetime64[D]')
+    ts = pd.Timestamp(d)
+    if ts.tzinfo is not None:
+        ts = ts.tz_localize(None)
+    return np.datetime64(ts.date(), 'D')
+
+
+class TradingCalendar:
+    """
+    한 거래소의 세션(거래일) 달력
+
+    sessions[i]: i번째 거래일 (datetime64[D], 오름차순)
+    _last_le[k]: 달력 시작일로부터 k일째 날짜 기준, 그 날 이하 마지막 세션의 위치 (-1: 없음)
+    """
+
+    def __init__(self, name: str, holidays, start: str = CALENDAR_START, end: str = CALENDAR_END):
+        self.name = name
+        self.first_day = np.datetime64(start, 'D')
+        self.last_day = np.datetime64(end, 'D')
+
+        days = np.arange(self.first_day, self.last_day + 1, dtype='datetime64[D]')
+        # 1970-01-01 = 목요일 → (n + 3) % 7 이 월(0) ~ 일(6)
+        weekday = (days.astype('int64') + 3) % 7
+        holiday_days = np.asarray(pd.DatetimeIndex(holidays).values.astype('datetime64[D]'))
+
+        self._is_session = (weekday < 5) & ~np.isin(days, holiday_days)
+        self._last_le = np.cumsum(self._is_session) - 1
+        self.sessions = days[self._is_session]
+
+    def __repr__(self):
+        return f"TradingCalendar({self.name}, {len(self.sessions)} sessions {self.first_day} ~ {self.last_day})"
+
+    # --- internal helpers ---
+    def _offset(self, d) -> int:
+        k = int((_to_day(d) - self.first_day).astype('int64'))
+        if k < 0 or k > len(self._last_le) - 1:
+            raise ValueError(f"{self.name} 달력 범위({self.first_day} ~ {self.last_day}) 밖의 날짜: {d}")
+        return k
+
+    def _session(self, pos: int) -> pd.Timestamp:
+        if pos < 0 or pos >= len(self.sessions):
+            raise ValueError(f"{self.name} 달력 범위 밖의 세션 (position {pos})")
+        return pd.Timestamp(self.sessions[pos])
+
+    # --- scalar lookups (O(1)) ---
+    def is_session(self, d) -> bool:
+        return bool(self._is_session[self._offset(d)])
+
+    def session_on_or_before(self, d) -> pd.Timestamp:
+        return self._session(self._last_le[self._offset(d)])
+
+    def session_on_or_after(self, d) -> pd.Timestamp:
+        k = self._offset(d)
+        return self._session(self._last_le[k] + (0 if self._is_session[k] else 1))
+
+    def previous_session(self, d) -> pd.Timestamp:
+        """d 직전(d 미포함) 거래일"""
+        k = self._offset(d)
+        return self._session(self._last_le[k] - (1 if self._is_session[k] else 0))
+
+    def next_session(self, d) -> pd.Timestamp:
+        """d 직후(d 미포함) 거래일"""
+        return self._session(self._last_le[self._offset(d)] + 1)
+
+    def sessions_ago(self, d, n: int) -> pd.Timestamp:
+        """d 이하 마지막 거래일 기준 n 거래일 전 (n=0이면 session_on_or_before)"""
+        return self._session(self._last_le[self._offset(d)] - n)
+
+    def sessions_in_range(self, start, end) -> pd.DatetimeIndex:
+        """[start, end] 구간의 거래일"""
+        k = self._offset(start)
+        lo = self._last_le[k] + (0 if self._is_session[k] else 1)
+        hi = self._last_le[self._offset(end)]
+        return pd.DatetimeIndex(self.sessions[max(lo, 0):hi + 1])
+
+    # --- vectorized ---
+    def snap_forward(self, dates) -> pd.DatetimeIndex:
+        """
+        날짜 배열 → 각 날짜 이상 첫 거래일 (주말/휴장일 발표 → 다음 거래일 반응)
+        달력 범위 밖의 날짜는 NaT
+        """
+        days = np.asarray(pd.DatetimeIndex(dates).tz_localize(None).normalize().values.astype('datetime64[D]'))
+        k = (days - self.first_day).astype('int64')
+        valid = (k >= 0) & (k < len(self._last_le))
+        kc = np.clip(k, 0, len(self._last_le) - 1)
+
+        pos = self._last_le[kc] + np.where(self._is_session[kc], 0, 1)
+        valid &= (pos >= 0) & (pos < len(self.sessions))
+
+        out = np.full(len(days), np.datetime64('NaT'), dtype='datetime64[ns]')
+        out[valid] = self.sessions[pos[valid]].astype('datetime64[ns]')
+        return pd.DatetimeIndex(out)
+
+
+@lru_cache(maxsize=None)
+def get_calendar(exchange: str = 'NYSE') -> TradingCalendar:
+    """거래소별 달력 (프로세스당 1회 생성)"""
+    exchange = exchange.upper()
+    if exchange not in HOLIDAY_RULES:
+        raise ValueError(f"지원하지 않는 거래소: {exchange} (지원: {', '.join(HOLIDAY_RULES)})")
+    start, end = CALENDAR_RANGES[exchange]
+    if exchange == 'KRX' and date.today().year >= max(KRX_HOLIDAYS):
+        print(f"[TradingCalendar] KRX_HOLIDAYS가 {max(KRX_HOLIDAYS)}년까지만 있습니다: 다음 해 휴장일을 추가하세요")
+    return TradingCalendar(exchange, HOLIDAY_RULES[exchange](start, end), start, end)
+
+
+def exchange_for_ticker(ticker: str) -> str:
+    """티커 형식으로 거래소 추정: 6자리 숫자 / .KS / .KQ → KRX, 그 외 NYSE"""
+    t = str(ticker).strip().upper()
+    if t.endswith('.KS') or t.endswith('.KQ') or (len(t) == 6 and t.isdigit()):
+        return 'KRX'
+    return 'NYSE'